@@ -0,0 +1,128 @@
+try:
+    import argparse #pip install argparse
+    import os
+    import random
+    import tempfile
+    import time # pip install times
+    from InstructionsToMachineCode import Assembler, Instruction
+except ImportError as error:
+    print(error)
+    exit()
+
+class AssemblerBenchmark:
+    """
+    A class used to measure the throughput of the assembler on a generated program
+
+    The program mixes every kind of instruction : three operand instructions with a register or an immediate value,
+    braz/branz and jmp to labels defined all along the program, jmp on registers, scall and stop, with some comments.
+    It is written in a temporary file and assembled like InstructionsToMachineCode.py does, each phase being timed.
+
+    Attributes
+    ----------
+        linesNb : int
+            number of instructions of the generated program
+
+        labelsEvery : int
+            a label is defined every labelsEvery instructions
+
+        seed : int
+            seed of the generator, the same seed gives the same program
+
+        outputFormat : string
+            "text" or "binary", format of the machine code written
+
+        jobs : int
+            number of processes encoding the instructions
+
+        durations : dictionary
+            duration in seconds of each phase (read, labels, encode, write) of the last run
+
+    Methods
+    -------
+        generate()
+            returns the lines of the program
+
+        run()
+            generates and assembles the program, then displays the duration of each phase and the throughput
+    """
+    ALU = ["add", "sub", "mul", "div", "and", "or", "xor", "shl", "shr", "slt", "sle", "seq", "load", "store"]
+
+    def __init__(self, linesNb, labelsEvery = 20, seed = 0, outputFormat = "text", jobs = 1):
+        self.linesNb = linesNb
+        self.labelsEvery = labelsEvery
+        self.seed = seed
+        self.outputFormat = outputFormat
+        self.jobs = jobs
+        self.durations = {}
+
+    def generate(self):
+        generator = random.Random(self.seed)
+        labelsNb = max(1, self.linesNb // self.labelsEvery)
+        lines = []
+        for index in range(self.linesNb):
+            line = "L" + str(index // self.labelsEvery) + ": " if index % self.labelsEvery == 0 else "        "
+            kind = generator.random()
+            if kind < 0.75:
+                operand = "r" + str(generator.randrange(32)) if generator.random() < 0.5 else str(generator.randrange(-300, 300))
+                line += generator.choice(AssemblerBenchmark.ALU) + " r" + str(generator.randrange(32)) + ", " + operand + ", r" + str(generator.randrange(32))
+            elif kind < 0.85:
+                line += generator.choice(["braz", "branz"]) + " r" + str(generator.randrange(32)) + ", L" + str(generator.randrange(labelsNb))
+            elif kind < 0.95:
+                target = "L" + str(generator.randrange(labelsNb)) if generator.random() < 0.7 else "r" + str(generator.randrange(32))
+                line += "jmp " + target + ", r" + str(generator.randrange(32))
+            elif kind < 0.98:
+                line += "scall " + str(generator.randrange(2))
+            else:
+                line += "stop"
+            if index % 5 == 0:
+                line += "    ; comment"
+            lines.append(line + "\n")
+        return lines
+
+    def run(self):
+        directory = tempfile.mkdtemp()
+        inputFile = os.path.join(directory, "benchmark.asm")
+        outputFile = os.path.join(directory, "benchmark.bin")
+        file = open(inputFile, "w")
+        file.writelines(self.generate())
+        file.close()
+
+        assembler = Assembler(inputFile, outputFile, self.outputFormat)
+        start = time.perf_counter()
+        assembler.openFile(inputFile)
+        self.durations["read"] = time.perf_counter() - start
+        start = time.perf_counter()
+        assembler.lookForLabelsAndInstrs()
+        self.durations["labels"] = time.perf_counter() - start
+        start = time.perf_counter()
+        instructions = Instruction(assembler.labels, assembler.lines, assembler.lineNumbers)
+        instructions.encode(self.jobs)
+        self.durations["encode"] = time.perf_counter() - start
+        start = time.perf_counter()
+        assembler.loadInFile(instructions.machineCode)
+        self.durations["write"] = time.perf_counter() - start
+        os.remove(inputFile)
+        os.remove(outputFile)
+        os.rmdir(directory)
+
+        total = sum(self.durations.values())
+        print("Number of instructions : ", len(assembler.lines))
+        print("Number of labels : ", len(assembler.labels))
+        for phase, duration in self.durations.items():
+            print(" - " + phase + " : " + str(round(duration, 3)) + " second(s)")
+        print("Traduction duration : " + str(round(total, 3)) + " second(s)")
+        print("Instruction translanting frequency : " + str(round(len(assembler.lines)/total, 3)) + " Hz")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program measures the throughput of InstructionsToMachineCode.py on a generated program.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-n", "--lines", help="number of instructions of the generated program (default: 1000000)", type=int, default=1000000)
+    parser.add_argument("-l", "--labels-every", help="a label is defined every LABELS_EVERY instructions (default: 20)", type=int, default=20)
+    parser.add_argument("-s", "--seed", help="seed of the generated program (default: 0)", type=int, default=0)
+    parser.add_argument("-f", "--format", help="format of the machine code written (default: text)", choices=["text", "binary"], default="text")
+    parser.add_argument("-j", "--jobs", help="number of processes encoding the instructions (default: 1)", type=int, default=1)
+
+    args = parser.parse_args()
+
+    benchmark = AssemblerBenchmark(args.lines, args.labels_every, args.seed, args.format, args.jobs)
+    benchmark.run()
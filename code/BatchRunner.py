@@ -0,0 +1,229 @@
+try:
+    import argparse #pip install argparse
+    import contextlib
+    import csv
+    import hashlib
+    import io
+    import json
+    import os
+    import time # pip install times
+    from concurrent.futures import ProcessPoolExecutor
+    from VirtualMachineProgram import VirtualMachine, Program, Cache, SimulationError, ENGINES, OVERFLOW_POLICIES, MEMORY_MODELS
+    from ResultCache import ResultCache
+except ImportError as error:
+    print(error)
+    exit()
+
+class BatchRunner:
+    """
+    A class used to run many simulations described in a manifest across a pool of processes
+
+    The manifest is a CSV file (with a header line) or a JSON list of objects, each job having the keys :
+    program, nb_registers, memory_size and optionally registers_init_file, engine, overflow, memory_model, cache (SETS,WAYS,LINE_SIZE)
+    and stdin_file (values read by scall 0, the values displayed by scall 1 are then written in the report).
+    With a cache directory, the workers share a ResultCache : a job already simulated with the same program and options is not executed again.
+    Relative paths are relative to the manifest.
+
+    Attributes
+    ----------
+        manifestFile : string
+            name of the manifest file
+
+        outputRoot : string
+            directory where the reports and the summary are saved
+
+        jobsNb : int
+            number of worker processes
+
+        engine : string
+            execution engine of the jobs which do not set one
+
+        cacheDir : string
+            directory of the ResultCache shared by the workers, None without cache
+
+        jobs : dictionary table
+            the jobs read from the manifest
+
+        results : dictionary table
+            the result of each job, in the order of the manifest
+
+        programs : dictionary
+            the programs already loaded and decoded by the current worker process, indexed by file name
+
+    Methods
+    -------
+        run()
+            runs all the jobs of the manifest and saves the summary
+
+        loadManifest()
+            reads the jobs of the manifest file in the "jobs" attribute, raises SimulationError naming the first invalid job
+
+        jobName(index, job)
+            returns the report name of a job, unique in the batch and the same from one run of the manifest to the next
+
+            Parameters
+            ----------
+            index : int
+                position of the job in the manifest
+            job : dictionary
+                parameters of the job
+
+        runJob(job)
+            runs one job in the current worker process and returns its result
+
+            Parameters
+            ----------
+            job : dictionary
+                parameters of the job
+
+        showSummary()
+            displays the table of the results
+
+        loadInFile()
+            saves the table of the results in summary.csv
+    """
+    COLUMNS = ["job", "name", "program", "registers_init_file", "nb_registers", "memory_size", "status", "cycles", "duration", "message"]
+
+    programs = {}
+
+    def __init__(self, manifestFile, outputRoot, jobsNb = None, engine = "interp", cacheDir = None):
+        self.manifestFile = manifestFile
+        self.outputRoot = outputRoot
+        self.jobsNb = jobsNb if jobsNb is not None else os.cpu_count()
+        self.engine = engine
+        self.cacheDir = cacheDir
+        self.jobs = []
+        self.results = []
+
+    def run(self):
+        start = time.perf_counter()
+        self.loadManifest()
+        os.makedirs(self.outputRoot, exist_ok = True)
+
+        chunksize = max(1, len(self.jobs) // (self.jobsNb * 4))
+        with ProcessPoolExecutor(max_workers = self.jobsNb) as executor:
+            self.results = list(executor.map(BatchRunner.runJob, self.jobs, chunksize = chunksize))
+
+        self.showSummary()
+        self.loadInFile()
+        print("")
+        print(str(len(self.jobs)) + " job(s) on " + str(self.jobsNb) + " process(es) in " + str(round(time.perf_counter() - start, 3)) + " second(s)")
+
+    def loadManifest(self):
+        root = os.path.dirname(os.path.abspath(self.manifestFile))
+        file = open(self.manifestFile, "r")
+        if self.manifestFile.endswith(".json"):
+            entries = json.load(file)
+        else:
+            entries = list(csv.DictReader(file))
+        file.close()
+
+        for index in range(0, len(entries)):
+            entry = entries[index]
+            try:
+                job = { "job": index,
+                        "program": os.path.join(root, entry["program"]),
+                        "registers_init_file": os.path.join(root, entry["registers_init_file"]) if entry.get("registers_init_file") else None,
+                        "nb_registers": int(entry["nb_registers"]),
+                        "memory_size": int(entry["memory_size"]),
+                        "engine": entry.get("engine") or self.engine,
+                        "overflow": entry.get("overflow") or "trap",
+                        "memory_model": entry.get("memory_model") or "flat",
+                        "cache": entry.get("cache") or None,
+                        "output_root": self.outputRoot  }
+            except (KeyError, TypeError, ValueError) as error:
+                raise SimulationError("Invalid job " + str(index) + " of " + self.manifestFile + " : missing or invalid " + (str(error) if isinstance(error, KeyError) else "nb_registers or memory_size"))
+            # only set when given, so that the names of the other jobs do not change
+            if entry.get("stdin_file"):
+                job["stdin_file"] = os.path.join(root, entry["stdin_file"])
+            if self.cacheDir is not None:
+                job["cache_dir"] = self.cacheDir
+            for option, choices in [("engine", ENGINES), ("overflow", OVERFLOW_POLICIES), ("memory_model", MEMORY_MODELS)]:
+                if job[option] not in choices:
+                    raise SimulationError("Invalid job " + str(index) + " of " + self.manifestFile + " : unknown " + option + " " + str(job[option])
+                                          + " (expected one of " + ", ".join(choices) + ")")
+            job["name"] = self.jobName(index, job)
+            self.jobs.append(job)
+
+    def jobName(self, index, job):
+        parameters = json.dumps([entry for entry in sorted(job.items()) if entry[0] not in ("output_root", "cache_dir")])
+        stem = os.path.splitext(os.path.basename(job["program"]))[0]
+        return "vm_%05d_" % index + stem + "_" + hashlib.sha1(parameters.encode()).hexdigest()[:8] + ".txt"
+
+    @staticmethod
+    def runJob(job):
+        output = io.StringIO()
+        result = {column: job.get(column) for column in BatchRunner.COLUMNS}
+        result["status"] = "ok"
+
+        try:
+            with contextlib.redirect_stdout(output):
+                program = BatchRunner.programs.get(job["program"])
+                if program is None:
+                    program = Program.load(job["program"])
+                    BatchRunner.programs[job["program"]] = program
+
+                cache = None
+                if job["cache"] is not None:
+                    cache = Cache.parseGeometry(job["cache"])
+
+                resultCache = ResultCache(job["cache_dir"]) if job.get("cache_dir") else None
+                vm = VirtualMachine(job["program"], job["output_root"], job["nb_registers"], job["memory_size"], job["registers_init_file"],
+                                    trace = "none", engine = job["engine"], overflow = job["overflow"], memory_model = job["memory_model"],
+                                    cache = cache, program = program, output_name = job["name"],
+                                    inputs = VirtualMachine.loadInputs(job["stdin_file"]) if job.get("stdin_file") else None, capture_outputs = bool(job.get("stdin_file")),
+                                    result_cache = resultCache)
+                vm.run()
+            result["cycles"] = vm.performances.cycles
+            result["duration"] = round(vm.performances.elapsed, 6)
+            if resultCache is not None and resultCache.hits:
+                result["message"] = "result cache hit"
+        except SystemExit:
+            result["status"] = "error"
+        except SimulationError as error:
+            result["status"] = "error"
+            output.write(str(error) + "\n")
+        except Exception as error:
+            result["status"] = "error"
+            output.write(type(error).__name__ + " : " + str(error) + "\n")
+
+        lines = output.getvalue().strip().split("\n")
+        if result["status"] == "error":
+            result["message"] = lines[-1]
+        return result
+
+    def showSummary(self):
+        print("Batch summary :")
+        widths = [len(column) for column in BatchRunner.COLUMNS]
+        rows = []
+        for result in self.results:
+            row = ["" if result[column] is None else os.path.basename(result[column]) if column in ("program", "registers_init_file") else str(result[column]) for column in BatchRunner.COLUMNS]
+            widths = [max(widths[i], len(row[i])) for i in range(0, len(row))]
+            rows.append(row)
+        for row in [BatchRunner.COLUMNS] + rows:
+            print(" | ".join([row[i].ljust(widths[i]) for i in range(0, len(row))]))
+
+    def loadInFile(self):
+        file = open(os.path.join(self.outputRoot, "summary.csv"), "w", newline = "")
+        writer = csv.DictWriter(file, fieldnames = BatchRunner.COLUMNS)
+        writer.writeheader()
+        writer.writerows(self.results)
+        file.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program runs the simulations listed in a manifest (CSV or JSON) on all the cores and merges their results in one summary.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-i", "--manifest", help=".csv or .json manifest, one job per line/object with the keys\nprogram, nb_registers, memory_size [, registers_init_file, engine, overflow, memory_model, cache, stdin_file]", required=True)
+    parser.add_argument("-o", "--output_root", help="directory of the reports and of summary.csv (created if needed)", required=True)
+    parser.add_argument("-j", "--jobs", help="number of worker processes (default: number of cores)", type=int)
+    parser.add_argument("-e", "--engine", help="execution engine of the jobs which do not set one (default: interp)", choices=ENGINES, default="interp")
+    parser.add_argument("--cache-dir", help="directory of the results shared by the workers (see VirtualMachineProgram.py --cache-dir)")
+
+    args = parser.parse_args()
+
+    runner = BatchRunner(args.manifest, args.output_root, args.jobs, args.engine, args.cache_dir)
+    try:
+        runner.run()
+    except SimulationError as error:
+        print(error)
+        exit(1)
@@ -0,0 +1,223 @@
+try:
+    import json
+    import mmap
+    import struct
+    import sys
+    import zlib
+    from array import array
+except ImportError as error:
+    print(error)
+    exit()
+
+class BinaryFormatError(ValueError):
+    """
+    An exception raised when a file is not a valid program in the binary format
+
+    Attributes
+    ----------
+        message : string
+            what is wrong, with the name of the file
+    """
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+class BinaryProgram:
+    """
+    A class used to read and write a program in machine language in the compact binary format
+
+    The file starts with a 12 bytes header : the "ISIM" magic, the format version (uint16), flags reserved for later use (uint16)
+    and the number of instructions (uint32). The instructions follow as packed little-endian uint32 words.
+
+    Attributes
+    ----------
+        MAGIC : bytes
+            the first bytes of every binary program, used to tell it apart from the text format
+
+        VERSION : int
+            the version of the format written by this class
+
+        HEADER : object
+            the struct describing the header
+
+    Methods
+    -------
+        isBinary(fileName)
+            returns True if the file is a binary program
+
+            Parameters
+            ----------
+            fileName: string
+                the name of the file to check
+
+        write(fileName, words)
+            saves the instructions in a binary program
+
+            Parameters
+            ----------
+            fileName: string
+                the name of the file to write
+
+            words: int table
+                instructions in machine language
+
+        read(fileName)
+            maps a binary program in memory and returns its instructions as a uint32 memoryview (an array on big-endian machines),
+            raises BinaryFormatError for a truncated program or an unsupported version
+
+            Parameters
+            ----------
+            fileName: string
+                the name of the file to read
+    """
+    MAGIC = b"ISIM"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHI")
+
+    @staticmethod
+    def isBinary(fileName):
+        file = open(fileName, "rb")
+        magic = file.read(len(BinaryProgram.MAGIC))
+        file.close()
+        return magic == BinaryProgram.MAGIC
+
+    @staticmethod
+    def write(fileName, words):
+        words = array('I', words)
+        if sys.byteorder == "big":
+            words.byteswap()
+
+        file = open(fileName, "wb")
+        file.write(BinaryProgram.HEADER.pack(BinaryProgram.MAGIC, BinaryProgram.VERSION, 0, len(words)))
+        words.tofile(file)
+        file.close()
+
+    @staticmethod
+    def read(fileName):
+        file = open(fileName, "rb")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        file.close()
+
+        if len(mapped) < BinaryProgram.HEADER.size:
+            raise BinaryFormatError("Truncated binary program : " + fileName)
+        magic, version, flags, count = BinaryProgram.HEADER.unpack_from(mapped, 0)
+        if magic != BinaryProgram.MAGIC or version > BinaryProgram.VERSION:
+            raise BinaryFormatError("Unsupported binary program : " + fileName + " (version " + str(version) + ")")
+        end = BinaryProgram.HEADER.size + 4 * count
+        if len(mapped) < end:
+            raise BinaryFormatError("Truncated binary program : " + fileName + " (" + str(count) + " instructions expected)")
+
+        words = memoryview(mapped)[BinaryProgram.HEADER.size:end].cast('I')
+        if sys.byteorder == "big":
+            words = array('I', words)
+            words.byteswap()
+        return words
+
+class ObjectFile:
+    """
+    A class used to represent an object file of the assembler : the machine code of one source file with its labels and relocations,
+    combined with other object files into a program by the Linker
+
+    The file starts with a 28 bytes header : the "IOBJ" magic, the format version (uint16), flags reserved for later use (uint16),
+    the number of instructions, of labels and of relocations, the length of the JSON part and the CRC32 of the rest of the file (uint32 each).
+    Follow as packed little-endian uint32 : the instructions, the address of each label, then the position of each relocated instruction
+    and its symbol (position in the labels followed by the externs), and a JSON object with the names of the labels, of the global labels and of the externs.
+    In the instructions, a label of the object is encoded with its address in the object and an extern label with 0.
+
+    Attributes
+    ----------
+        words : int table
+            instructions in machine language
+
+        labels : dictionary
+            address in the object of each label, in the order of the source
+
+        globals : string table
+            the labels which can be used by the other objects (.global)
+
+        externs : string table
+            the labels defined by other objects (.extern)
+
+        relocations : tuple table
+            (position, label) of each jmp, braz and branz using a label or an extern, in the order of the instructions
+
+        MAGIC : bytes
+            the first bytes of every object file
+
+        VERSION : int
+            the version of the format written by this class
+
+        HEADER : object
+            the struct describing the header
+
+    Methods
+    -------
+        write(fileName)
+            saves the object file
+
+            Parameters
+            ----------
+            fileName: string
+                the name of the file to write
+
+        read(fileName)
+            returns the ObjectFile saved in a file, None if it is not a valid object file
+
+            Parameters
+            ----------
+            fileName: string
+                the name of the file to read
+    """
+    MAGIC = b"IOBJ"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIIIII")
+
+    def __init__(self, words, labels, globals = (), externs = (), relocations = ()):
+        self.words = words
+        self.labels = labels
+        self.globals = list(globals)
+        self.externs = list(externs)
+        self.relocations = list(relocations)
+
+    def write(self, fileName):
+        names = list(self.labels)
+        ordinals = {name: ordinal for ordinal, name in enumerate(names + self.externs)}
+        header = json.dumps({"labels": names, "globals": self.globals, "externs": self.externs}).encode()
+        tables = [array('I', self.words), array('I', self.labels.values()),
+                  array('I', [index for index, label in self.relocations]), array('I', [ordinals[label] for index, label in self.relocations])]
+        if sys.byteorder == "big":
+            for table in tables:
+                table.byteswap()
+        payload = b"".join([table.tobytes() for table in tables] + [header])
+
+        file = open(fileName, "wb")
+        file.write(ObjectFile.HEADER.pack(ObjectFile.MAGIC, ObjectFile.VERSION, 0, len(self.words), len(names), len(self.relocations), len(header), zlib.crc32(payload)))
+        file.write(payload)
+        file.close()
+
+    @staticmethod
+    def read(fileName):
+        file = open(fileName, "rb")
+        content = file.read()
+        file.close()
+        if len(content) < ObjectFile.HEADER.size:
+            return None
+        magic, version, flags, wordsNb, labelsNb, relocationsNb, headerSize, crc = ObjectFile.HEADER.unpack_from(content, 0)
+        payload = memoryview(content)[ObjectFile.HEADER.size:]
+        if (magic != ObjectFile.MAGIC or version > ObjectFile.VERSION or len(payload) != 4 * (wordsNb + labelsNb + 2 * relocationsNb) + headerSize
+                or zlib.crc32(payload) != crc):
+            return None
+
+        tables = []
+        position = 0
+        for size in [wordsNb, labelsNb, relocationsNb, relocationsNb]:
+            table = array('I')
+            table.frombytes(payload[position:position + 4 * size])
+            if sys.byteorder == "big":
+                table.byteswap()
+            tables.append(table)
+            position += 4 * size
+        header = json.loads(bytes(payload[position:]))
+        symbols = header["labels"] + header["externs"]
+        return ObjectFile(tables[0], dict(zip(header["labels"], tables[1])), header["globals"], header["externs"],
+                          zip(tables[2], [symbols[ordinal] for ordinal in tables[3]]))
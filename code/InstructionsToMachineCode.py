@@ -1,10 +1,60 @@
 try:
     import argparse #pip install argparse
+    import bisect
+    import hashlib
+    import json
+    import os
+    import re
+    import struct
+    import sys
     import time # pip install times
+    import zlib
+    from array import array
+    from concurrent.futures import ProcessPoolExecutor
+    from BinaryFormat import BinaryProgram, ObjectFile
 except ImportError as error:
     print(error)
     exit()
 
+class AssemblyError(Exception):
+    """
+    An exception raised when the assembly program cannot be translated
+
+    Attributes
+    ----------
+        message : string
+            what is wrong
+
+        lineNumber : int
+            number of the line of the assembly file (counted from 1), None if unknown
+
+        text : string
+            the instruction or label concerned, None if unknown
+
+        fileName : string
+            the file of lineNumber when the program includes files (see Assembler.locate), None otherwise
+    """
+    def __init__(self, message, lineNumber = None, text = None, fileName = None):
+        self.message = message
+        self.lineNumber = lineNumber
+        self.text = text
+        self.fileName = fileName
+        super().__init__(str(self))
+
+    def __str__(self):
+        description = self.message
+        if self.text is not None:
+            description += " : " + self.text
+        if self.lineNumber is not None:
+            description = "line " + str(self.lineNumber) + " : " + description
+        if self.fileName is not None:
+            description = self.fileName + ", " + description
+        return description
+
+    def __reduce__(self):
+        # the worker processes of Instruction.encode send their errors to the main process
+        return (AssemblyError, (self.message, self.lineNumber, self.text, self.fileName))
+
 class Performances:
     """
     A class used to determine some statistics about the translate
@@ -17,6 +67,10 @@ class Performances:
             a float to store the ending time
         elapsed : float
             a float to store the elapsed time
+        phases : dictionary
+            duration in seconds of each phase of the translate (read, labels, encode, write...), in the order they ran
+        lap : float
+            the time the current phase started
 
     Methods
     -------
@@ -25,14 +79,30 @@ class Performances:
         
         timerStop()
             store the ending time in stop attribute and store the elsapsed time in elapsed attribute
+
+        timerPhase(name)
+            adds the time elapsed since the end of the previous phase to the duration of a phase
+
+            Parameters
+            ----------
+            name: string
+                name of the phase which just ended
     """
     def __init__(self):
         self.start = None
         self.stop = None
         self.elapsed = None
+        self.phases = {}
+        self.lap = None
     
     def timerStart(self):
         self.start = time.perf_counter()
+        self.lap = self.start
+
+    def timerPhase(self, name):
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0) + now - self.lap
+        self.lap = now
 
     def timerStop(self):
         self.stop = time.perf_counter()
@@ -42,6 +112,12 @@ class Assembler:
     """
     A class that is used to pre-process the assembly program before it is converted to machine language
 
+    Each line is cut at the first "#" or ";" and its blanks are removed (so "r 1" is r1), the text before its last ":" is a label.
+    The labels are kept in a dictionary, a label defined twice is an error.
+    A line ".include FILE" (or ".include "FILE"") is replaced by the lines of FILE, relative to the directory of the file including it.
+    A line ".global LABEL, ..." lets the other object files use labels of the program, a line ".extern LABEL, ..." declares labels
+    defined by other object files : both only matter to the "object" output format, combined into a program by the Linker.
+
     Attributes
     ----------
         inputFile: string
@@ -50,6 +126,10 @@ class Assembler:
         outputFile: string
             the name of the file in which to save the translated assembly program
 
+        outputFormat: string
+            "text" for one "address instruction" line per instruction, "binary" for the compact format of BinaryProgram,
+            "object" for an ObjectFile, with the labels and the relocations used by the Linker
+
         instructionManager: object
             python object used to translate the assembly program
 
@@ -62,106 +142,355 @@ class Assembler:
         lines: string table
             table used to store each line of the assembler program before translation
 
+        lineNumbers: int table
+            number of the line of the assembly file (counted from 1) of each entry of lines
+
+        labelLines: dictionary
+            number of the line where each label is defined
+
+        symbols: bool
+            if True, the labels are also saved in a symbol file next to the output file (outputFile + ".sym"), used by the profiler of the simulator
+
+        incremental: bool
+            if True, an AssemblyCache next to the output file lets the next runs re-encode only the lines which changed
+
+        jobs: int
+            number of processes encoding the instructions, see Instruction.encode
+
+        globals, externs: string table
+            the labels declared by .global and by .extern
+
+        directiveLines: dictionary
+            number of the line of the .global or .extern declaring each label
+
+        origins: tuple table
+            (file name, line number) of each line of the program when it includes files, None otherwise
+
     Methods
     -------
         run()
-            represents the main program to be followed by calling the corresponding methods and displays the results of the translation
+            represents the main program to be followed by calling the corresponding methods and displays the results of the translation,
+            or the line of the first error
 
         openFile(asm_file)
-            opens the file corresponding to the assembly program
+            opens the file corresponding to the assembly program, with the files it includes
 
             Parameters
             ----------
             asm_file: string
                 the name of the assembler file in which the program to be translated is located
 
-        lookForLabelsAndInstrcutions()
-            slices the assembly program to extract labels and instructions and removes unwanted elements
+        readSource(lines, fileName)
+            keeps the lines of an assembly program, the .include lines being replaced by the included files (origins then gives the file of each line)
+
+            Parameters
+            ----------
+            lines: string table
+                the lines of the assembly program
+            fileName: string
+                name of its file, None for a program which is not in a file (the included files are relative to the current directory)
+
+        includeLines(lines, fileName, including)
+            returns the lines of a file with the included files in their place, and the origin of each line, raises AssemblyError for an include
+            which cannot be read or which includes itself
+
+            Parameters
+            ----------
+            lines: string table
+                the lines of the file
+            fileName: string
+                name of the file
+            including: string table
+                absolute names of the files including this one
+
+        lookForLabelsAndInstrs()
+            slices the assembly program to extract labels and instructions and removes unwanted elements, raises AssemblyError for an invalid label
+            or directive
+
+        encodingLabels()
+            returns the address of each label used to encode the instructions, the labels followed by the externs (address 0)
+
+        lineName(number)
+            returns the number of a line of the program for a message, with the name of its file when the program includes files
+
+            Parameters
+            ----------
+            number: int
+                number of the line in the program, the included files being in their place
+
+        locate(error)
+            returns the AssemblyError with the file where it happened and its line in this file when the program includes files, error itself otherwise
+
+            Parameters
+            ----------
+            error: object
+                the AssemblyError, its line being counted in the program with the included files in their place
+
+        errorText(error, fileName)
+            returns the text displayed for an AssemblyError : the file and the line where it happened, then the line itself
+
+            Parameters
+            ----------
+            error: object
+                the AssemblyError
+            fileName: string
+                name of the assembled file
+
+        parseLines(lines, firstNumber)
+            returns the instructions (without blanks) of some lines of the assembly program, the number of their lines,
+            the labels defined as (label, index of the next instruction, line number) tuples and the directives as (text, line number) tuples
+
+            Parameters
+            ----------
+            lines: string table
+                lines of the assembly program
+            firstNumber: int
+                number of the first line
 
         loadInFile(data)
-            saves in a binary file the result of the conversion of the assembly program into machine language
+            saves in a binary file the result of the conversion of the assembly program into machine language, in the output format
+            (with the labels and the references of instructionsManager for the object format)
 
             Parameters
             ----------
             data: int table
                 table in which all machine instructions are grouped
+
+        loadSymbolsInFile()
+            saves the labels in the symbol file, one "address label" line per label
+
+        assemble(source, fileName = None)
+            returns the machine code (int array) and the labels of an assembly program held in memory, without writing any file,
+            raises AssemblyError for the first error
+
+            Parameters
+            ----------
+            source: string
+                the assembly program
+            fileName: string
+                name of its file, its .include files being relative to its directory (None: relative to the current directory)
     """
-    def __init__(self, inputFile, outputFile):
+    COMMENTS = re.compile(r"[#;][^\n]*")
+    BLANKS = str.maketrans("", "", " \t\r\f\v")
+    INCLUDE = re.compile(r"[ \t]*\.include[ \t]+(?:\"([^\"]+)\"|([^ \t\r\n#;\"]+))[ \t\r]*(?:[#;].*)?\n?$")
+    DIRECTIVE = re.compile(r"\.(global|extern)(.*)$")
+
+    def __init__(self, inputFile, outputFile, outputFormat = "text", symbols = False, incremental = False, jobs = 1):
         self.inputFile = inputFile
         self.outputFile = outputFile
+        self.outputFormat = outputFormat
+        self.symbols = symbols
+        self.incremental = incremental
+        self.jobs = jobs
         self.instructionsManager = None
         self.performances = Performances()
         self.labels = {}
         self.lines = []
+        self.lineNumbers = []
+        self.labelLines = {}
+        self.globals = []
+        self.externs = []
+        self.directiveLines = {}
+        self.origins = None
     
     def run(self):
+        fileName = self.inputFile
         print("Starting conversion!")
         self.performances.timerStart()
-        print(" - Reading file...")
-        self.openFile(self.inputFile)
-        print(" - Parsing file...")
-        self.lookForLabelsAndInstrs()
-        print(" - Converting program...")
-        self.instructionsManager = Instruction(self.labels, self.lines)
-        self.instructionsManager.encode()
-        print(" - Saving machine code...")
-        self.loadInFile(self.instructionsManager.machineCode)
+        cache = AssemblyCache(self) if self.incremental and self.outputFormat != "object" else None
+        try:
+            print(" - Reading file...")
+            self.openFile(self.inputFile)
+            self.performances.timerPhase("read")
+            if cache is not None and cache.update():
+                print(" - Patching machine code... " + str(cache.changedLines) + " line(s) changed, " + str(cache.changedWords) + " instruction(s) written")
+                instructionsNb = len(cache.words)
+                self.performances.timerPhase("patch")
+            else:
+                print(" - Parsing file...")
+                self.lookForLabelsAndInstrs()
+                self.performances.timerPhase("labels")
+                print(" - Converting program...")
+                self.instructionsManager = Instruction(self.encodingLabels(), self.lines, self.lineNumbers)
+                self.instructionsManager.encode(self.jobs)
+                self.performances.timerPhase("encode")
+                print(" - Saving machine code...")
+                self.loadInFile(self.instructionsManager.machineCode)
+                if cache is not None:
+                    cache.store()
+                instructionsNb = len(self.lines)
+        except AssemblyError as error:
+            print(self.errorText(error, fileName))
+            exit(1)
+        if self.symbols:
+            self.loadSymbolsInFile()
+        self.performances.timerPhase("write")
         self.performances.timerStop()
         print("Done !\n")
 
         print("Some statistics :")
-        print("Number of instructions : ", len(self.lines))
+        print("Number of instructions : ", instructionsNb)
         print("Number of labels : ", len(self.labels))
         print("Traduction duration : " + str(round(self.performances.elapsed, 3)) + " second(s)")
-        print("Instruction translanting frequency : " + str(round(len(self.lines)/self.performances.elapsed, 3)) + " Hz")
+        for phase, duration in self.performances.phases.items():
+            print(" - " + phase + " : " + str(round(duration, 3)) + " second(s)")
+        print("Instruction translanting frequency : " + str(round(instructionsNb/self.performances.elapsed, 3)) + " Hz")
         print("")
 
     def openFile(self, asm_file):
         file = open(asm_file, 'r')
-        self.inputFile = file.readlines()
+        self.readSource(file.readlines(), asm_file)
         file.close()
 
+    def readSource(self, lines, fileName):
+        self.inputFile = lines
+        self.origins = None
+        if any([".include" in line for line in lines]):
+            self.inputFile, self.origins = Assembler.includeLines(lines, fileName, [])
+
+    @staticmethod
+    def includeLines(lines, fileName, including):
+        expanded = []
+        origins = []
+        path = os.path.abspath(fileName) if fileName is not None else None
+        for number, line in enumerate(lines, 1):
+            match = Assembler.INCLUDE.match(line) if ".include" in line else None
+            if match is None:
+                expanded.append(line)
+                origins.append((fileName, number))
+                continue
+            included = os.path.join(os.path.dirname(fileName) if fileName is not None else "", match.group(1) or match.group(2))
+            if os.path.abspath(included) in including + [path]:
+                raise AssemblyError("Recursive include", number, included, fileName)
+            try:
+                file = open(included, "r")
+                includedLines = file.read().splitlines(True)
+                file.close()
+            except OSError:
+                raise AssemblyError("Cannot read the included file", number, included, fileName)
+            if includedLines and not includedLines[-1].endswith("\n"):
+                includedLines[-1] += "\n"
+            includedLines, includedOrigins = Assembler.includeLines(includedLines, included, including + [path])
+            expanded += includedLines
+            origins += includedOrigins
+        return expanded, origins
+
     def lookForLabelsAndInstrs(self):
-        pc = 0
-        for line in self.inputFile:
-            parsing_for_labels = []
-            for i in line:
-                if i == "#" or i == "\n" or i == ";":
-                    break
-                elif i == " " or i == "\t":
-                    continue
-                else:
-                    parsing_for_labels.append(i)
-
-            to_check = "".join(parsing_for_labels)
-
-            if to_check != "":
-                if ":" in to_check:
-                    index = to_check.rfind(":")
-                    raw = to_check[index+1:]
-                    self.labels[to_check[:index]] = pc
-                    if raw != "":
-                        self.lines.append(raw)
-                        pc+=1
-                    else:
-                        continue
+        instructions, lineNumbers, definitions, directives = Assembler.parseLines(self.inputFile)
+        start = len(self.lines)
+        for label, index, number in definitions:
+            if label in self.labelLines:
+                raise AssemblyError("Label already defined at line " + self.lineName(self.labelLines[label]), number, label)
+            self.labels[label] = start + index
+            self.labelLines[label] = number
+        self.lines += instructions
+        self.lineNumbers += lineNumbers
+
+        for text, number in directives:
+            match = Assembler.DIRECTIVE.match(text)
+            if match is None:
+                raise AssemblyError("Unknown directive (.global, .extern or .include)", number, text)
+            for name in match.group(2).split(","):
+                if name == "" or Instruction.REGISTER.match(name) is not None or Instruction.INTEGER.match(name) is not None:
+                    raise AssemblyError("Invalid label name in ." + match.group(1), number, name)
+                if name in self.directiveLines:
+                    raise AssemblyError("Label already declared at line " + self.lineName(self.directiveLines[name]), number, name)
+                self.directiveLines[name] = number
+                if match.group(1) == "global":
+                    self.globals.append(name)
                 else:
-                    self.lines.append(to_check)
-                    pc+=1
+                    self.externs.append(name)
+        for name in self.globals:
+            if name not in self.labels:
+                raise AssemblyError("Undefined global label", self.directiveLines[name], name)
+        for name in self.externs:
+            if name in self.labels:
+                raise AssemblyError("Extern label defined at line " + self.lineName(self.labelLines[name]), self.directiveLines[name], name)
+            if self.outputFormat != "object":
+                raise AssemblyError("An extern label needs the object format (-f object) and the Linker", self.directiveLines[name], name)
+
+    def encodingLabels(self):
+        if not self.externs:
+            return self.labels
+        labels = dict(self.labels)
+        labels.update(dict.fromkeys(self.externs, 0))
+        return labels
+
+    def lineName(self, number):
+        if self.origins is None:
+            return str(number)
+        fileName, line = self.origins[number - 1]
+        return str(line) + " of " + str(fileName)
+
+    def locate(self, error):
+        if self.origins is None or error.fileName is not None or error.lineNumber is None:
+            return error
+        fileName, number = self.origins[error.lineNumber - 1]
+        return AssemblyError(error.message, number, error.text, fileName)
+
+    def errorText(self, error, fileName):
+        if error.fileName is not None or error.lineNumber is None:
+            return str(error) if error.fileName is not None else fileName + ", " + str(error)
+        line = self.inputFile[error.lineNumber - 1].strip()
+        error = self.locate(error)
+        return (str(error) if error.fileName is not None else fileName + ", " + str(error)) + "\n    " + line
+
+    @staticmethod
+    def parseLines(lines, firstNumber = 1):
+        # the comments and blanks of all the lines are removed at once, the lines keep their numbers
+        text = Assembler.COMMENTS.sub("", "".join(lines)).translate(Assembler.BLANKS)
+        instructions = []
+        lineNumbers = []
+        definitions = []
+        directives = []
+        for number, to_check in enumerate(text.split("\n"), firstNumber):
+            if to_check == "":
+                continue
+            if ":" in to_check:
+                label, separator, to_check = to_check.rpartition(":")
+                if label == "":
+                    raise AssemblyError("Empty label", number)
+                definitions.append((label, len(instructions), number))
+                if to_check == "":
+                    continue
+            elif to_check[0] == ".":
+                directives.append((to_check, number))
+                continue
+            instructions.append(to_check)
+            lineNumbers.append(number)
+        return instructions, lineNumbers, definitions, directives
     
     def loadInFile(self, data):
-        index = 0
-        open(self.outputFile, "w").close()
-        file = open(self.outputFile, "a")
-        for i in data:
-            file.write("0x%08x" % index + " " + "0x%08x" % i)
-            if(int(index) != len(data)-1):
-                file.write("\n")
-            else:
-                pass
-            index += 1
+        if self.outputFormat == "object":
+            ObjectFile(data, self.labels, self.globals, self.externs, self.instructionsManager.references).write(self.outputFile)
+        elif self.outputFormat == "binary":
+            BinaryProgram.write(self.outputFile, data)
+        else:
+            file = open(self.outputFile, "w")
+            file.write("\n".join(["0x%08x 0x%08x" % item for item in enumerate(data)]))
+            file.close()
+
+    def loadSymbolsInFile(self):
+        file = open(self.outputFile + ".sym", "w")
+        file.write("".join(["0x%08x" % address + " " + label + "\n" for label, address in sorted(self.labels.items(), key = lambda item: item[1])]))
         file.close()
 
+    @staticmethod
+    def assemble(source, fileName = None):
+        assembler = Assembler(None, None)
+        assembler.readSource(source.splitlines(True), fileName)
+        try:
+            assembler.lookForLabelsAndInstrs()
+            instructions = Instruction(assembler.labels, assembler.lines, assembler.lineNumbers)
+            instructions.encode()
+            try:
+                return array('I', instructions.machineCode), assembler.labels
+            except OverflowError:
+                index = [word >> 32 == 0 for word in instructions.machineCode].index(False)
+                raise instructions.error("The instruction does not fit in 32 bits", assembler.lines[index], index)
+        except AssemblyError as error:
+            raise assembler.locate(error)
+
 class Instruction:
     """
     A class used to translate the pre-processed assembly program into machine language 
@@ -177,26 +506,111 @@ class Instruction:
         machineCode: int table
             table used to store the calculated machine instructions 
 
+        lineNumbers: int table
+            number of the line of the assembly file of each command, None to count the commands instead
+
+        references: tuple table
+            (position in cmd, label) of each jmp, braz and branz encoded with the address of a label
+
         instructions: dictionary
             dictionary used to link an assembly command to its associated instruction number (stop : 0, add : 1 ...)
 
+        worker: object
+            in a worker process of encode, the Instruction holding the labels and the commands of the program
+
+        CHUNK: int
+            minimum number of commands encoded by a worker process at once
+
+        SYNTAX: object
+            the regular expression recognising a command without blanks, with one group per field
+
+        JMP_ADDRESS, BRANCH_ADDRESS: int
+            the highest label address of jmp (21 bits field above the register) and of braz and branz (22 low bits)
+
     Methods
     -------
         instCheck(inst)
-            analyzes the current assembly instruction to determine if it is valid or not
+            analyzes the current assembly instruction to determine if it is valid or not, raises AssemblyError if not
 
             Parameters
             ----------
             inst: string
                 current instruction
         
-        encode()
-            translates the set of instructions into machine language and stores them in the machineCode attribute
+        encode(jobs)
+            translates the set of instructions into machine language and stores them in the machineCode attribute,
+            raises AssemblyError for the first invalid command
+
+            Parameters
+            ----------
+            jobs: int
+                number of processes : above 1, the commands are cut in chunks encoded by a pool of processes which receive the labels
+                and the commands once, when they start, and the chunks are put back in order (the same machine code as with one process)
+
+        initWorker(labels, cmd, lineNumbers)
+            creates the Instruction of a worker process of encode
+
+            Parameters
+            ----------
+            labels, cmd, lineNumbers:
+                the attributes of the Instruction of the program
+
+        encodeChunk(start, size)
+            returns the machine instructions (an int array if they fit in 32 bits) and the references of some commands, in a worker process
+
+            Parameters
+            ----------
+            start: int
+                position of the first command
+            size: int
+                number of commands
+
+        encodeLine(sample, index)
+            returns the machine instruction of a command
+
+            Parameters
+            ----------
+            sample: string
+                the command, without blanks
+            index: int
+                position of the command in cmd
+
+        error(message, sample, index)
+            returns the AssemblyError of a command
+
+            Parameters
+            ----------
+            message: string
+                what is wrong
+            sample: string
+                the command
+            index: int
+                position of the command in cmd
     """
-    def __init__(self, labels, cmd):
+    # a register is "r" followed by a number from 0 to 31, an immediate value an integer in base 10 ;
+    # the jmp target is a label, a register or an integer, resolved in this order in encodeLine
+    SYNTAX = re.compile(r"""(?:
+        (add|sub|mul|div|and|or|xor|shl|shr|slt|sle|seq|load|store) r(0*(?:3[01]|[12]?[0-9])) ,
+            (?: r(0*(?:3[01]|[12]?[0-9])) | ([-+]?[0-9]+) ) , r(0*(?:3[01]|[12]?[0-9]))
+        | (jmp) ([^,]+) , r(0*(?:3[01]|[12]?[0-9]))
+        | (braz|branz) r(0*(?:3[01]|[12]?[0-9])) , (.+)
+        | (scall) ([-+]?[0-9]+)
+        | (stop)
+    )$""", re.VERBOSE)
+    REGISTER = re.compile(r"r(0*(?:3[01]|[12]?[0-9]))$")
+    INTEGER = re.compile(r"[-+]?[0-9]+$")
+    CHUNK = 16384
+    JMP_ADDRESS = 2**21 - 1
+    BRANCH_ADDRESS = 2**22 - 1
+    worker = None
+    NAME = re.compile(r"jmp|(?:stop|add|sub|mul|div|and|or|xor|shl|shr|slt|sle|seq|load|store|braz|branz|scall)(?=r[0-9]|[-+0-9]|$)")
+
+    def __init__(self, labels, cmd, lineNumbers = None):
         self.labels = labels
         self.cmd = cmd
+        self.lineNumbers = lineNumbers
         self.machineCode = []
+        self.references = []
         instruction_set = [    "stop", "add", "sub", "mul", "div", 
                                     "and", "or", "xor", "shl", "shr", 
                                     "slt", "sle", "seq", "load", "store",
@@ -210,78 +624,575 @@ class Instruction:
         if self.instructions.get(inst) is not None:
             return inst
         else:
-            print("Undefined instruction : ", inst)
-            exit()
+            raise AssemblyError("Undefined instruction", None, inst)
     
-    def encode(self):
-        for sample in self.cmd:
-            r = []
-            reg_nb = []
-            line_splited = sample.split(",")
-            if "jmp" in line_splited[0]:
-                inst = "jmp"
-                for key in self.labels:
-                    if key in line_splited[0]:
-                        cmd = 0
-                        break
-                    else:
-                        cmd = 1
+    def encode(self, jobs = 1):
+        self.references = []
+        if jobs <= 1 or len(self.cmd) < 2 * Instruction.CHUNK:
+            encodeLine = self.encodeLine
+            self.machineCode = [encodeLine(sample, index) for index, sample in enumerate(self.cmd)]
+            return
+
+        # a few chunks per process, so that the processes finish together
+        size = max(Instruction.CHUNK, -(-len(self.cmd) // (4 * jobs)))
+        starts = range(0, len(self.cmd), size)
+        self.machineCode = []
+        executor = ProcessPoolExecutor(max_workers = jobs, initializer = Instruction.initWorker, initargs = (self.labels, self.cmd, self.lineNumbers))
+        try:
+            for words, references in executor.map(Instruction.encodeChunk, starts, [size] * len(starts)):
+                self.machineCode.extend(words)
+                self.references += references
+        finally:
+            executor.shutdown(cancel_futures = True)
+
+    @staticmethod
+    def initWorker(labels, cmd, lineNumbers):
+        Instruction.worker = Instruction(labels, cmd, lineNumbers)
+
+    @staticmethod
+    def encodeChunk(start, size):
+        instruction = Instruction.worker
+        instruction.references = []
+        encodeLine = instruction.encodeLine
+        words = [encodeLine(sample, index) for index, sample in enumerate(instruction.cmd[start:start + size], start)]
+        try:
+            return array('I', words), instruction.references
+        except OverflowError:
+            return words, instruction.references
+
+    def encodeLine(self, sample, index):
+        match = Instruction.SYNTAX.match(sample)
+        if match is None:
+            if Instruction.NAME.match(sample) is None:
+                raise self.error("Undefined instruction", sample, index)
+            raise self.error("Invalid operands (the registers are r0 to r31)", sample, index)
+        alu, reg1, reg2, imm, reg3, jmp, target, jreg, branch, breg, label, scall, n, stop = match.groups()
+
+        if alu is not None:
+            if reg2 is not None:
+                return (self.instructions[alu]<<27) + (int(reg1)<<22) + (1<<21) + (int(reg2)<<5) + int(reg3)
+            return (self.instructions[alu]<<27) + (int(reg1)<<22) + ((int(imm) & (2**16 - 1))<<5) + int(reg3)
+        elif jmp is not None:
+            address = self.labels.get(target)
+            if address is not None:
+                if address > Instruction.JMP_ADDRESS:
+                    raise self.error("Label address out of range of jmp (" + str(address) + " > " + str(Instruction.JMP_ADDRESS) + ")", sample, index)
+                self.references.append((index, target))
+                return (15<<27) + (address<<5) + int(jreg)
+            register = Instruction.REGISTER.match(target)
+            if register is not None:
+                return (15<<27) + (1<<26) + (int(register.group(1))<<5) + int(jreg)
+            if Instruction.INTEGER.match(target) is None:
+                raise self.error("Undefined label " + target, sample, index)
+            return (15<<27) + ((int(target) & (2**16 - 1))<<5) + int(jreg)
+        elif branch is not None:
+            address = self.labels.get(label)
+            if address is None:
+                raise self.error("Undefined label " + label, sample, index)
+            if address > Instruction.BRANCH_ADDRESS:
+                raise self.error("Label address out of range of " + branch + " (" + str(address) + " > " + str(Instruction.BRANCH_ADDRESS) + ")", sample, index)
+            self.references.append((index, label))
+            return (self.instructions[branch]<<27) + (int(breg)<<22) + address
+        elif scall is not None:
+            return (18<<27) + int(n)
+        return 0
+
+    def error(self, message, sample, index):
+        return AssemblyError(message, self.lineNumbers[index] if self.lineNumbers is not None else None, sample)
+
+class AssemblyCache:
+    """
+    A class used to assemble a program again by re-encoding only the lines which changed since the previous assembly (--incremental)
+
+    The sidecar file (outputFile + ".cache") keeps the CRC32 of each line of the source, the lines holding an instruction, the machine code,
+    the labels (name, line and address) and the jmp, braz and branz encoded with the address of a label.
+    The new source is compared to these CRC32 : after each difference, the changed block ends at the closest place where RESYNC lines
+    are common again (within WINDOW lines), otherwise it goes on to the common last lines. Only the changed lines are parsed and encoded, the other instructions referring to a label which moved
+    get the new address of the label in their word. The output file is patched in place, and rewritten from the first moved instruction
+    when the number of instructions changes.
+    The sidecar starts with a 32 bytes header : the "IASC" magic, the format version (uint16), flags (uint16, BINARY for the binary output format),
+    the number of lines, of instructions, of labels and of references, the length of the JSON part and the CRC32 of the payload (uint32 each).
+    It is only used if it was written by the same assembler, for the same output format, and if the output file kept its size and modification time ;
+    otherwise, when more than half of the lines changed, or when a label looking like a register or an integer appears or disappears
+    (it would change the meaning of the unchanged jmp), the whole program is assembled again.
+
+    Attributes
+    ----------
+        assembler : object
+            the Assembler, with its source already read by openFile
+
+        fileName : string
+            name of the sidecar file
+
+        hashes : int array
+            CRC32 of each line of the source
+
+        produces : bytearray
+            1 for each line of the source holding an instruction, 0 for the others
+
+        words : int array
+            the machine code
+
+        names : string table
+            the labels, in the order of the source
+
+        labelLines, addresses : int array
+            line and address of each label of names
+
+        refIndices, refLabels : int array
+            position of each jmp, braz and branz encoded with the address of a label, in the order of the instructions, and the position of its label in names
+
+        changedLines, changedWords : int
+            number of lines of the source which changed and of instructions written in the output file by update
+
+        MAGIC : bytes
+            the first bytes of every sidecar file
+
+        VERSION : int
+            the version of the format written by this class
+
+        HEADER : object
+            the struct describing the header
+
+        BINARY : int
+            flag of the sidecar of a binary output file
+
+        CHUNK : int
+            number of lines compared at once when looking for the changed lines
+
+        RESYNC : int
+            number of common lines ending a changed block
+
+        CLOSE, WINDOW : int
+            the end of a changed block is looked for line by line within CLOSE lines, then with a dictionary within WINDOW lines
+
+    Methods
+    -------
+        update()
+            brings the output file up to date with the source and saves the sidecar, returns False if the whole program must be assembled instead,
+            raises AssemblyError for an invalid changed line or a label no longer defined
+
+        store()
+            saves the sidecar after the whole program has been assembled by the assembler
+
+        save()
+            writes the sidecar file
+
+        load()
+            returns the content of the sidecar file as a dictionary, None if it is missing, damaged or out of date
+
+        patch(words, writes, tailStart, oldCount)
+            writes instructions in the output file
+
+            Parameters
+            ----------
+            words: int array
+                the new machine code
+            writes: int table
+                positions of the instructions to write
+            tailStart: int
+                position from which every instruction is written and the file cut, None if the number of instructions did not change
+            oldCount: int
+                number of instructions of the output file
+
+        shift(values, offset)
+            returns the values increased by offset
+
+            Parameters
+            ----------
+            values: int array
+                lines or positions
+            offset: int
+                the shift, values itself is returned when it is 0
+
+        lineHashes(lines)
+            returns the CRC32 of each line
+
+            Parameters
+            ----------
+            lines: string table
+                lines of the source
+
+        diff(old, new)
+            returns the changed blocks as (first old line, end, first new line, end) tuples, the lines being counted from 0
+
+            Parameters
+            ----------
+            old, new: int array
+                CRC32 of the lines of the previous and of the new source
+
+        lineOf(produces, index)
+            returns the number of the line (counted from 1) holding an instruction
+
+            Parameters
+            ----------
+            produces: bytearray
+                the lines holding an instruction
+            index: int
+                position of the instruction
+    """
+    MAGIC = b"IASC"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIIIIII")
+    BINARY = 1
+    CHUNK = 4096
+    RESYNC = 4
+    CLOSE = 16
+    WINDOW = 4096
+    source = None
+
+    def __init__(self, assembler):
+        self.assembler = assembler
+        self.fileName = assembler.outputFile + ".cache"
+        self.hashes = None
+        self.produces = None
+        self.words = None
+        self.names = []
+        self.labelLines = None
+        self.addresses = None
+        self.refIndices = None
+        self.refLabels = None
+        self.changedLines = 0
+        self.changedWords = 0
+        if AssemblyCache.source is None:
+            file = open(__file__, "rb")
+            AssemblyCache.source = hashlib.sha1(file.read()).hexdigest()
+            file.close()
+
+    def update(self):
+        state = self.load()
+        if state is None:
+            return False
+        lines = self.assembler.inputFile
+        hashes = AssemblyCache.lineHashes(lines)
+        hunks = AssemblyCache.diff(state["hashes"], hashes)
+        self.changedLines = sum([newEnd - newFirst for oldFirst, oldEnd, newFirst, newEnd in hunks])
+        if self.changedLines > len(lines) // 2:
+            return False
+
+        # the unchanged parts are copied, the changed lines are parsed and get room in words
+        oldProduces = state["produces"]
+        oldWords = state["words"]
+        words = array('I')
+        produces = bytearray()
+        segments = []
+        texts = []
+        numbers = []
+        positions = []
+        definitions = []
+        tailStart = None
+        oldLine = 0
+        oldInstr = 0
+        for oldFirst, oldEnd, newFirst, newEnd in hunks + [(len(state["hashes"]), len(state["hashes"]), len(hashes), len(hashes))]:
+            count = oldProduces.count(1, oldLine, oldFirst)
+            # (first old line, end, line shift, first old instruction, end, instruction shift) of an unchanged part
+            segments.append((oldLine, oldFirst, newFirst - oldFirst, oldInstr, oldInstr + count, len(words) - oldInstr))
+            words += oldWords[oldInstr:oldInstr + count]
+            produces += oldProduces[oldLine:oldFirst]
+            oldInstr += count
+
+            hunkTexts, hunkNumbers, hunkDefinitions, hunkDirectives = Assembler.parseLines(lines[newFirst:newEnd], newFirst + 1)
+            if hunkDirectives:
+                # .global and .extern are checked against every label by a full assembly
+                return False
+            start = len(words)
+            flags = bytearray(newEnd - newFirst)
+            for number in hunkNumbers:
+                flags[number - 1 - newFirst] = 1
+            produces += flags
+            definitions.append([(label, number, start + index) for label, index, number in hunkDefinitions])
+            positions += range(start, start + len(hunkTexts))
+            texts += hunkTexts
+            numbers += hunkNumbers
+            removed = oldProduces.count(1, oldFirst, oldEnd)
+            if tailStart is None and removed != len(hunkTexts):
+                tailStart = start
+            words += array('I', [0]) * len(hunkTexts)
+            oldInstr += removed
+            oldLine = oldEnd
+
+        # the labels of the unchanged parts keep their order and move with their part, the labels of a block are added after its part
+        names = state["names"]
+        oldLines = state["labelLines"]
+        oldAddresses = state["addresses"]
+        refIndices = state["refIndices"]
+        newNames = []
+        labelLines = array('I')
+        addresses = array('I')
+        deltas = {}
+        bounds = []
+        for segment, (first, end, lineShift, firstInstr, endInstr, instrShift) in enumerate(segments):
+            a = bisect.bisect_left(oldLines, first + 1)
+            b = bisect.bisect_left(oldLines, end + 1)
+            bounds.append((a, b, bisect.bisect_left(refIndices, firstInstr), bisect.bisect_left(refIndices, endInstr)))
+            newNames += names[a:b]
+            labelLines += AssemblyCache.shift(oldLines[a:b], lineShift)
+            addresses += AssemblyCache.shift(oldAddresses[a:b], instrShift)
+            if instrShift != 0:
+                deltas.update(dict.fromkeys(range(a, b), instrShift))
+            for label, number, address in definitions[segment]:
+                newNames.append(label)
+                labelLines.append(number)
+                addresses.append(address)
+        labels = dict(zip(newNames, addresses))
+        if len(labels) != len(newNames):
+            seen = {}
+            for name, number in zip(newNames, labelLines):
+                if name in seen:
+                    raise AssemblyError("Label already defined at line " + self.assembler.lineName(seen[name]), number, name)
+                seen[name] = number
+        # the labels of the changed blocks which were removed, or defined again elsewhere
+        for (a, b, c, d), (e, f, g, h) in zip(bounds, bounds[1:]):
+            for ordinal in range(b, e):
+                address = labels.get(names[ordinal])
+                if address is None or address != oldAddresses[ordinal]:
+                    deltas[ordinal] = None if address is None else address - oldAddresses[ordinal]
+        for name in set(names).symmetric_difference(labels):
+            if Instruction.REGISTER.match(name) is not None or Instruction.INTEGER.match(name) is not None:
+                return False
+
+        instruction = Instruction(labels, texts, numbers)
+        encodeLine = instruction.encodeLine
+        for index, sample in enumerate(texts):
+            words[positions[index]] = encodeLine(sample, index)
+
+        # the unchanged instructions referring to a label which moved get its new address
+        ordinals = {name: ordinal for ordinal, name in enumerate(newNames)}
+        remap = None if newNames == names else [ordinals.get(name, 0) for name in names]
+        hunkReferences = [(positions[index], ordinals[label]) for index, label in instruction.references]
+        newIndices = array('I')
+        newLabels = array('I')
+        changed = set(positions)
+        position = 0
+        oldLabels = state["refLabels"]
+        for segment, (a, b, c, d) in enumerate(bounds):
+            first, end, lineShift, firstInstr, endInstr, instrShift = segments[segment]
+            if deltas:
+                for index, ordinal in zip(refIndices[c:d], oldLabels[c:d]):
+                    delta = deltas.get(ordinal, 0)
+                    if delta is None:
+                        number = AssemblyCache.lineOf(produces, index + instrShift)
+                        raise AssemblyError("Undefined label " + names[ordinal], number, Assembler.parseLines([lines[number - 1]])[0][0])
+                    if delta != 0:
+                        word = words[index + instrShift]
+                        if word >> 27 == 15:
+                            if ((word >> 5) & Instruction.JMP_ADDRESS) + delta > Instruction.JMP_ADDRESS:
+                                # the full assembly reports the label out of range
+                                return False
+                            words[index + instrShift] = word + (delta << 5)
+                        else:
+                            if (word & Instruction.BRANCH_ADDRESS) + delta > Instruction.BRANCH_ADDRESS:
+                                return False
+                            words[index + instrShift] = word + delta
+                        changed.add(index + instrShift)
+            newIndices += AssemblyCache.shift(refIndices[c:d], instrShift)
+            newLabels += oldLabels[c:d] if remap is None else array('I', [remap[ordinal] for ordinal in oldLabels[c:d]])
+            following = segments[segment + 1][3] + segments[segment + 1][5] if segment + 1 < len(segments) else len(words)
+            while position < len(hunkReferences) and hunkReferences[position][0] < following:
+                newIndices.append(hunkReferences[position][0])
+                newLabels.append(hunkReferences[position][1])
+                position += 1
+
+        writes = sorted([index for index in changed if tailStart is None or index < tailStart])
+        self.patch(words, writes, tailStart, len(oldWords))
+        self.changedWords = len(writes) + (len(words) - tailStart if tailStart is not None else 0)
+        self.hashes = hashes
+        self.produces = produces
+        self.words = words
+        self.names = newNames
+        self.labelLines = labelLines
+        self.addresses = addresses
+        self.refIndices = newIndices
+        self.refLabels = newLabels
+        self.assembler.labels = labels
+        self.assembler.labelLines = dict(zip(newNames, labelLines))
+        self.save()
+        return True
+
+    def store(self):
+        assembler = self.assembler
+        self.hashes = AssemblyCache.lineHashes(assembler.inputFile)
+        self.produces = bytearray(len(assembler.inputFile))
+        for number in assembler.lineNumbers:
+            self.produces[number - 1] = 1
+        try:
+            self.words = array('I', assembler.instructionsManager.machineCode)
+        except OverflowError:
+            # an instruction does not fit in 32 bits, the output file cannot be patched
+            if os.path.exists(self.fileName):
+                os.remove(self.fileName)
+            return
+        # the labels are defined in the order of the source
+        self.names = list(assembler.labels)
+        self.labelLines = array('I', [assembler.labelLines[name] for name in self.names])
+        self.addresses = array('I', [assembler.labels[name] for name in self.names])
+        ordinals = {name: ordinal for ordinal, name in enumerate(self.names)}
+        references = assembler.instructionsManager.references
+        self.refIndices = array('I', [index for index, label in references])
+        self.refLabels = array('I', [ordinals[label] for index, label in references])
+        self.save()
+
+    def save(self):
+        status = os.stat(self.assembler.outputFile)
+        header = json.dumps({"names": self.names, "source": AssemblyCache.source, "output": [status.st_size, status.st_mtime_ns]}).encode()
+        tables = [self.hashes, self.words, self.labelLines, self.addresses, self.refIndices, self.refLabels]
+        if sys.byteorder == "big":
+            tables = [array('I', table) for table in tables]
+            for table in tables:
+                table.byteswap()
+        payload = b"".join([tables[0].tobytes(), bytes(self.produces)] + [table.tobytes() for table in tables[1:]] + [header])
+
+        flags = AssemblyCache.BINARY if self.assembler.outputFormat == "binary" else 0
+        temporary = self.fileName + "." + str(os.getpid()) + ".tmp"
+        file = open(temporary, "wb")
+        file.write(AssemblyCache.HEADER.pack(AssemblyCache.MAGIC, AssemblyCache.VERSION, flags, len(self.hashes), len(self.words), len(self.names),
+                                             len(self.refIndices), len(header), zlib.crc32(payload)))
+        file.write(payload)
+        file.close()
+        os.replace(temporary, self.fileName)
+
+    def load(self):
+        try:
+            file = open(self.fileName, "rb")
+            content = file.read()
+            file.close()
+            status = os.stat(self.assembler.outputFile)
+        except OSError:
+            return None
+        if len(content) < AssemblyCache.HEADER.size:
+            return None
+        magic, version, flags, linesNb, wordsNb, labelsNb, referencesNb, headerSize, crc = AssemblyCache.HEADER.unpack_from(content, 0)
+        payload = memoryview(content)[AssemblyCache.HEADER.size:]
+        if (magic != AssemblyCache.MAGIC or version != AssemblyCache.VERSION or flags != (AssemblyCache.BINARY if self.assembler.outputFormat == "binary" else 0)
+                or len(payload) != 5 * linesNb + 4 * (wordsNb + 2 * labelsNb + 2 * referencesNb) + headerSize or zlib.crc32(payload) != crc):
+            return None
+        header = json.loads(bytes(payload[len(payload) - headerSize:]))
+        if header["source"] != AssemblyCache.source or header["output"] != [status.st_size, status.st_mtime_ns]:
+            return None
+
+        state = {"names": header["names"]}
+        position = 0
+        for name, size in [("hashes", linesNb), ("produces", linesNb), ("words", wordsNb), ("labelLines", labelsNb), ("addresses", labelsNb),
+                           ("refIndices", referencesNb), ("refLabels", referencesNb)]:
+            if name == "produces":
+                state[name] = bytearray(payload[position:position + size])
+                position += size
             else:
-                inst = line_splited[0].rsplit("r", 1)[0]
-            instr = 0
-            if inst == "stop":
-                instr += self.instructions.get(Instruction.instCheck(self, inst))<<27
-            elif inst == "braz" or inst == "branz":
-                instr += self.instructions.get(Instruction.instCheck(self, inst))<<27
-                instr += int(line_splited[0].rsplit("r", 1)[1])<<22
-                instr += int(self.labels.get(line_splited[1]))
-            elif "scall" in inst:
-                n = int(inst[5:])
-                instr += self.instructions.get(Instruction.instCheck(self, inst[:5]))<<27
-                instr += n
-            elif inst == "jmp":
-                if cmd == 1:
-                    try:
-                        reg_nb.append(int(line_splited[0].split("p")[1][1:]))
-                    except ValueError:
-                        reg_nb.append(int(line_splited[0].split("p")[1]) & (2**16 - 1))
-                        cmd = 0
-                else:
-                    label = line_splited[0][3:]
-                    reg_nb.append(self.labels.get(label))
-                reg_nb.append(int(line_splited[1][1:]))
-                instr += self.instructions.get(Instruction.instCheck(self, inst))<<27
-                instr += cmd<<26
-                instr += reg_nb[0]<<5
-                instr += reg_nb[1]
-            else :
-                r.append("r"+line_splited[0].rsplit("r", 1)[1])
-                r.append(line_splited[1])
-                r.append(line_splited[2])
-                reg_nb.append(int(r[0][1:]))
-                if "r" in r[1]:
-                    reg_nb.append(int(r[1][1:]))
-                    cmd = 1
-                else:
-                    nb = int(r[1])
-                    nb = nb & (2**16 - 1)
-                    reg_nb.append(nb)
-                    cmd = 0
-                reg_nb.append(int(r[2][1:]))
-                instr += self.instructions.get(Instruction.instCheck(self, inst))<<27
-                instr += int(reg_nb[0])<<22
-                instr += cmd<<21
-                instr += reg_nb[1]<<5
-                instr += reg_nb[2]
-            self.machineCode.append(instr)
+                state[name] = array('I')
+                state[name].frombytes(payload[position:position + 4 * size])
+                if sys.byteorder == "big":
+                    state[name].byteswap()
+                position += 4 * size
+        return state
+
+    def patch(self, words, writes, tailStart, oldCount):
+        file = open(self.assembler.outputFile, "r+b")
+        if self.assembler.outputFormat == "binary":
+            offset = BinaryProgram.HEADER.size
+            if len(words) != oldCount:
+                file.write(BinaryProgram.HEADER.pack(BinaryProgram.MAGIC, BinaryProgram.VERSION, 0, len(words)))
+            for index in writes:
+                file.seek(offset + 4 * index)
+                file.write(struct.pack("<I", words[index]))
+            if tailStart is not None:
+                tail = words[tailStart:]
+                if sys.byteorder == "big":
+                    tail.byteswap()
+                file.seek(offset + 4 * tailStart)
+                file.write(tail.tobytes())
+                file.truncate()
+        else:
+            # every line but the last one is 22 bytes long : "0x%08x 0x%08x" and a new line
+            for index in writes:
+                file.seek(22 * index)
+                file.write(b"0x%08x 0x%08x" % (index, words[index]))
+            if tailStart is not None:
+                tail = "\n".join(["0x%08x 0x%08x" % (index, words[index]) for index in range(tailStart, len(words))]).encode()
+                if tailStart > 0:
+                    file.seek(22 * tailStart - 1)
+                    if tail:
+                        file.write(b"\n")
+                file.write(tail)
+                file.truncate()
+        file.close()
+
+    @staticmethod
+    def shift(values, offset):
+        return values if offset == 0 else array('I', [value + offset for value in values])
+
+    @staticmethod
+    def lineHashes(lines):
+        return array('I', map(zlib.crc32, map(str.encode, lines)))
+
+    @staticmethod
+    def diff(old, new):
+        step = AssemblyCache.CHUNK
+        size = AssemblyCache.RESYNC
+        hunks = []
+        i = 0
+        j = 0
+        while True:
+            while i + step <= len(old) and j + step <= len(new) and old[i:i + step] == new[j:j + step]:
+                i += step
+                j += step
+            while i < len(old) and j < len(new) and old[i] == new[j]:
+                i += 1
+                j += 1
+            if i == len(old) or j == len(new):
+                break
+
+            # the changed block ends where RESYNC lines are common again, the closest such place is looked for first
+            found = None
+            for distance in range(1, 2 * AssemblyCache.CLOSE + 1):
+                for d in range(max(0, distance - AssemblyCache.CLOSE), min(distance, AssemblyCache.CLOSE) + 1):
+                    if old[i + d:i + d + size] == new[j + distance - d:j + distance - d + size] and i + d + size <= len(old):
+                        found = (d, distance - d)
+                        break
+                if found is not None:
+                    break
+            if found is None:
+                candidates = {}
+                for e in range(min(AssemblyCache.WINDOW, len(new) - j - size + 1)):
+                    candidates.setdefault(new[j + e:j + e + size].tobytes(), e)
+                for d in range(min(AssemblyCache.WINDOW, len(old) - i - size + 1)):
+                    if found is not None and d >= found[0] + found[1]:
+                        break
+                    e = candidates.get(old[i + d:i + d + size].tobytes())
+                    if e is not None and (found is None or d + e < found[0] + found[1]):
+                        found = (d, e)
+            if found is None:
+                break
+            hunks.append((i, i + found[0], j, j + found[1]))
+            i += found[0]
+            j += found[1]
+
+        # what remains is one block, without its common last lines
+        suffix = 0
+        while suffix < min(len(old) - i, len(new) - j) and old[len(old) - suffix - 1] == new[len(new) - suffix - 1]:
+            suffix += 1
+        if i < len(old) - suffix or j < len(new) - suffix:
+            hunks.append((i, len(old) - suffix, j, len(new) - suffix))
+        return hunks
+
+    @staticmethod
+    def lineOf(produces, index):
+        line = -1
+        for count in range(index + 1):
+            line = produces.index(1, line + 1)
+        return line + 1
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="This program transforms your assembly code into a machine language that can be simulated by the corresponding instruction set simulator.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC",formatter_class=argparse.RawTextHelpFormatter)
 
     parser.add_argument("-i", "--input_file", help=".asm input file", required=True)
     parser.add_argument("-o", "--output_file", help=".bin output file", required=True)
+    parser.add_argument("-f", "--format", help="format of the output file (default: text)\n - text : one \"address instruction\" line per instruction\n - binary : header followed by packed little-endian 32 bits words\n - object : machine code with the labels and the relocations, to combine with Linker.py", choices=["text", "binary", "object"], default="text")
+
+    parser.add_argument("-s", "--symbols", help="also save the labels in OUTPUT_FILE.sym, used by the profiler of the simulator", action="store_true")
+    parser.add_argument("-j", "--jobs", help="number of processes encoding the instructions of large programs (default: 1)", type=int, default=1)
+    parser.add_argument("--incremental", help="keep the state of the assembly in OUTPUT_FILE.cache, the next --incremental runs only re-encode the lines which changed and patch OUTPUT_FILE", action="store_true")
 
     args = parser.parse_args()
 
-    assembler = Assembler(args.input_file, args.output_file)
+    assembler = Assembler(args.input_file, args.output_file, args.format, args.symbols, args.incremental, args.jobs)
     assembler.run()
\ No newline at end of file
@@ -0,0 +1,242 @@
+try:
+    import argparse #pip install argparse
+    import hashlib
+    import os
+    import sys
+    from array import array
+    from InstructionsToMachineCode import Assembler, AssemblyError, Instruction, Performances
+    from BinaryFormat import ObjectFile
+except ImportError as error:
+    print(error)
+    exit()
+
+class LinkError(Exception):
+    """
+    A class used to report an error found while linking object files
+
+    Attributes
+    ----------
+        message : string
+            description of the error
+    """
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+class Linker:
+    """
+    A class used to combine object files (InstructionsToMachineCode.py -f object) into a program in machine language
+
+    The objects are placed one after the other in the order of the input files, the first one starting at address 0.
+    Each relocation of an object adds to its instruction the address where the object starts (for one of its labels),
+    or the address of the global label of another object (for an extern). A global label is defined by one object only.
+    An input file ending with .asm is assembled into an object first. With a cache directory, the object is kept in it,
+    indexed by the SHA-1 of the source (its included files being in their place) and of the assembler, so an unchanged source is not assembled again.
+
+    Attributes
+    ----------
+        inputFiles : string table
+            names of the object files (or assembly programs)
+
+        outputFile : string
+            name of the program in machine language
+
+        outputFormat : string
+            "text" or "binary", see Assembler
+
+        symbols : bool
+            if True, the global and local labels are also saved in outputFile.sym
+
+        cacheDir : string
+            directory of the objects assembled from .asm input files, None to assemble them at each link
+
+        objects : ObjectFile table
+            the objects, in the order of the input files
+
+        assembled, cached : int
+            number of .asm input files assembled and taken from the cache directory
+
+        performances : object
+            the timer of the link
+
+        source : string
+            SHA-1 of the source of the assembler, part of the key of the cached objects
+
+    Methods
+    -------
+        run()
+            links the input files, writes the program and displays some statistics
+
+        loadObject(fileName)
+            returns the object of an input file, assembled if it is an assembly program, raises LinkError if it is not a valid object file
+
+            Parameters
+            ----------
+            fileName: string
+                name of the input file
+
+        assembleObject(fileName)
+            returns the object of an assembly program, from the cache directory if it was already assembled, raises AssemblyError for an invalid program
+
+            Parameters
+            ----------
+            fileName: string
+                name of the assembly program
+
+        link()
+            returns the machine code and the labels (with their address in the program) of the objects, raises LinkError for a global label
+            defined twice, an extern which is not defined or a label address out of range of its jmp, braz or branz
+    """
+    source = None
+
+    def __init__(self, inputFiles, outputFile, outputFormat = "text", symbols = False, cacheDir = None):
+        self.inputFiles = inputFiles
+        self.outputFile = outputFile
+        self.outputFormat = outputFormat
+        self.symbols = symbols
+        self.cacheDir = cacheDir
+        self.objects = []
+        self.assembled = 0
+        self.cached = 0
+        self.performances = Performances()
+        if Linker.source is None:
+            hashes = hashlib.sha1()
+            for module in [Assembler, ObjectFile]:
+                file = open(sys.modules[module.__module__].__file__, "rb")
+                hashes.update(file.read())
+                file.close()
+            Linker.source = hashes.hexdigest()
+
+    def run(self):
+        print("Starting link!")
+        self.performances.timerStart()
+        try:
+            print(" - Reading objects...")
+            self.objects = [self.loadObject(fileName) for fileName in self.inputFiles]
+            self.performances.timerPhase("read")
+            print(" - Linking objects...")
+            words, labels = self.link()
+            self.performances.timerPhase("link")
+        except (AssemblyError, LinkError) as error:
+            print(error)
+            exit(1)
+        print(" - Saving machine code...")
+        assembler = Assembler(None, self.outputFile, self.outputFormat)
+        assembler.labels = labels
+        assembler.loadInFile(words)
+        if self.symbols:
+            assembler.loadSymbolsInFile()
+        self.performances.timerPhase("write")
+        self.performances.timerStop()
+        print("Done !\n")
+
+        print("Some statistics :")
+        print("Number of objects : ", len(self.objects), "(" + str(self.assembled) + " assembled, " + str(self.cached) + " from the cache)")
+        print("Number of instructions : ", len(words))
+        print("Number of labels : ", len(labels))
+        print("Link duration : " + str(round(self.performances.elapsed, 3)) + " second(s)")
+        for phase, duration in self.performances.phases.items():
+            print(" - " + phase + " : " + str(round(duration, 3)) + " second(s)")
+        print("")
+
+    def loadObject(self, fileName):
+        if fileName.endswith(".asm"):
+            return self.assembleObject(fileName)
+        try:
+            objectFile = ObjectFile.read(fileName)
+        except OSError as error:
+            raise LinkError("Cannot read the object file " + fileName + " (" + str(error) + ")")
+        if objectFile is None:
+            raise LinkError("Invalid object file : " + fileName + " (assemble it with InstructionsToMachineCode.py -f object)")
+        return objectFile
+
+    def assembleObject(self, fileName):
+        assembler = Assembler(fileName, None, "object")
+        try:
+            assembler.openFile(fileName)
+            cacheFile = None
+            if self.cacheDir is not None:
+                key = hashlib.sha1(Linker.source.encode())
+                key.update("".join(assembler.inputFile).encode())
+                cacheFile = os.path.join(self.cacheDir, key.hexdigest() + ".obj")
+                if os.path.exists(cacheFile):
+                    objectFile = ObjectFile.read(cacheFile)
+                    # a damaged object is assembled again
+                    if objectFile is not None:
+                        self.cached += 1
+                        return objectFile
+
+            assembler.lookForLabelsAndInstrs()
+            instructions = Instruction(assembler.encodingLabels(), assembler.lines, assembler.lineNumbers)
+            instructions.encode()
+        except AssemblyError as error:
+            raise AssemblyError(assembler.errorText(error, fileName))
+        except OSError as error:
+            raise LinkError("Cannot read the assembly program " + fileName + " (" + str(error) + ")")
+        objectFile = ObjectFile(instructions.machineCode, assembler.labels, assembler.globals, assembler.externs, instructions.references)
+        self.assembled += 1
+
+        if cacheFile is not None:
+            os.makedirs(self.cacheDir, exist_ok = True)
+            # the object is renamed over the entry, so that another link only reads complete objects
+            temporary = cacheFile + "." + str(os.getpid()) + ".tmp"
+            objectFile.write(temporary)
+            os.replace(temporary, cacheFile)
+        return objectFile
+
+    def link(self):
+        bases = []
+        globals = {}
+        owners = {}
+        base = 0
+        for fileName, objectFile in zip(self.inputFiles, self.objects):
+            bases.append(base)
+            for name in objectFile.globals:
+                if name in globals:
+                    raise LinkError("Global label " + name + " defined in " + owners[name] + " and in " + fileName)
+                globals[name] = base + objectFile.labels[name]
+                owners[name] = fileName
+            base += len(objectFile.words)
+
+        words = array('I')
+        labels = {}
+        for fileName, objectFile, base in zip(self.inputFiles, self.objects, bases):
+            start = len(words)
+            words += array('I', objectFile.words)
+            for index, label in objectFile.relocations:
+                address = objectFile.labels.get(label)
+                if address is not None:
+                    delta = base
+                elif label in globals:
+                    delta = globals[label]
+                else:
+                    raise LinkError("Undefined external label " + label + " in " + fileName)
+                word = words[start + index]
+                # jmp keeps the address above the register, braz and branz in the low bits
+                if word >> 27 == 15:
+                    shift, highest = 5, Instruction.JMP_ADDRESS
+                else:
+                    shift, highest = 0, Instruction.BRANCH_ADDRESS
+                address = ((word >> shift) & highest) + delta
+                if address > highest:
+                    raise LinkError("Address of the label " + label + " out of range of the instruction " + str(index) + " of " + fileName
+                                    + " once linked (" + str(address) + " > " + str(highest) + ")")
+                words[start + index] = (word & ~(highest << shift)) | (address << shift)
+            for name, address in objectFile.labels.items():
+                # the local labels of two objects may have the same name, the first one is kept
+                labels.setdefault(name, base + address)
+        return words, labels
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program links object files (InstructionsToMachineCode.py -f object) or assembly programs into a machine language program that can be simulated by the instruction set simulator.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-i", "--input_files", help=".obj (or .asm) input files, placed in this order in the program", nargs="+", required=True)
+    parser.add_argument("-o", "--output_file", help=".bin output file", required=True)
+    parser.add_argument("-f", "--format", help="format of the output file (default: text)\n - text : one \"address instruction\" line per instruction\n - binary : header followed by packed little-endian 32 bits words", choices=["text", "binary"], default="text")
+    parser.add_argument("-s", "--symbols", help="also save the labels in OUTPUT_FILE.sym, used by the profiler of the simulator", action="store_true")
+    parser.add_argument("--cache-dir", help="keep the objects of the .asm input files in CACHE_DIR, an unchanged .asm file is not assembled again")
+
+    args = parser.parse_args()
+
+    linker = Linker(args.input_files, args.output_file, args.format, args.symbols, args.cache_dir)
+    linker.run()
@@ -0,0 +1,342 @@
+try:
+    import contextlib
+    import hashlib
+    import io
+    import json
+    import os
+    import struct
+    import sys
+    import zlib
+    from array import array
+except ImportError as error:
+    print(error)
+    exit()
+
+class ResultCache:
+    """
+    A class used to keep the results of deterministic simulations in a directory, so that running again the same simulation does not execute it
+
+    An entry is indexed by the SHA-256 of everything the result depends on : the source of the virtual machine, the machine code, the initial registers,
+    the options of the memory, of the cache, of the timing model and of the branch predictor, the limits of the watchdog and the values read by scall 0.
+    It holds the report, the statistics and the console output of the run (with its SHA-1, the output digest), the final pc, cycles, registers and memory pages,
+    and the values kept by scall 1. The file of an entry starts with a 16 bytes header : the "IRES" magic, the format version (uint16), flags reserved
+    for later use (uint16), the length of the payload (uint32) and its CRC32 (uint32). The payload is compressed with zlib.
+    The entries are written in a temporary file renamed over the entry, so that the processes sharing the directory only read complete entries,
+    a damaged entry being a miss. A hit updates the modification time of the entry, the least recently used entries are removed when the directory
+    gets bigger than maxSize.
+
+    Attributes
+    ----------
+        directory : string
+            the directory of the entries, created if needed
+
+        maxSize : int
+            number of bytes of entries kept in the directory
+
+        hits, stores : int
+            number of simulations taken from the directory and stored in it by this object
+
+        MAGIC : bytes
+            the first bytes of every entry
+
+        VERSION : int
+            the version of the format written by this class
+
+        HEADER : object
+            the struct describing the header of an entry
+
+        sources : dictionary
+            SHA-1 of the source files of the virtual machine, indexed by file name
+
+    Methods
+    -------
+        cacheable(vm)
+            returns True if the result of a virtual machine only depends on its key : nothing is traced, saved or profiled during the run,
+            scall 0 is not read on the console, no scall is replaced by a callback and the watchdog has no timeout
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        key(vm)
+            returns the key of the simulation of a virtual machine which has not started yet
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        run(vm)
+            restores the result of the simulation when it is in the cache, otherwise executes it and stores its result,
+            then displays the output and the statistics and writes the report like VirtualMachine.run
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        entry(vm, output)
+            returns the entry of a virtual machine which has been executed
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+            output: string
+                what was displayed during the run
+
+        restore(vm, entry)
+            sets the virtual machine in the final state of an entry
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+            entry: dictionary
+                the entry read by load
+
+        load(key)
+            returns the entry of a key, None when it is missing or damaged
+
+            Parameters
+            ----------
+            key: string
+                the key of the simulation
+
+        store(key, entry)
+            writes an entry and removes the least recently used ones if the directory is too big
+
+            Parameters
+            ----------
+            key: string
+                the key of the simulation
+            entry: dictionary
+                the entry returned by entry()
+
+        evict()
+            removes the least recently used entries until the directory holds at most 90% of maxSize
+    """
+    MAGIC = b"IRES"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHII")
+    sources = {}
+
+    def __init__(self, directory, maxSize = 512 * 1024 * 1024):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.hits = 0
+        self.stores = 0
+        os.makedirs(directory, exist_ok = True)
+
+    @staticmethod
+    def cacheable(vm):
+        return (vm.trace in ("none", "summary") and not vm.step_by_step and vm.profiler is None and vm.checkpoint is None and vm.resume is None
+                and vm.traceWriter is None and (vm.watchdog is None or vm.watchdog.timeout is None)
+                and len(vm.scalls) == 2 and vm.scalls[0] is type(vm).readInput and vm.scalls[1] is type(vm).writeOutput
+                and (vm.inputs is not None or not any([(op & 63) >> 1 == 18 and reg1 == 0 for op, reg1, reg2, reg3 in vm.decoded])))
+
+    def key(self, vm):
+        files = [sys.modules[type(vm).__module__].__file__, __file__]
+        for fileName in files:
+            if fileName not in ResultCache.sources:
+                file = open(fileName, "rb")
+                ResultCache.sources[fileName] = hashlib.sha1(file.read()).hexdigest()
+                file.close()
+
+        symbols = None
+        if vm.watchdog is not None and vm.symbols is not None:
+            # the labels name the pc where the watchdog stopped the simulation in the report
+            file = open(vm.symbols, "rb")
+            symbols = hashlib.sha1(file.read()).hexdigest()
+            file.close()
+
+        parts = {   "sources": [ResultCache.sources[fileName] for fileName in files],
+                    "program": vm.programHash(),
+                    "regs": list(vm.regs),
+                    "options": vm.checkpointOptions(),
+                    "predictor": vm.predictor.description() if vm.predictor is not None else None,
+                    "watchdog": [vm.watchdog.maxSteps, vm.watchdog.maxCycles, vm.watchdog.detectLoops] if vm.watchdog is not None else None,
+                    "symbols": symbols,
+                    "inputs": list(vm.inputs) if vm.inputs is not None else None,
+                    "outputs": vm.outputs is not None    }
+        return hashlib.sha256(json.dumps(parts, sort_keys = True).encode()).hexdigest()
+
+    def run(self, vm):
+        key = self.key(vm)
+        entry = self.load(key)
+        if entry is None:
+            recorder = OutputRecorder(sys.stdout)
+            with contextlib.redirect_stdout(recorder):
+                vm.execute()
+            entry = self.entry(vm, recorder.getvalue())
+            self.store(key, entry)
+            self.stores += 1
+            state = "stored"
+        else:
+            self.restore(vm, entry)
+            sys.stdout.write(entry["output"])
+            self.hits += 1
+            state = "hit"
+
+        if vm.trace != "none":
+            print("Result cache : " + state + " " + key[:16] + " (output digest " + entry["digest"][:16] + ")")
+            sys.stdout.write(entry["statistics"])
+        file = open(vm.outputFile, "w")
+        file.write(entry["report"])
+        file.close()
+        if vm.stdout_file is not None:
+            vm.saveOutputs()
+
+    def entry(self, vm, output):
+        report = io.StringIO()
+        vm.writeReport(report)
+        statistics = io.StringIO()
+        with contextlib.redirect_stdout(statistics):
+            vm.showStatistics()
+        watchdog = vm.watchdog
+        return {"report": report.getvalue(), "statistics": statistics.getvalue(), "output": output, "digest": hashlib.sha1(output.encode()).hexdigest(),
+                "pc": vm.pc, "running": vm.running, "cycles": vm.performances.cycles, "elapsed": vm.performances.elapsed,
+                "outputs": vm.outputs,
+                "watchdog": [watchdog.steps, watchdog.reason, watchdog.status, watchdog.stopPc] if watchdog is not None else None,
+                "regs": array('i', vm.regs), "pages": vm.dataMemory.dirtyPages(None)}
+
+    def restore(self, vm, entry):
+        vm.pc = entry["pc"]
+        vm.running = entry["running"]
+        vm.performances.cycles = entry["cycles"]
+        vm.performances.elapsed = entry["elapsed"]
+        vm.regs[:] = entry["regs"]
+        for number, values in entry["pages"].items():
+            vm.dataMemory.loadPage(number, values)
+        if entry["outputs"] is not None:
+            vm.outputs = entry["outputs"]
+        if entry["watchdog"] is not None:
+            vm.watchdog.steps, vm.watchdog.reason, vm.watchdog.status, vm.watchdog.stopPc = entry["watchdog"]
+
+    def load(self, key):
+        fileName = os.path.join(self.directory, key + ".res")
+        try:
+            file = open(fileName, "rb")
+            content = file.read()
+            file.close()
+        except OSError:
+            return None
+        if len(content) < ResultCache.HEADER.size:
+            return None
+        magic, version, flags, length, crc = ResultCache.HEADER.unpack_from(content, 0)
+        payload = content[ResultCache.HEADER.size:]
+        if magic != ResultCache.MAGIC or version > ResultCache.VERSION or len(payload) != length or zlib.crc32(payload) != crc:
+            return None
+
+        data = zlib.decompress(payload)
+        size = struct.unpack_from("<I", data, 0)[0]
+        entry = json.loads(data[4:4 + size].decode())
+        position = 4 + size
+        count = struct.unpack_from("<I", data, position)[0]
+        entry["regs"] = array('i', data[position + 4:position + 4 + 4 * count])
+        position += 4 + 4 * count
+        entry["pages"] = {}
+        while position < len(data):
+            number, count = struct.unpack_from("<II", data, position)
+            entry["pages"][number] = array('i', data[position + 8:position + 8 + 4 * count])
+            position += 8 + 4 * count
+        if sys.byteorder == "big":
+            entry["regs"].byteswap()
+            for page in entry["pages"].values():
+                page.byteswap()
+
+        try:
+            # the modification time orders the entries for the eviction
+            os.utime(fileName)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, key, entry):
+        header = json.dumps({name: value for name, value in entry.items() if name not in ("regs", "pages")}).encode()
+        regs = array('i', entry["regs"])
+        if sys.byteorder == "big":
+            regs.byteswap()
+        parts = [struct.pack("<I", len(header)), header, struct.pack("<I", len(regs)), regs.tobytes()]
+        for number in sorted(entry["pages"]):
+            page = array('i', entry["pages"][number])
+            if sys.byteorder == "big":
+                page.byteswap()
+            parts += [struct.pack("<II", number, len(page)), page.tobytes()]
+        payload = zlib.compress(b"".join(parts))
+
+        fileName = os.path.join(self.directory, key + ".res")
+        temporary = fileName + "." + str(os.getpid()) + ".tmp"
+        file = open(temporary, "wb")
+        file.write(ResultCache.HEADER.pack(ResultCache.MAGIC, ResultCache.VERSION, 0, len(payload), zlib.crc32(payload)) + payload)
+        file.close()
+        os.replace(temporary, fileName)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for item in os.scandir(self.directory):
+            if item.name.endswith(".res"):
+                try:
+                    status = item.stat()
+                except OSError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, item.path))
+                total += status.st_size
+        if total <= self.maxSize:
+            return
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxSize * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already removed by another process
+                pass
+            total -= size
+
+class OutputRecorder:
+    """
+    A class used to display the text written on the console while keeping a copy of it
+
+    Attributes
+    ----------
+        stream : object
+            the console where the text is written
+
+        copy : object
+            the StringIO keeping the text
+
+    Methods
+    -------
+        write(text)
+            writes text on the console and in the copy
+
+            Parameters
+            ----------
+            text: string
+                the text written
+
+        flush()
+            flushes the console
+
+        getvalue()
+            returns the text written so far
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.copy = io.StringIO()
+
+    def write(self, text):
+        self.copy.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def getvalue(self):
+        return self.copy.getvalue()
@@ -0,0 +1,178 @@
+try:
+    import argparse #pip install argparse
+    import json
+    import os
+    import socket
+    import time # pip install times
+except ImportError as error:
+    print(error)
+    exit()
+
+class SimulationClient:
+    """
+    A class used to send assemble and run requests to a SimulationServer
+
+    Only the standard library is imported, so starting the client does not pay for the simulator itself.
+    The connection is opened by the first request and kept for the next ones.
+
+    Attributes
+    ----------
+        socketPath : string
+            path of the Unix socket of the server
+
+        connection : object
+            the socket connected to the server, None before the first request
+
+        answers : object
+            the file reading the answers of the server
+
+    Methods
+    -------
+        request(request)
+            sends a request and returns the answer of the server, raises ConnectionError without server or if it closed the connection
+
+            Parameters
+            ----------
+            request : dictionary
+                the request, see SimulationServer
+
+        run(program, nb_registers, memory_size, registers_init_file, engine, overflow, memory_model, cache, inputs)
+            returns the answer of a run request, the paths are made absolute for the server
+
+            Parameters
+            ----------
+            program : string
+                name of the file of the program in machine language
+            nb_registers, memory_size : int
+                number of registers and of memory slots
+            registers_init_file : string
+                name of the file initialising the registers, None to start with zeros
+            engine, overflow, memory_model : string
+                options of the virtual machine
+            cache : string
+                SETS,WAYS,LINE_SIZE of the cache, None without cache
+            inputs : int table
+                values read by scall 0 (the values displayed by scall 1 are then in the report), None if the program does not read any value :
+                the server cannot ask them on a console, a scall 0 without input value is an error
+
+        assemble(input_file, output_file, output_format, symbols)
+            returns the answer of an assemble request, the paths are made absolute for the server
+
+            Parameters
+            ----------
+            input_file, output_file : string
+                names of the assembly program and of the machine code file
+            output_format : string
+                "text" or "binary"
+            symbols : bool
+                if True, the labels are also saved in output_file.sym
+
+        close()
+            closes the connection
+    """
+    def __init__(self, socketPath):
+        self.socketPath = socketPath
+        self.connection = None
+        self.answers = None
+
+    def request(self, request):
+        if self.connection is None:
+            self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.connection.connect(self.socketPath)
+            except OSError as error:
+                self.connection.close()
+                self.connection = None
+                raise ConnectionError("No simulation server on " + self.socketPath + " (" + str(error) + "), start it with python SimulationServer.py")
+            self.answers = self.connection.makefile("rb")
+        try:
+            self.connection.sendall((json.dumps(request) + "\n").encode())
+            line = self.answers.readline()
+        except OSError:
+            line = None
+        if not line:
+            self.close()
+            raise ConnectionError("The simulation server closed the connection")
+        return json.loads(line)
+
+    def run(self, program, nb_registers, memory_size, registers_init_file = None, engine = "interp", overflow = "trap", memory_model = "flat", cache = None, inputs = None):
+        return self.request({"command": "run", "program": os.path.abspath(program), "nb_registers": nb_registers, "memory_size": memory_size,
+                             "registers_init_file": os.path.abspath(registers_init_file) if registers_init_file is not None else None,
+                             "engine": engine, "overflow": overflow, "memory_model": memory_model, "cache": cache, "inputs": inputs})
+
+    def assemble(self, input_file, output_file, output_format = "text", symbols = False):
+        return self.request({"command": "assemble", "input_file": os.path.abspath(input_file), "output_file": os.path.abspath(output_file),
+                             "format": output_format, "symbols": symbols})
+
+    def close(self):
+        if self.connection is not None:
+            self.answers.close()
+            self.connection.close()
+            self.connection = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program sends a simulation (or with -A an assembly) to the simulation server, with the options of VirtualMachineProgram.py (or InstructionsToMachineCode.py).", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-S", "--socket", help="path of the Unix socket of the server (default: simulation.sock)", default="simulation.sock")
+    parser.add_argument("-A", "--assemble", help="assemble INPUT_FILE (.asm) into OUTPUT (.bin) instead of simulating it", action="store_true")
+    parser.add_argument("-i", "--input_file", help=".bin input file (.asm with -A)", required=True)
+    parser.add_argument("-o", "--output", help="output directory of the report (output file with -A)")
+    parser.add_argument("-r", "--nb_registers", help="number of registers available", type=int)
+    parser.add_argument("-m", "--memory_size", help="number of memory slots available", type=int)
+    parser.add_argument("-ri", "--registers_init_file", help=".txt file to init registers value")
+    parser.add_argument("-e", "--engine", help="execution engine (default: interp)", default="interp")
+    parser.add_argument("-ov", "--overflow", help="overflow policy (default: trap)", default="trap")
+    parser.add_argument("-mm", "--memory-model", help="organisation of the data memory (default: flat)", default="flat")
+    parser.add_argument("-c", "--cache", help="SETS,WAYS,LINE_SIZE of a cache between load/store and the data memory")
+    parser.add_argument("--stdin-file", help="values read by scall 0 (integers separated by spaces or lines), the values displayed by scall 1 are written in the report")
+    parser.add_argument("-f", "--format", help="with -A, format of the output file (default: text)", choices=["text", "binary"], default="text")
+    parser.add_argument("--symbols", help="with -A, also save the labels in OUTPUT.sym", action="store_true")
+    parser.add_argument("-t", "--trace", help="console output (default: summary)\n - none : only the report file\n - summary : statistics at the end", choices=["none", "summary"], default="summary")
+
+    args = parser.parse_args()
+    if args.assemble and args.output is None:
+        parser.error("the output file (-o) is needed to assemble")
+    if not args.assemble and (args.nb_registers is None or args.memory_size is None):
+        parser.error("the number of registers (-r) and of memory slots (-m) are needed to simulate")
+    client = SimulationClient(args.socket)
+
+    if args.assemble:
+        try:
+            answer = client.assemble(args.input_file, args.output, args.format, args.symbols)
+        except ConnectionError as error:
+            print(error)
+            exit(1)
+        client.close()
+        if answer["status"] != "ok":
+            print(answer["message"])
+            exit(1)
+        if args.trace != "none":
+            print("Number of instructions : ", answer["instructions"])
+            print("Number of labels : ", answer["labels"])
+            print("Traduction duration : " + str(round(answer["duration"], 3)) + " second(s)")
+        exit()
+
+    inputs = None
+    if args.stdin_file is not None:
+        file = open(args.stdin_file, "r")
+        inputs = [int(value, 0) for value in file.read().split()]
+        file.close()
+    try:
+        answer = client.run(args.input_file, args.nb_registers, args.memory_size, args.registers_init_file, args.engine, args.overflow, args.memory_model, args.cache, inputs)
+    except ConnectionError as error:
+        print(error)
+        exit(1)
+    client.close()
+    print(answer["output"], end = "")
+    if answer["status"] != "ok":
+        exit(1)
+
+    output_name = "vm_" + time.strftime("%Y_%m_%d-%H_%M_%S") + ".txt"
+    file = open(output_name if args.output is None else str(args.output) + "/" + output_name, "w")
+    file.write(answer["report"])
+    file.close()
+    if args.trace != "none":
+        print("Some statistics :")
+        print("Simulation duration : " + str(round(answer["duration"], 3)) + " second(s)")
+        print("Number of machine cycle(s) : " + str(answer["cycles"]))
+        print("Instruction processing frequency : " + str(round(answer["cycles"] / answer["duration"], 3)) + " Hz")
@@ -0,0 +1,268 @@
+try:
+    import argparse #pip install argparse
+    import asyncio
+    import contextlib
+    import hashlib
+    import io
+    import json
+    import os
+    import time # pip install times
+    from array import array
+    from collections import OrderedDict
+    from concurrent.futures import ProcessPoolExecutor
+    from VirtualMachineProgram import VirtualMachine, Program, Cache, SimulationError
+    from InstructionsToMachineCode import Assembler
+except ImportError as error:
+    print(error)
+    exit()
+
+class SimulationServer:
+    """
+    A class used to answer assemble and run requests on a Unix socket, from a pool of worker processes kept alive
+
+    A request is a JSON object on one line, the answer is a JSON object on one line, in the order of the requests of the connection :
+        {"command": "run", "program": path, "nb_registers": int, "memory_size": int [, "registers_init_file", "engine", "overflow", "memory_model", "cache", "inputs"]}
+            answers the status, the cycles, the duration, the report written by VirtualMachine.loadInFile and the output of the scall instructions,
+            with "inputs" (the values read by scall 0) the values displayed by scall 1 are in the report and in "outputs".
+            A worker process has no console : without "inputs", a scall 0 stops the simulation with the error "No more input values for scall 0"
+        {"command": "assemble", "input_file": path, "output_file": path [, "format": "text" or "binary", "symbols": bool]}
+            answers the status, the number of instructions and of labels and the duration
+    The paths are read by the server, they must be absolute or relative to its directory.
+    Each worker process keeps the programs it loaded and decoded, and the machine code it assembled, in LRU caches indexed by the SHA-1 of the file,
+    so a program already seen by the worker is neither read again nor decoded again.
+
+    Attributes
+    ----------
+        socketPath : string
+            path of the Unix socket
+
+        workersNb : int
+            number of worker processes
+
+        cacheSize : int
+            number of programs (and of assembled files) kept by each worker process
+
+        requests : int
+            number of requests answered
+
+        programs : OrderedDict
+            the programs decoded by the current worker process, indexed by SHA-1, the most recently used last
+
+        assembled : OrderedDict
+            the machine code and labels assembled by the current worker process, indexed by SHA-1 of the source (its included files being in their place) and output format
+
+    Methods
+    -------
+        run()
+            listens on the socket until interrupted
+
+        serve()
+            coroutine creating the pool of workers and the server of the socket
+
+        handle(reader, writer)
+            coroutine answering the requests of a connection
+
+            Parameters
+            ----------
+            reader : object
+                the asyncio stream of the requests
+            writer : object
+                the asyncio stream of the answers
+
+        initWorker(cacheSize)
+            sets the size of the caches of a worker process
+
+            Parameters
+            ----------
+            cacheSize : int
+                number of entries of each cache
+
+        cached(cache, key, load)
+            returns the entry of a cache, calling load() to create it when it is missing and removing the least recently used entry when the cache is full
+
+            Parameters
+            ----------
+            cache : OrderedDict
+                programs or assembled
+            key : string
+                SHA-1 of the file
+            load : function
+                returns the entry to cache
+
+        runJob(request)
+            runs a simulation in the current worker process and returns the answer
+
+            Parameters
+            ----------
+            request : dictionary
+                the run request
+
+        assembleJob(request)
+            assembles a program in the current worker process and returns the answer
+
+            Parameters
+            ----------
+            request : dictionary
+                the assemble request
+    """
+    programs = OrderedDict()
+    assembled = OrderedDict()
+    cacheSize = 256
+
+    def __init__(self, socketPath, workersNb = None, cacheSize = 256):
+        self.socketPath = socketPath
+        self.workersNb = workersNb if workersNb is not None else os.cpu_count()
+        self.cacheSize = cacheSize
+        self.requests = 0
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(self.socketPath):
+                os.remove(self.socketPath)
+        print(str(self.requests) + " request(s) answered")
+
+    async def serve(self):
+        # a socket left by a server which did not stop cleanly
+        if os.path.exists(self.socketPath):
+            os.remove(self.socketPath)
+        self.executor = ProcessPoolExecutor(max_workers = self.workersNb, initializer = SimulationServer.initWorker, initargs = (self.cacheSize,))
+        server = await asyncio.start_unix_server(self.handle, path = self.socketPath)
+        print("Listening on " + self.socketPath + " with " + str(self.workersNb) + " worker process(es)")
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                command = request.get("command")
+            except (ValueError, AttributeError):
+                request, command = None, None
+
+            if command == "run":
+                answer = await loop.run_in_executor(self.executor, SimulationServer.runJob, request)
+            elif command == "assemble":
+                answer = await loop.run_in_executor(self.executor, SimulationServer.assembleJob, request)
+            else:
+                answer = {"status": "error", "message": "Unknown request (expected a JSON object with the command run or assemble)"}
+            self.requests += 1
+            writer.write((json.dumps(answer) + "\n").encode())
+            await writer.drain()
+        writer.close()
+
+    @staticmethod
+    def initWorker(cacheSize):
+        SimulationServer.cacheSize = cacheSize
+
+    @staticmethod
+    def cached(cache, key, load):
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        entry = load()
+        cache[key] = entry
+        if len(cache) > SimulationServer.cacheSize:
+            cache.popitem(last = False)
+        return entry
+
+    @staticmethod
+    def runJob(request):
+        output = io.StringIO()
+        answer = {"status": "ok"}
+        try:
+            with contextlib.redirect_stdout(output):
+                file = open(request["program"], "rb")
+                key = hashlib.sha1(file.read()).hexdigest()
+                file.close()
+
+                def load():
+                    program = Program.load(request["program"])
+                    # the cached program must not follow the mapped file if it is written again
+                    program.words = array('I', program.words)
+                    return program
+                program = SimulationServer.cached(SimulationServer.programs, key, load)
+
+                cache = None
+                if request.get("cache") is not None:
+                    cache = Cache.parseGeometry(request["cache"])
+
+                vm = VirtualMachine(request["program"], None, int(request["nb_registers"]), int(request["memory_size"]), request.get("registers_init_file"),
+                                    trace = "none", engine = request.get("engine", "interp"), overflow = request.get("overflow", "trap"),
+                                    memory_model = request.get("memory_model", "flat"), cache = cache, program = program,
+                                    inputs = request.get("inputs") or [], capture_outputs = request.get("inputs") is not None)
+                vm.execute()
+                report = io.StringIO()
+                vm.writeReport(report)
+            answer["cycles"] = vm.performances.cycles
+            answer["duration"] = vm.performances.elapsed
+            answer["report"] = report.getvalue()
+            if vm.outputs is not None:
+                answer["outputs"] = vm.outputs
+        except SystemExit:
+            answer["status"] = "error"
+        except SimulationError as error:
+            answer["status"] = "error"
+            output.write(str(error) + "\n")
+        except Exception as error:
+            answer["status"] = "error"
+            output.write(type(error).__name__ + " : " + str(error) + "\n")
+
+        answer["output"] = output.getvalue()
+        if answer["status"] == "error":
+            answer["message"] = output.getvalue().strip().split("\n")[-1]
+        return answer
+
+    @staticmethod
+    def assembleJob(request):
+        output = io.StringIO()
+        answer = {"status": "ok"}
+        try:
+            with contextlib.redirect_stdout(output):
+                start = time.perf_counter()
+                outputFormat = request.get("format", "text")
+                assembler = Assembler(request["input_file"], request["output_file"], outputFormat, request.get("symbols", False))
+                file = open(request["input_file"], "r")
+                source = file.read()
+                file.close()
+                # the key covers the included files, which are relative to the directory of the program
+                assembler.readSource(source.splitlines(True), request["input_file"])
+                key = hashlib.sha1("".join(assembler.inputFile).encode()).hexdigest() + "-" + outputFormat
+
+                machineCode, labels = SimulationServer.cached(SimulationServer.assembled, key, lambda: Assembler.assemble(source, request["input_file"]))
+
+                assembler.labels = labels
+                assembler.loadInFile(machineCode)
+                if assembler.symbols:
+                    assembler.loadSymbolsInFile()
+            answer["instructions"] = len(machineCode)
+            answer["labels"] = len(labels)
+            answer["duration"] = time.perf_counter() - start
+        except SystemExit:
+            answer["status"] = "error"
+        except Exception as error:
+            answer["status"] = "error"
+            output.write(type(error).__name__ + " : " + str(error) + "\n")
+
+        if answer["status"] == "error":
+            answer["message"] = output.getvalue().strip().split("\n")[-1]
+        return answer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program keeps worker processes and decoded programs in memory to answer assemble and run requests sent on a Unix socket (see SimulationClient.py).", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-S", "--socket", help="path of the Unix socket (default: simulation.sock)", default="simulation.sock")
+    parser.add_argument("-j", "--jobs", help="number of worker processes (default: number of cores)", type=int)
+    parser.add_argument("--cache-size", help="number of programs kept in memory by each worker process (default: 256)", type=int, default=256)
+
+    args = parser.parse_args()
+
+    server = SimulationServer(args.socket, args.jobs, args.cache_size)
+    server.run()
@@ -0,0 +1,262 @@
+try:
+    import gzip
+    import lzma
+    import queue
+    import struct
+    import sys
+    import threading
+    from array import array
+except ImportError as error:
+    print(error)
+    exit()
+
+TRACE_COMPRESSIONS = ["none", "gzip", "lzma"]
+
+class TraceFormatError(ValueError):
+    """
+    An exception raised when a trace file cannot be written or is not a valid trace file
+
+    Attributes
+    ----------
+        message : string
+            what is wrong, with the name of the file
+    """
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+class TraceWriter:
+    """
+    A class used to write the execution trace of a virtual machine in a binary file, from a background thread
+
+    The file starts with a 20 bytes header : the "ITRC" magic, the format version (uint16), flags (uint16, PAGED for the paged memory model),
+    the size of a record (uint32), the number of registers (uint32) and the number of memory slots (uint32), followed by the initial registers as little-endian int32.
+    Then comes one 36 bytes record per executed instruction : step (uint64), machine cycles before the instruction (uint64), pc (uint32),
+    instruction word (uint32), destination (int32 : register number, MEMORY for a store, NONE), new value of the destination (int32)
+    and address of the memory slot read or written (int32, -1 without memory access).
+    The whole file can be compressed with gzip or lzma, TraceReader recognises them from their magic.
+    The execution loop packs the records in a bytearray and hands it over every chunkSize bytes : the compression and the writes happen in the thread,
+    the loop only waits when queueSize chunks are already waiting.
+
+    Attributes
+    ----------
+        fileName : string
+            name of the trace file
+
+        compression : string
+            one of TRACE_COMPRESSIONS
+
+        chunkSize : int
+            number of bytes of records handed over to the thread at once
+
+        file : object
+            the (compressed) file opened for writing
+
+        queue : object
+            the chunks waiting for the thread, None marks the end of the trace
+
+        thread : object
+            the thread writing the chunks, None before start()
+
+        error : object
+            the OSError raised by a write in the thread, None if every write succeeded
+
+        MAGIC : bytes
+            the first bytes of every trace file
+
+        VERSION : int
+            the version of the format written by this class
+
+        HEADER : object
+            the struct describing the header
+
+        RECORD : object
+            the struct describing a record
+
+        PAGED : int
+            flag of the traces of a paged data memory
+
+        NONE, MEMORY : int
+            destinations of the instructions writing nothing and of the store instructions
+
+    Methods
+    -------
+        start(regs, num_data_mem_cells, paged)
+            writes the header and starts the thread
+
+            Parameters
+            ----------
+            regs: int array
+                the registers at the start of the execution
+            num_data_mem_cells: int
+                number of memory slots
+            paged: bool
+                True for the paged memory model
+
+        put(chunk)
+            hands over packed records to the thread
+
+            Parameters
+            ----------
+            chunk: bytearray
+                records packed with RECORD, not modified afterwards
+
+        writeChunks()
+            body of the thread, writes the chunks until None
+
+        close()
+            waits for the thread to write every chunk and closes the file, raises TraceFormatError if a write failed
+    """
+    MAGIC = b"ITRC"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIII")
+    RECORD = struct.Struct("<QQIIiii")
+    PAGED = 1
+    NONE = -1
+    MEMORY = -2
+
+    def __init__(self, fileName, compression = "none", chunkSize = 1 << 20, queueSize = 64):
+        if compression not in TRACE_COMPRESSIONS:
+            raise TraceFormatError("Unknown trace compression : " + str(compression) + " (expected one of " + ", ".join(TRACE_COMPRESSIONS) + ")")
+        self.fileName = fileName
+        self.compression = compression
+        self.chunkSize = chunkSize
+        try:
+            if compression == "gzip":
+                # a low level keeps the thread ahead of the execution loop, the records compress well anyway
+                self.file = gzip.open(fileName, "wb", compresslevel = 1)
+            elif compression == "lzma":
+                self.file = lzma.open(fileName, "wb", preset = 0)
+            else:
+                self.file = open(fileName, "wb")
+        except OSError as error:
+            raise TraceFormatError("Cannot open the trace file " + fileName + " (" + str(error) + ")")
+        self.queue = queue.Queue(queueSize)
+        self.thread = None
+        self.error = None
+
+    def start(self, regs, num_data_mem_cells, paged):
+        regs = array('i', regs)
+        if sys.byteorder == "big":
+            regs.byteswap()
+        self.file.write(TraceWriter.HEADER.pack(TraceWriter.MAGIC, TraceWriter.VERSION, TraceWriter.PAGED if paged else 0, TraceWriter.RECORD.size, len(regs), num_data_mem_cells))
+        self.file.write(regs.tobytes())
+        self.thread = threading.Thread(target = self.writeChunks, daemon = True)
+        self.thread.start()
+
+    def put(self, chunk):
+        self.queue.put(chunk)
+
+    def writeChunks(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            if self.error is None:
+                try:
+                    self.file.write(chunk)
+                except OSError as error:
+                    # the chunks are still taken from the queue so that the execution loop never waits for a dead thread
+                    self.error = error
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        try:
+            # the last buffered bytes are only written by the close
+            self.file.close()
+        except OSError as error:
+            if self.error is None:
+                self.error = error
+        if self.error is not None:
+            raise TraceFormatError("Error while writing the trace file " + self.fileName + " : " + str(self.error))
+
+class TraceReader:
+    """
+    A class used to read a trace file written by TraceWriter
+
+    Attributes
+    ----------
+        fileName : string
+            name of the trace file
+
+        file : object
+            the (decompressed) file opened for reading
+
+        paged : bool
+            True if the trace comes from a paged data memory
+
+        num_data_mem_cells : int
+            number of memory slots of the virtual machine
+
+        regs : int array
+            the registers at the start of the execution
+
+    Methods
+    -------
+        records(count)
+            generator of the records as (step, cycles, pc, word, destination, value, address) tuples, a record cut at the end of the file is ignored,
+            raises TraceFormatError for a damaged compressed file
+
+            Parameters
+            ----------
+            count: int
+                number of records read from the file at once
+
+        close()
+            closes the file
+    """
+    def __init__(self, fileName):
+        self.fileName = fileName
+        try:
+            file = open(fileName, "rb")
+            magic = file.read(6)
+            file.close()
+            if magic[:2] == b"\x1f\x8b":
+                self.file = gzip.open(fileName, "rb")
+            elif magic == b"\xfd7zXZ\x00":
+                self.file = lzma.open(fileName, "rb")
+            else:
+                self.file = open(fileName, "rb")
+            header = self.file.read(TraceWriter.HEADER.size)
+        except (OSError, EOFError, lzma.LZMAError) as error:
+            raise TraceFormatError("Cannot read the trace file " + fileName + " (" + str(error) + ")")
+
+        if len(header) != TraceWriter.HEADER.size:
+            raise TraceFormatError("Invalid trace file : " + fileName)
+        magic, version, flags, recordSize, num_regs, self.num_data_mem_cells = TraceWriter.HEADER.unpack(header)
+        if magic != TraceWriter.MAGIC or version > TraceWriter.VERSION or recordSize != TraceWriter.RECORD.size:
+            raise TraceFormatError("Invalid trace file : " + fileName)
+        self.paged = bool(flags & TraceWriter.PAGED)
+        try:
+            regs = self.file.read(4 * num_regs)
+        except (OSError, EOFError, lzma.LZMAError) as error:
+            raise TraceFormatError("Cannot read the trace file " + fileName + " (" + str(error) + ")")
+        if len(regs) != 4 * num_regs:
+            raise TraceFormatError("Invalid trace file : " + fileName)
+        self.regs = array('i', regs)
+        if sys.byteorder == "big":
+            self.regs.byteswap()
+
+    def records(self, count = 65536):
+        size = TraceWriter.RECORD.size
+        rest = b""
+        while True:
+            try:
+                # read1 returns what is already decompressed, so a compressed stream cut by a crash loses only its last block
+                data = self.file.read1(count * size)
+            except EOFError:
+                data = b""
+            except (OSError, lzma.LZMAError) as error:
+                raise TraceFormatError("Damaged trace file " + self.fileName + " (" + str(error) + ")")
+            if not data:
+                return
+            data = rest + data
+            end = len(data) - len(data) % size
+            yield from TraceWriter.RECORD.iter_unpack(memoryview(data)[:end])
+            rest = data[end:]
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,205 @@
+try:
+    import argparse #pip install argparse
+    import contextlib
+    from array import array
+    from TraceFormat import TraceReader, TraceWriter, TraceFormatError
+    from VirtualMachineProgram import VirtualMachine, DataMemory, PagedDataMemory, INSTRUCTION_SET
+except ImportError as error:
+    print(error)
+    exit()
+
+REPLAY_LEVELS = ["instr", "full", "records"]
+
+class TraceReplay:
+    """
+    A class used to display a trace file written by the virtual machine (--trace-file) without running the simulation again
+
+    An unknown level or instruction raises ValueError, a file which is not a trace raises TraceFormatError.
+
+    The registers and the memory are rebuilt from the initial registers of the trace and the new value of each record,
+    so the "instr" and "full" levels give the same text as the console trace of VirtualMachineProgram.py.
+    The memory rebuilt is the one seen by the program : with a write back cache, the console trace shows the memory behind the cache instead.
+
+    Attributes
+    ----------
+        reader : object
+            the TraceReader of the trace file
+
+        level : string
+            one of REPLAY_LEVELS : "instr" (each executed command), "full" (commands, registers and memory), "records" (one line per record)
+
+        steps, pcs : tuple
+            (first, last) steps and pcs displayed, None for no limit
+
+        register : int
+            only the instructions writing this register are displayed, None for all
+
+        address : int
+            only the load/store of this memory slot are displayed, None for all
+
+        instruction : string
+            only this instruction (a name of INSTRUCTION_SET) is displayed, None for all
+
+        regs : int array
+            the registers rebuilt at the current record
+
+        dataMemory : object
+            the DataMemory (or PagedDataMemory) rebuilt at the current record, None when the level does not display it
+
+    Methods
+    -------
+        run()
+            displays the records of the trace file selected by the filters
+
+        matches(record)
+            returns True if a record is selected by the filters
+
+            Parameters
+            ----------
+            record : tuple
+                (step, cycles, pc, word, destination, value, address) record of the trace
+
+        showInstruction(record)
+            displays a record like the console trace, before its destination is written
+
+            Parameters
+            ----------
+            record : tuple
+                record of the trace
+
+        showRecord(record)
+            displays a record on one line
+
+            Parameters
+            ----------
+            record : tuple
+                record of the trace
+
+        showRegs()
+            displays the registers like VirtualMachine.showRegs
+    """
+    def __init__(self, fileName, level = "instr", steps = None, pcs = None, register = None, address = None, instruction = None):
+        if level not in REPLAY_LEVELS:
+            raise ValueError("Unknown replay level : " + str(level) + " (expected one of " + ", ".join(REPLAY_LEVELS) + ")")
+        if instruction is not None and instruction not in INSTRUCTION_SET:
+            raise ValueError("Unknown instruction : " + str(instruction) + " (expected one of " + ", ".join(INSTRUCTION_SET) + ")")
+        self.reader = TraceReader(fileName)
+        self.level = level
+        self.steps = steps
+        self.pcs = pcs
+        self.register = register
+        self.address = address
+        self.instruction = instruction
+        self.regs = array('i', self.reader.regs)
+        self.dataMemory = None
+        if level == "full":
+            if self.reader.paged:
+                self.dataMemory = PagedDataMemory(self.reader.num_data_mem_cells)
+            else:
+                self.dataMemory = DataMemory(self.reader.num_data_mem_cells)
+
+    def run(self):
+        filtered = self.steps is not None or self.pcs is not None or self.register is not None or self.address is not None or self.instruction is not None
+        regs = self.regs
+        dataMemory = self.dataMemory
+        for record in self.reader.records():
+            step, cycles, pc, word, target, value, address = record
+            if self.steps is not None and self.steps[1] is not None and step > self.steps[1]:
+                break
+            shown = not filtered or self.matches(record)
+            if shown:
+                if self.level == "records":
+                    self.showRecord(record)
+                else:
+                    self.showInstruction(record)
+
+            if target >= 0:
+                regs[target] = value
+            elif target == TraceWriter.MEMORY and dataMemory is not None:
+                dataMemory.writeDataMemory(address, value)
+            regs[0] = 0
+
+            if shown and self.level == "full":
+                self.showRegs()
+                dataMemory.showDataMemory()
+        self.reader.close()
+
+    def matches(self, record):
+        step, cycles, pc, word, target, value, address = record
+        if self.steps is not None and ((self.steps[0] is not None and step < self.steps[0]) or (self.steps[1] is not None and step > self.steps[1])):
+            return False
+        if self.pcs is not None and ((self.pcs[0] is not None and pc < self.pcs[0]) or (self.pcs[1] is not None and pc > self.pcs[1])):
+            return False
+        if self.register is not None and target != self.register:
+            return False
+        if self.address is not None and address != self.address:
+            return False
+        if self.instruction is not None and INSTRUCTION_SET[VirtualMachine.decodeWord(word)[0]] != self.instruction:
+            return False
+        return True
+
+    def showInstruction(self, record):
+        step, cycles, pc, word, target, value, address = record
+        instrNum, imm, reg1, reg2, reg3 = VirtualMachine.decodeWord(word)
+        print("Next instruction =>")
+        print("PC : " + str(pc) + ", inst : " + "0x%08x" % word + ", Machine cycle : " + str(cycles))
+        print("Command : " + VirtualMachine.disassembleFields(instrNum, imm, reg1, reg2, reg3))
+        # output of the scall instructions, from the registers before the instruction
+        if instrNum == 18:
+            if reg1 == 0:
+                print("Enter a value for r1 : ", end = "")
+            else:
+                print("r1 = " + str(self.regs[1]) + "(10) ," + str(hex(self.regs[1])) + ("(16)"))
+        print("")
+
+    def showRecord(self, record):
+        step, cycles, pc, word, target, value, address = record
+        line = str(step) + " : PC " + str(pc) + ", 0x%08x" % word + ", cycle " + str(cycles) + " : " + VirtualMachine.disassembleFields(*VirtualMachine.decodeWord(word))
+        if target >= 0:
+            line += " => r" + str(target) + " = " + str(value)
+        elif target == TraceWriter.MEMORY:
+            line += " => SLOT" + str(address) + " = " + str(value)
+        if address >= 0 and target != TraceWriter.MEMORY:
+            line += " (SLOT" + str(address) + ")"
+        print(line)
+
+    def showRegs(self):
+        print("REGISTERS : ")
+        for i in self.regs:
+            print("%04x" % VirtualMachine.twosComplement(i) + " ", end='')
+        print("\n")
+
+def parseRange(text):
+    first, separator, last = text.partition(":")
+    if not separator:
+        last = first
+    return (int(first, 0) if first else None, int(last, 0) if last else None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program displays a trace file written by VirtualMachineProgram.py (--trace-file) without running the simulation again.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-i", "--input_file", help="trace file (compressed or not)", required=True)
+    parser.add_argument("-o", "--output_file", help="file where the text is written (default: console)")
+    parser.add_argument("-t", "--trace", help="text produced (default: instr)\n - instr : each executed command, like the console trace\n - full : commands, registers and memory, like the console trace\n - records : one line per instruction with its destination and memory slot", choices=REPLAY_LEVELS, default="instr")
+    parser.add_argument("--steps", help="FIRST:LAST steps displayed (counted from 0, one bound can be omitted)")
+    parser.add_argument("--pc", help="FIRST:LAST pcs displayed (one bound can be omitted)")
+    parser.add_argument("--register", help="only the instructions writing this register", type=int)
+    parser.add_argument("--address", help="only the load/store of this memory slot", type=int)
+    parser.add_argument("--instruction", help="only this instruction (e.g. load)")
+
+    args = parser.parse_args()
+
+    try:
+        replay = TraceReplay(args.input_file, args.trace, parseRange(args.steps) if args.steps is not None else None, parseRange(args.pc) if args.pc is not None else None,
+                             args.register, args.address, args.instruction)
+        if args.output_file is not None:
+            file = open(args.output_file, "w")
+            with contextlib.redirect_stdout(file):
+                replay.run()
+            file.close()
+        else:
+            replay.run()
+    # TraceFormatError is a ValueError too
+    except ValueError as error:
+        print(error)
+        exit(1)
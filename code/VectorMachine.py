@@ -0,0 +1,357 @@
+try:
+    import argparse #pip install argparse
+    import csv
+    import os
+    import time # pip install times
+    from VirtualMachineProgram import VirtualMachine, Program, Performances, SimulationError, OVERFLOW_POLICIES
+except ImportError as error:
+    print(error)
+    exit()
+
+# NumPy is only needed by the vector mode, the rest of the simulator runs without it
+try:
+    import numpy as np #pip install numpy
+except ImportError:
+    np = None
+
+class VectorMachine:
+    """
+    A class used to run one program in lockstep for many register initialisations at once
+
+    The registers of the N instances are stored in a (N, num_regs) array and their data memories in a (N, num_data_mem_cells) array.
+    At each step, the running instances are grouped by PC and every instruction is applied to its whole group with NumPy.
+    An instance stops on stop or on an error (overflow trap, division by zero, memory access out of range, ...) without stopping the others.
+    The scall instructions do not print anything and scall 0 (reading r1 on the keyboard) is an error, since no one can answer it for each instance.
+    Without NumPy, or with an unknown overflow policy, the constructor raises SimulationError.
+
+    Attributes
+    ----------
+        program : object
+            the Program run by all the instances
+
+        num_regs : int
+            number of registers of each instance
+
+        num_data_mem_cells : int
+            number of data memory slots of each instance
+
+        overflow : string
+            behaviour when a result does not fit in 32 signed bits : "trap", "wrap" or "saturate"
+
+        files : string table
+            the register initialisation file of each instance
+
+        regs : int64 array
+            registers of the instances, one line per instance
+
+        memory : int64 array
+            data memories of the instances, one line per instance
+
+        pcs : int64 array
+            program counter of each instance
+
+        cycles : int64 array
+            number of machine cycles used by each instance
+
+        steps : int64 array
+            number of instructions executed by each instance
+
+        status : int8 array
+            state of each instance : RUNNING, STOPPED or FAILED
+
+        messages : dictionary
+            the error message of each failed instance, indexed by instance
+
+        costs : int table
+            number of machine cycles of each instruction of the program
+
+        OPERATIONS : dictionary
+            the operations of VirtualMachine.OPERATIONS, with the ones which only work on Python integers replaced by their NumPy equivalent
+
+    Methods
+    -------
+        run()
+            runs all the instances until they stop or fail
+
+        execute(pc, idx)
+            executes the instruction at address pc for the instances idx and returns the instances still running with their next PC
+
+            Parameters
+            ----------
+            pc : int
+                address of the instruction
+            idx : int array
+                the instances whose PC is pc
+
+        fail(idx, mask, message)
+            stops the instances idx[mask] with an error message and returns the other ones
+
+            Parameters
+            ----------
+            idx : int array
+                instances
+            mask : bool array
+                the instances of idx which failed
+            message : string
+                error message
+
+        writeRegister(idx, reg, value)
+            stores values in a register of the instances idx, applying the overflow policy, and returns the instances still running
+
+            Parameters
+            ----------
+            idx : int array
+                instances
+            reg : int
+                register number
+            value : int array
+                a value per instance
+
+        fitValues(value)
+            returns the values brought back in 32 signed bits by the wrap or saturate policy
+
+            Parameters
+            ----------
+            value : int array
+                values out of range
+
+        initRegs(init_regs_files)
+            reads the register initialisation file of each instance
+
+            Parameters
+            ----------
+            init_regs_files : string table
+                one register initialisation file per instance
+
+        showStatistics()
+            displays some statistics about the sweep
+
+        loadInFile(outputFile)
+            saves the status, cycles and registers of each instance in a CSV file
+
+            Parameters
+            ----------
+            outputFile : string
+                name of the CSV file
+    """
+    RUNNING = 0
+    STOPPED = 1
+    FAILED = 2
+
+    OPERATIONS = dict(VirtualMachine.OPERATIONS)
+    if np is not None:
+        OPERATIONS.update({ 5: lambda a, b: np.where(a != 0, b, a), 6: lambda a, b: np.where(a != 0, a, b),
+                            8: lambda a, b: np.left_shift(a, np.minimum(b, 32)), 9: lambda a, b: np.right_shift(a, np.minimum(b, 63)),
+                            10: lambda a, b: (a <= b).astype(np.int64), 11: lambda a, b: (a <= b).astype(np.int64), 12: lambda a, b: (a == b).astype(np.int64)    })
+
+    def __init__(self, program, num_regs, num_data_mem_cells, init_regs_files, overflow = "trap"):
+        if np is None:
+            raise SimulationError("The vector mode needs NumPy (pip install numpy)")
+        if overflow not in OVERFLOW_POLICIES:
+            raise SimulationError("Unknown overflow policy : " + str(overflow) + " (expected one of " + ", ".join(OVERFLOW_POLICIES) + ")")
+
+        self.program = program
+        self.num_regs = num_regs
+        self.num_data_mem_cells = num_data_mem_cells
+        self.overflow = overflow
+        self.files = list(init_regs_files)
+
+        nbInstances = len(self.files)
+        self.memory = np.zeros((nbInstances, num_data_mem_cells), dtype = np.int64)
+        self.pcs = np.zeros(nbInstances, dtype = np.int64)
+        self.cycles = np.ones(nbInstances, dtype = np.int64)
+        self.steps = np.zeros(nbInstances, dtype = np.int64)
+        self.status = np.zeros(nbInstances, dtype = np.int8)
+        self.messages = {}
+        self.performances = Performances()
+        self.costs = [self.performances.cycleCost(instr >> 27) for instr in program.words]
+
+        self.initRegs(self.files)
+
+    def run(self):
+        self.performances.timerStart()
+        nbInstr = len(self.program.decoded)
+
+        while True:
+            live = np.flatnonzero(self.status == VectorMachine.RUNNING)
+            if live.size == 0:
+                break
+
+            pcs = self.pcs[live]
+            outside = (pcs < 0) | (pcs >= nbInstr)
+            if outside.any():
+                live = self.fail(live, outside, "PC out of the program")
+                pcs = self.pcs[live]
+
+            # one group per distinct PC, every running instance executes exactly one instruction per step
+            if live.size and pcs.min() != pcs.max():
+                order = np.argsort(pcs, kind = "stable")
+                live = live[order]
+                pcs = pcs[order]
+                starts = np.flatnonzero(pcs[1:] != pcs[:-1]) + 1
+                groups = zip(np.split(live, starts), pcs[np.concatenate(([0], starts))].tolist())
+            else:
+                groups = [(live, int(pcs[0]))] if live.size else []
+
+            for idx, pc in groups:
+                idx, nextPc = self.execute(pc, idx)
+                self.pcs[idx] = nextPc
+
+        self.performances.timerStop()
+
+    def execute(self, pc, idx):
+        op, reg1, reg2, reg3 = self.program.decoded[pc]
+        instrNum = (op & 63) >> 1
+        regs = self.regs
+        self.cycles[idx] += self.costs[pc]
+        self.steps[idx] += 1
+        nextPc = pc + 1
+
+        if instrNum in VectorMachine.OPERATIONS:
+            b = regs[idx, reg2] if op & 1 else reg2
+            if instrNum == 4 and np.any(b == 0):
+                idx = self.fail(idx, np.broadcast_to(b == 0, idx.shape), "Division by zero")
+                b = regs[idx, reg2] if op & 1 else reg2
+            if instrNum in (8, 9) and np.any(b < 0):
+                idx = self.fail(idx, np.broadcast_to(b < 0, idx.shape), "Negative shift count")
+                b = regs[idx, reg2] if op & 1 else reg2
+            value = VectorMachine.OPERATIONS[instrNum](regs[idx, reg1], b)
+            if reg3 != 0:
+                idx = self.writeRegister(idx, reg3, value)
+
+        elif instrNum == 13 or instrNum == 14:
+            addr = regs[idx, reg1] + (regs[idx, reg2] if op & 1 else reg2)
+            outside = (addr < 0) | (addr >= self.num_data_mem_cells)
+            if outside.any():
+                idx = self.fail(idx, outside, "Memory access out of range")
+                addr = addr[~outside]
+            if instrNum == 13:
+                regs[idx, reg3] = self.memory[idx, addr]
+            else:
+                self.memory[idx, addr] = regs[idx, reg3]
+
+        elif instrNum == 15:
+            regs[idx, reg2] = pc + 1
+            if op & 1:
+                nextPc = regs[idx, reg1]
+                if np.any(nextPc < 0):
+                    negative = nextPc < 0
+                    idx = self.fail(idx, negative, "Jump to a negative address")
+                    nextPc = nextPc[~negative]
+            else:
+                nextPc = reg1
+
+        elif instrNum == 16:
+            nextPc = np.where(regs[idx, reg1] == 0, reg2, pc + 1)
+
+        elif instrNum == 17:
+            nextPc = np.where(regs[idx, reg1] != 0, reg2, pc + 1)
+
+        elif instrNum == 18:
+            if reg1 == 0:
+                idx = self.fail(idx, np.ones(idx.shape, dtype = bool), "scall 0 is not available in vector mode")
+
+        elif instrNum == 0:
+            self.status[idx] = VectorMachine.STOPPED
+
+        else:
+            idx = self.fail(idx, np.ones(idx.shape, dtype = bool), "Undefinied command")
+
+        regs[idx, 0] = 0
+        return idx, nextPc
+
+    def fail(self, idx, mask, message):
+        for instance in idx[mask].tolist():
+            self.messages[instance] = message
+        self.status[idx[mask]] = VectorMachine.FAILED
+        return idx[~mask]
+
+    def writeRegister(self, idx, reg, value):
+        value = np.broadcast_to(value, idx.shape)
+        outside = (value > 0x7FFFFFFF) | (value < -0x80000000)
+        if outside.any():
+            if self.overflow == "trap":
+                idx = self.fail(idx, outside, "Overflow on R" + str(reg) + " ! (32 bits signed)")
+                value = value[~outside]
+            else:
+                value = self.fitValues(value)
+        self.regs[idx, reg] = value
+        return idx
+
+    def fitValues(self, value):
+        if self.overflow == "wrap":
+            return ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+        return np.clip(value, -0x80000000, 0x7FFFFFFF)
+
+    def initRegs(self, init_regs_files):
+        self.regs = np.zeros((len(init_regs_files), self.num_regs), dtype = np.int64)
+        for instance in range(0, len(init_regs_files)):
+            file = open(init_regs_files[instance], "r")
+            lines = file.readlines()
+            file.close()
+            if len(lines) != self.num_regs:
+                self.fail(np.array([instance]), np.array([True]), "You have declared " + str(self.num_regs) + " registers but you initialized " + str(len(lines)) + " !")
+                continue
+            self.regs[instance] = [int(line) for line in lines]
+
+        idx = np.flatnonzero(self.status == VectorMachine.RUNNING)
+        for reg in range(0, self.num_regs):
+            self.writeRegister(idx, reg, self.regs[idx, reg].copy())
+            idx = idx[self.status[idx] == VectorMachine.RUNNING]
+
+    def showStatistics(self):
+        nbInstances = len(self.files)
+        print("Some statistics :")
+        print("Simulation duration : " + str(round(self.performances.elapsed, 3)) + " second(s)")
+        print("Instances : " + str(nbInstances) + " (" + str(int(np.sum(self.status == VectorMachine.STOPPED))) + " stopped, " + str(len(self.messages)) + " failed)")
+        print("Instructions executed : " + str(int(self.steps.sum())) + " (" + str(round(self.steps.sum()/self.performances.elapsed, 3)) + " per second)")
+        if nbInstances:
+            print("Machine cycles per instance : " + str(int(self.cycles.min())) + " min, " + str(int(self.cycles.max())) + " max")
+        print("\n")
+
+    def loadInFile(self, outputFile):
+        file = open(outputFile, "w", newline = "")
+        writer = csv.writer(file)
+        writer.writerow(["instance", "registers_init_file", "status", "message", "pc", "cycles", "instructions"] + ["R" + str(i) for i in range(0, self.num_regs)])
+        names = ["running", "stopped", "failed"]
+        for instance in range(0, len(self.files)):
+            writer.writerow([instance, self.files[instance], names[self.status[instance]], self.messages.get(instance, ""),
+                            int(self.pcs[instance]), int(self.cycles[instance]), int(self.steps[instance])] + self.regs[instance].tolist())
+        file.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="This program runs a program in machine language for many register initialisations at once, in lockstep with NumPy.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
+
+    parser.add_argument("-i", "--input", help=".txt or .bin file containing the program in machine language", required=True)
+    parser.add_argument("-ri", "--registers_init_files", help="register initialisation files (.txt), one instance per file,\na directory stands for all the .txt files it contains", nargs="+", required=True)
+    parser.add_argument("-o", "--output_root", help="directory where the results (.csv) and the final states (.npz) are saved")
+    parser.add_argument("-r", "--nb_registers", help="number of registers of each instance", type=int, required=True)
+    parser.add_argument("-m", "--memory_size", help="number of data memory slots of each instance", type=int, required=True)
+    parser.add_argument("-ov", "--overflow", help="behaviour when a result does not fit in 32 signed bits (default: trap)", choices=OVERFLOW_POLICIES, default="trap")
+    parser.add_argument("-sm", "--save_memory", help="also save the registers, data memories, PCs and cycles of every instance in a .npz file", action="store_true")
+
+    args = parser.parse_args()
+
+    files = []
+    for name in args.registers_init_files:
+        if os.path.isdir(name):
+            files += sorted([os.path.join(name, entry) for entry in os.listdir(name) if entry.endswith(".txt")])
+        else:
+            files.append(name)
+
+    try:
+        program = Program.load(args.input)
+        machine = VectorMachine(program, args.nb_registers, args.memory_size, files, args.overflow)
+    except SimulationError as error:
+        print(error)
+        exit(1)
+    machine.run()
+    machine.showStatistics()
+
+    outputName = "vector_" + time.strftime("%Y_%m_%d-%H_%M_%S")
+    if args.output_root is not None:
+        os.makedirs(args.output_root, exist_ok = True)
+        outputName = os.path.join(args.output_root, outputName)
+    machine.loadInFile(outputName + ".csv")
+    if args.save_memory:
+        np.savez(outputName + ".npz", regs = machine.regs, memory = machine.memory, pcs = machine.pcs, cycles = machine.cycles)
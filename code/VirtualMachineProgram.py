@@ -1,11 +1,59 @@
 try:
     import time # pip install times
     import argparse #pip install argparse
-    import keyboard # pip install keyboard
+    import random
+    import json
+    import os
+    import sys
+    import struct
+    import zlib
+    import hashlib
+    import io
+    from array import array
+    from collections import deque
+    from BinaryFormat import BinaryProgram, BinaryFormatError
+    from TraceFormat import TraceWriter, TraceFormatError, TRACE_COMPRESSIONS
+    from ResultCache import ResultCache
+    from InstructionsToMachineCode import Assembler, AssemblyError
 except ImportError as error:
     print(error)
     exit()
 
+TRACE_LEVELS = ["none", "summary", "instr", "full"]
+
+ENGINES = ["interp", "block"]
+
+OVERFLOW_POLICIES = ["trap", "wrap", "saturate"]
+
+MEMORY_MODELS = ["flat", "paged"]
+
+CACHE_REPLACEMENTS = ["lru", "fifo", "random"]
+
+CACHE_WRITE_POLICIES = ["back", "through"]
+
+TIMING_MODELS = ["default", "table", "pipeline"]
+
+BRANCH_PREDICTORS = ["taken", "not-taken", "1bit", "2bit", "gshare"]
+
+INSTRUCTION_SET = [ "stop", "add", "sub", "mul", "div", 
+                    "and", "or", "xor", "shl", "shr", 
+                    "slt", "sle", "seq", "load", "store",
+                    "jmp", "braz", "branz", "scall"    ]
+
+class SimulationError(Exception):
+    """
+    An exception raised when the simulation cannot be set up or cannot go on (unknown option, overflow trapped, jump to a negative address,
+    undefined command, memory access out of range, no more input for scall 0...), the command line prints its message and stops
+
+    Attributes
+    ----------
+        message : string
+            what is wrong
+    """
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
 class Performances:
     """
     A class used to determine some statistics about the simulation
@@ -18,9 +66,14 @@ class Performances:
             a float to store the ending time
         elapsed : float
             a float to store the elapsed time
+        previous : float
+            the elapsed time of the simulation before the checkpoint it was resumed from
         cycles : int
             an int to store the number of machine cycles
 
+        timing : object
+            the timing model giving the machine cycles of the instructions (a LatencyTable with the default latencies if none is given)
+
     Methods
     -------
         timerStart()
@@ -36,47 +89,707 @@ class Performances:
             ----------
             inst: int
                 inst
+
+        cycleCost(inst)
+            returns the number of machine cycles used by an instruction according to the timing model
+
+            Parameters
+            ----------
+            inst: int
+                instruction number
     """
-    def __init__(self):
-        self.cycles = 1
+    def __init__(self, timing = None):
+        self.timing = timing if timing is not None else LatencyTable()
+        self.cycles = self.timing.start
+        self.start = time.perf_counter()
+        self.previous = 0.0
 
     def cycleUpdate(self, inst):
-        if inst in [3, 4, 15, 16, 17]:
-            self.cycles += 2
-        else:
-            self.cycles += 1
+        self.cycles += self.cycleCost(inst)
+
+    def cycleCost(self, inst):
+        return self.timing.cycleCost(inst)
     
     def timerStart(self):
         self.start = time.perf_counter()
 
     def timerStop(self):
         self.stop = time.perf_counter()
-        self.elapsed = self.stop - self.start
+        self.elapsed = self.stop - self.start + self.previous
+
+class TimingModel:
+    """
+    A class used as the base of the timing models giving the number of machine cycles of a program
+
+    A model computes the cycles of each pc before the run, so the execution loops only add these precomputed costs.
+    The extra cycles are split in categories (stalls, flushes, ...). To report them, the handlers of the pcs having extra cycles
+    are wrapped to count their executions, and the handlers of the branches to count the transfers they take : the other instructions run untouched.
+    The cycles paid on a taken branch or jump are added to the performances once the run is over.
+
+    Attributes
+    ----------
+        start : int
+            number of machine cycles before the first instruction completes
+
+        counted : bool
+            True when the executions are counted to report the CPI and the breakdown of the cycles
+
+        categories : string table
+            the names of the categories of extra cycles
+
+        extra : dictionary
+            per category, the extra cycles of each pc, included in its cost
+
+        onTaken : dictionary
+            per category, the cycles paid each time a pc transfers the execution elsewhere than to the next pc
+
+        dynamic : dictionary
+            per category, the cycles accumulated by the pcs whose cost depends on their target (jmp on a register)
+
+        executions : int array
+            number of executions of each pc having extra cycles
+
+        taken : int array
+            number of transfers taken by each branch paying cycles when taken
+
+        totals : dictionary
+            per category, the extra cycles of the run, once finished
+
+    Methods
+    -------
+        cycleCost(inst)
+            returns the number of machine cycles of an instruction number outside of any context
+
+            Parameters
+            ----------
+            inst: int
+                instruction number
+
+        analyse(vm)
+            fills extra, onTaken and the dynamic costs for the program of a virtual machine
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        costs(vm)
+            returns the number of machine cycles of each pc of the program of a virtual machine
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        instrument(vm)
+            wraps the handlers of the operations of a virtual machine which have to be counted
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        finish(vm)
+            adds the cycles paid on the taken transfers to the performances and computes the totals of each category
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        description()
+            returns the text describing the model
+
+        statistics(vm)
+            returns the text giving the instructions executed, the CPI and the breakdown of the cycles (None when the model is not counted)
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+    """
+    start = 1
+
+    def __init__(self, counted = True):
+        self.counted = counted
+        self.categories = []
+        self.extra = {}
+        self.onTaken = {}
+        self.dynamic = {}
+        self.executions = None
+        self.taken = None
+        self.totals = {}
+
+    def cycleCost(self, inst):
+        return 1
+
+    def analyse(self, vm):
+        size = len(vm.program)
+        self.extra = {category: array('q', [0]) * size for category in self.categories}
+        self.onTaken = {category: array('q', [0]) * size for category in self.categories}
+        self.dynamic = {category: array('q', [0]) * size for category in self.categories}
+        for pc in range(0, size):
+            self.extra[self.categories[0]][pc] = self.cycleCost(vm.program[pc] >> 27) - 1
+
+    def costs(self, vm):
+        self.analyse(vm)
+        return [1 + sum([self.extra[category][pc] for category in self.categories]) for pc in range(0, len(vm.program))]
+
+    def jumpCost(self, pc, target):
+        return {}
+
+    def instrument(self, vm):
+        if not self.counted:
+            return
+        size = len(vm.program)
+        self.executions = array('Q', [0]) * size
+        self.taken = array('Q', [0]) * size
+        executions = self.executions
+        taken = self.taken
+        dynamic = self.dynamic
+
+        def counting(handler):
+            def run(pc, reg1, reg2, reg3):
+                executions[pc] += 1
+                return handler(pc, reg1, reg2, reg3)
+            return run
+
+        def branching(handler):
+            def run(pc, reg1, reg2, reg3):
+                nextPc = handler(pc, reg1, reg2, reg3)
+                if nextPc != pc + 1:
+                    taken[pc] += 1
+                return nextPc
+            return run
+
+        def jumping(handler):
+            def run(pc, reg1, reg2, reg3):
+                nextPc = handler(pc, reg1, reg2, reg3)
+                for category, cycles in self.jumpCost(pc, nextPc).items():
+                    dynamic[category][pc] += cycles
+                return nextPc
+            return run
+
+        for pc in range(0, size):
+            handler, reg1, reg2, reg3 = vm.operations[pc]
+            op = vm.decoded[pc][0]
+            if (op & 63) == 31:
+                handler = jumping(handler)
+            elif any([self.onTaken[category][pc] for category in self.categories]):
+                handler = branching(handler)
+            if any([self.extra[category][pc] for category in self.categories]):
+                handler = counting(handler)
+            vm.operations[pc] = (handler, reg1, reg2, reg3)
+
+    def finish(self, vm):
+        if not self.counted:
+            return
+        for category in self.categories:
+            paid = sum([self.taken[pc] * self.onTaken[category][pc] for pc in range(0, len(self.taken)) if self.taken[pc]]) + sum(self.dynamic[category])
+            vm.performances.cycles += paid
+            self.totals[category] = paid + sum([self.executions[pc] * self.extra[category][pc] for pc in range(0, len(self.executions)) if self.executions[pc]])
+
+    def description(self):
+        return "1 cycle per instruction"
+
+    def statistics(self, vm):
+        if not self.counted or not self.totals:
+            return None
+        memory = vm.cache.latency if vm.cache is not None else 0
+        mispredictions = sum(vm.predictor.mispredicts) * vm.predictor.penalty if vm.predictor is not None else 0
+        instructions = vm.performances.cycles - self.start - memory - mispredictions - sum(self.totals.values())
+        text = str(instructions) + " instruction(s), CPI " + str(round(vm.performances.cycles / max(instructions, 1), 3))
+        text += ", start " + str(self.start) + " cycle(s)"
+        for category in self.categories:
+            text += ", " + category + " " + str(self.totals[category]) + " cycle(s)"
+        if vm.cache is not None:
+            text += ", memory " + str(memory) + " cycle(s)"
+        if vm.predictor is not None:
+            text += ", misprediction " + str(mispredictions) + " cycle(s)"
+        return text
+
+class LatencyTable(TimingModel):
+    """
+    A timing model giving a fixed number of machine cycles to each instruction
+
+    Without a configuration file it is the default model of the simulator (mul, div, jmp, braz and branz take 2 cycles, the other instructions 1)
+    and nothing is counted. A configuration file has one "instruction cycles" line per instruction to change, and optionally a "start cycles" line.
+
+    Attributes
+    ----------
+        DEFAULT : dictionary
+            the default latencies, indexed by instruction number
+
+        latencies : dictionary
+            the latency of each instruction number
+
+    Methods
+    -------
+        load(fileName)
+            returns the LatencyTable described by a configuration file
+
+            Parameters
+            ----------
+            fileName: string
+                name of the configuration file
+    """
+    DEFAULT = {3: 2, 4: 2, 15: 2, 16: 2, 17: 2}
+
+    def __init__(self, latencies = None, start = 1, counted = False):
+        TimingModel.__init__(self, counted)
+        self.latencies = dict(LatencyTable.DEFAULT)
+        if latencies is not None:
+            self.latencies.update(latencies)
+        self.start = start
+        self.categories = ["multi-cycle"]
+
+    @staticmethod
+    def load(fileName):
+        latencies = {}
+        start = 1
+        file = open(fileName, "r")
+        for number, line in enumerate(file):
+            fields = line.split("#")[0].split()
+            if not fields:
+                continue
+            if len(fields) != 2 or not fields[1].isdigit() or (fields[0] != "start" and fields[0] not in INSTRUCTION_SET):
+                raise SimulationError("Invalid latency line " + str(number + 1) + " in " + fileName + " : " + line.strip())
+            if fields[0] == "start":
+                start = int(fields[1])
+            else:
+                latencies[INSTRUCTION_SET.index(fields[0])] = int(fields[1])
+        file.close()
+        return LatencyTable(latencies, start, True)
+
+    def cycleCost(self, inst):
+        return self.latencies.get(inst, 1)
+
+    def description(self):
+        return "latency table (" + ", ".join([INSTRUCTION_SET[inst] + " " + str(self.latencies[inst]) for inst in sorted(self.latencies) if inst < len(INSTRUCTION_SET)]) + ", others 1, start " + str(self.start) + ")"
+
+class PipelineModel(TimingModel):
+    """
+    A timing model of a classic five-stage pipeline (IF, ID, EX, MEM, WB), one instruction entering the pipeline per cycle
+
+    The RAW hazards between the registers read and written by consecutive instructions (reg1, reg2 and reg3 as decoded by VirtualMachine.decodeWord)
+    stall the consumer : with forwarding, only a load followed by an instruction using its result stalls (1 cycle) ;
+    without forwarding, a result is only readable 3 cycles after its producer (registers written in the first half of WB, read in the second half of ID).
+    Branches are predicted not taken and resolved in EX : a taken braz or branz flushes branch_penalty cycles, a jmp flushes jump_penalty cycles.
+    The stalls of an instruction are computed for the previous instructions of the program, and corrected when it is reached by a taken transfer.
+    The correction stops at the first branch after the target : without forwarding, the instruction following a branch reached by a taken transfer
+    keeps the stalls computed for the program order (at most 1 cycle off), the cycles are exact otherwise.
+
+    Attributes
+    ----------
+        forwarding : bool
+            True if the results are forwarded from EX and MEM to EX
+
+        branchPenalty : int
+            cycles flushed by a taken braz or branz
+
+        jumpPenalty : int
+            cycles flushed by a jmp
+
+        stalls : int table
+            the stall cycles of each pc when it follows the previous pc of the program
+
+    Methods
+    -------
+        reads(fields)
+            returns the registers read by a decoded instruction
+
+            Parameters
+            ----------
+            fields: tuple
+                the fields returned by VirtualMachine.decodeWord
+
+        writes(fields)
+            returns the register written by a decoded instruction (0 if none)
+
+            Parameters
+            ----------
+            fields: tuple
+                the fields returned by VirtualMachine.decodeWord
+
+        stall(pc, producers)
+            returns the stall cycles of the instruction at pc, given the previous instructions and the number of cycles separating them from it
+
+            Parameters
+            ----------
+            pc: int
+                address of the consumer
+            producers: tuple table
+                (address, gap) of the previous instructions in flight
+
+        correction(pc, target, penalty)
+            returns the difference between the stalls of the instructions executed after the transfer from pc to target and the stalls included in their costs
+
+            Parameters
+            ----------
+            pc: int
+                address of the branch or jump
+            target: int
+                address of the next instruction executed
+            penalty: int
+                cycles flushed by the transfer
+
+        jumpCost(pc, target)
+            returns the cycles paid per category when the instruction at pc transfers the execution to target
+
+            Parameters
+            ----------
+            pc: int
+                address of the branch or jump
+            target: int
+                address of the next instruction executed
+    """
+    start = 4
+
+    def __init__(self, forwarding = True, branch_penalty = 2, jump_penalty = 1):
+        TimingModel.__init__(self, True)
+        self.forwarding = forwarding
+        self.branchPenalty = branch_penalty
+        self.jumpPenalty = jump_penalty
+        self.categories = ["load-use" if forwarding else "RAW", "branch", "jump"]
+        self.fields = []
+        self.stalls = []
+
+    def reads(self, fields):
+        instrNum, imm, reg1, reg2, reg3 = fields
+        registers = []
+        if 1 <= instrNum <= 14:
+            registers = [reg1] + ([reg2] if imm else []) + ([reg3] if instrNum == 14 else [])
+        elif instrNum == 15 and imm:
+            registers = [reg1]
+        elif instrNum == 16 or instrNum == 17:
+            registers = [reg1]
+        elif instrNum == 18 and reg1 != 0:
+            registers = [1]
+        return [reg for reg in registers if reg != 0]
+
+    def writes(self, fields):
+        instrNum, imm, reg1, reg2, reg3 = fields
+        if 1 <= instrNum <= 13:
+            return reg3
+        elif instrNum == 15:
+            return reg2
+        elif instrNum == 18 and reg1 == 0:
+            return 1
+        return 0
+
+    def stall(self, pc, producers):
+        cycles = 0
+        reads = self.reads(self.fields[pc])
+        for producer, gap in producers:
+            if producer < 0:
+                continue
+            written = self.writes(self.fields[producer])
+            if written != 0 and written in reads:
+                if self.forwarding:
+                    needed = 2 if self.fields[producer][0] == 13 else 1
+                else:
+                    needed = 3
+                cycles = max(cycles, needed - gap)
+        return cycles
+
+    def correction(self, pc, target, penalty):
+        # stalls of the target and of the instructions falling through after it once they follow the transfer,
+        # instead of the previous pcs of the program, until they are the same again
+        cycles = 0
+        producers = [(pc, 1 + penalty), (pc - 1, 2 + penalty + self.stalls[pc])]
+        index = target
+        while 0 <= index < len(self.stalls):
+            stall = self.stall(index, producers)
+            cycles += stall - self.stalls[index]
+            if (index > target and stall == self.stalls[index]) or self.fields[index][0] in (0, 15, 16, 17):
+                break
+            producers = [(index, 1), (producers[0][0], producers[0][1] + 1 + stall)]
+            index += 1
+        return cycles
+
+    def analyse(self, vm):
+        TimingModel.analyse(self, vm)
+        data, branch, jump = self.categories
+        self.fields = [VirtualMachine.decodeWord(instr) for instr in vm.program]
+        self.stalls = []
+        for pc in range(0, len(self.fields)):
+            self.stalls.append(self.stall(pc, [(pc - 1, 1), (pc - 2, 2 + (self.stalls[pc - 1] if pc > 0 else 0))]))
+
+        for pc in range(0, len(self.fields)):
+            instrNum, imm, reg1, reg2, reg3 = self.fields[pc]
+            self.extra[data][pc] = self.stalls[pc]
+            self.extra[branch][pc] = 0
+            if instrNum == 15 and not imm:
+                self.extra[jump][pc] = self.jumpPenalty
+                self.extra[data][pc] += self.correction(pc, reg1, self.jumpPenalty)
+            elif instrNum == 16 or instrNum == 17:
+                self.onTaken[branch][pc] = self.branchPenalty
+                self.onTaken[data][pc] = self.correction(pc, reg2, self.branchPenalty)
+
+    def jumpCost(self, pc, target):
+        data, branch, jump = self.categories
+        return {jump: self.jumpPenalty, data: self.correction(pc, target, self.jumpPenalty)}
+
+    def description(self):
+        return ("five-stage pipeline, " + ("with" if self.forwarding else "without") + " forwarding, branch penalty " + str(self.branchPenalty)
+                + " cycle(s), jump penalty " + str(self.jumpPenalty) + " cycle(s)")
 
 class Cache:
     """
-    A class used to represent a cache memory (under development)
+    A class used to represent a set-associative cache memory placed between the load/store instructions and the data memory
+
+    The data always stays in the data memory, the cache keeps track of the lines it holds to count the hits and misses
+    and to add their latency to the machine cycles of the simulation.
+    A line is found through the lineSlots dictionary, its tag, dirty bit and age are kept in arrays indexed by slot (set * ways + way).
+
+    Attributes
+    ----------
+        memory : object
+            the data memory behind the cache
+        performances : object
+            the performances of the simulation, the latencies are added to its cycles
+        setsNb : int
+            number of sets (power of 2)
+        waysNb : int
+            number of lines per set
+        lineSize : int
+            number of memory slots per line (power of 2)
+        replacement : string
+            line replaced on a miss, one of CACHE_REPLACEMENTS : "lru" (least recently used), "fifo" (oldest filled), "random"
+        writePolicy : string
+            one of CACHE_WRITE_POLICIES : "back" (write-allocate, dirty lines are written back when replaced),
+            "through" (every write goes to the memory, no allocation on a write miss)
+        hitLatency : int
+            cycles added to a load or a store for an access to the cache
+        missLatency : int
+            cycles added for an access to the memory (line fill, write back or write through)
+        offsetBits : int
+            number of address bits selecting a slot in a line
+        setMask : int
+            mask selecting the set in a line number
+        setBits : int
+            number of bits of the line number selecting the set
+        tags : int array
+            tag of the line held by each slot (-1 if empty)
+        dirty : int array
+            1 if the line held by a slot has been written since its fill
+        ages : int array
+            last use (lru) or fill (fifo) of the line held by each slot
+        lineSlots : dictionary
+            slot holding each line number present in the cache
+        hits, misses, evictions, writeBacks : int
+            counters of the simulation
+
+        latency : int
+            machine cycles added by the cache
+
+    Methods
+    -------
+        readCache(addr)
+            reads the data memory at the indicated address through the cache
+
+            Parameters
+            ----------
+            addr: int
+                data address
+
+        writeCache(addr, data)
+            writes a data to the indicated address through the cache
+
+            Parameters
+            ----------
+            addr: int
+                data address
+
+            data : int
+                data to store in memory
+
+        writeThrough(addr, data)
+            writes a data directly in the data memory
+
+            Parameters
+            ----------
+            addr: int
+                data address
+
+            data : int
+                data to store in memory
+
+        access(line, write)
+            looks for a line in the cache, fills it on a miss and adds the latencies to the cycles
+
+            Parameters
+            ----------
+            line: int
+                line number (address >> offsetBits)
 
+            write : bool
+                True for a store
+
+        victim(index)
+            returns the slot to replace in a set
+
+            Parameters
+            ----------
+            index: int
+                set index
+
+        description()
+            returns the text describing the configuration of the cache
+
+        statistics()
+            returns the text describing the counters of the cache
+
+        state()
+            returns the lines and the counters of the cache as a dictionary of JSON types, saved in the checkpoints
+
+        restore(state)
+            sets the lines and the counters of the cache back to a state returned by state()
+
+            Parameters
+            ----------
+            state: dictionary
+                the state to restore
+
+        parseGeometry(text)
+            returns the sets, ways and line_size of a "SETS,WAYS,LINE_SIZE" option (-c) as a dictionary, raises SimulationError for another format
+
+            Parameters
+            ----------
+            text: string
+                the option, e.g. "64,2,4"
     """
-    def __init__(self, nbSets, blockLines, blockSize, nbAddr, memory):
-        self.wordsNb = blockSize*8/nbAddr
-        self.setsNb = nbSets
-        self.linesNb = blockLines
-        self.wordSize = nbAddr
+    def __init__(self, memory, performances, nbSets, nbWays, lineSize, replacement = "lru", writePolicy = "back", hitLatency = 1, missLatency = 10):
+        if nbSets < 1 or nbSets & (nbSets - 1) or lineSize < 1 or lineSize & (lineSize - 1) or nbWays < 1:
+            raise SimulationError("The number of cache sets and the cache line size must be powers of 2, with at least 1 way")
+        if replacement not in CACHE_REPLACEMENTS:
+            raise SimulationError("Unknown cache replacement : " + str(replacement) + " (expected one of " + ", ".join(CACHE_REPLACEMENTS) + ")")
+        if writePolicy not in CACHE_WRITE_POLICIES:
+            raise SimulationError("Unknown cache write policy : " + str(writePolicy) + " (expected one of " + ", ".join(CACHE_WRITE_POLICIES) + ")")
+
         self.memory = memory
-        self.sets = []
+        self.performances = performances
+        self.setsNb = nbSets
+        self.waysNb = nbWays
+        self.lineSize = lineSize
+        self.replacement = replacement
+        self.writePolicy = writePolicy
+        self.hitLatency = hitLatency
+        self.missLatency = missLatency
 
-        for i in range(0, self.setsNb):
-            self.sets.append()
+        self.offsetBits = lineSize.bit_length() - 1
+        self.setBits = nbSets.bit_length() - 1
+        self.setMask = nbSets - 1
+        self.tags = array('q', [-1]) * (nbSets * nbWays)
+        self.dirty = array('B', [0]) * (nbSets * nbWays)
+        self.ages = array('Q', [0]) * (nbSets * nbWays)
+        self.lineSlots = {}
+        self.clock = 0
+        self.random = random.Random(0)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writeBacks = 0
+        self.latency = 0
 
     def readCache(self, addr):
-        pass
+        data = self.memory.readDataMemory(addr)
+        self.access(addr >> self.offsetBits, False)
+        return data
 
     def writeCache(self, addr, data):
-        pass
+        if self.writePolicy == "through":
+            self.writeThrough(addr, data)
+        else:
+            self.memory.writeDataMemory(addr, data)
+        self.access(addr >> self.offsetBits, True)
 
     def writeThrough(self, addr, data):
-        pass
+        self.memory.writeDataMemory(addr, data)
+        self.performances.cycles += self.missLatency
+        self.latency += self.missLatency
+
+    def access(self, line, write):
+        self.clock += 1
+        slot = self.lineSlots.get(line)
+        if slot is not None:
+            self.hits += 1
+            self.performances.cycles += self.hitLatency
+            self.latency += self.hitLatency
+            if self.replacement == "lru":
+                self.ages[slot] = self.clock
+            if write and self.writePolicy == "back":
+                self.dirty[slot] = 1
+            return
+
+        self.misses += 1
+        if write and self.writePolicy == "through":
+            self.performances.cycles += self.hitLatency
+            self.latency += self.hitLatency
+            return
+
+        index = line & self.setMask
+        slot = self.victim(index)
+        if self.tags[slot] != -1:
+            self.evictions += 1
+            del self.lineSlots[(self.tags[slot] << self.setBits) | index]
+            if self.dirty[slot]:
+                self.writeBacks += 1
+                self.performances.cycles += self.missLatency
+                self.latency += self.missLatency
+
+        self.tags[slot] = line >> self.setBits
+        self.dirty[slot] = 1 if write else 0
+        self.ages[slot] = self.clock
+        self.lineSlots[line] = slot
+        self.performances.cycles += self.hitLatency + self.missLatency
+        self.latency += self.hitLatency + self.missLatency
+
+    def victim(self, index):
+        first = index * self.waysNb
+        ways = range(first, first + self.waysNb)
+        for slot in ways:
+            if self.tags[slot] == -1:
+                return slot
+        if self.replacement == "random":
+            return first + self.random.randrange(self.waysNb)
+        return min(ways, key=self.ages.__getitem__)
+
+    def description(self):
+        return (str(self.setsNb) + " set(s) x " + str(self.waysNb) + " way(s) x " + str(self.lineSize) + " slot(s), "
+                + self.replacement + ", write-" + self.writePolicy + ", hit " + str(self.hitLatency) + " cycle(s), miss " + str(self.missLatency) + " cycle(s)")
+
+    def statistics(self):
+        accesses = self.hits + self.misses
+        rate = round(100 * self.hits / accesses, 2) if accesses else 0
+        return (str(self.hits) + " hit(s), " + str(self.misses) + " miss(es) (hit rate " + str(rate) + " %), "
+                + str(self.evictions) + " eviction(s), " + str(self.writeBacks) + " write back(s)")
+
+    def state(self):
+        return {"tags": self.tags.tolist(), "dirty": self.dirty.tolist(), "ages": self.ages.tolist(), "clock": self.clock, "random": self.random.getstate(),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "writeBacks": self.writeBacks, "latency": self.latency}
+
+    def restore(self, state):
+        self.tags = array('q', state["tags"])
+        self.dirty = array('B', state["dirty"])
+        self.ages = array('Q', state["ages"])
+        self.lineSlots = {}
+        for slot in range(0, len(self.tags)):
+            if self.tags[slot] != -1:
+                self.lineSlots[(self.tags[slot] << self.setBits) | (slot // self.waysNb)] = slot
+        self.clock = state["clock"]
+        version, internal, gauss = state["random"]
+        self.random.setstate((version, tuple(internal), gauss))
+        self.hits, self.misses, self.evictions, self.writeBacks, self.latency = state["hits"], state["misses"], state["evictions"], state["writeBacks"], state["latency"]
+
+    @staticmethod
+    def parseGeometry(text):
+        try:
+            sets, ways, line_size = [int(i, 10) for i in str(text).split(",")]
+        except ValueError:
+            raise SimulationError("Invalid cache : " + str(text) + " (expected SETS,WAYS,LINE_SIZE, e.g. 64,2,4)")
+        return {"sets": sets, "ways": ways, "line_size": line_size}
 
 class DataMemory:
     """
@@ -84,8 +797,8 @@ class DataMemory:
 
     Attributes
     ----------
-        memorySlots : int table
-            array that represents a memory area in which data are stored
+        memorySlots : int array
+            array of 32 bits signed integers that represents a memory area in which data are stored
 
         num_data_mem_cells : int
             size of the memory area
@@ -93,7 +806,7 @@ class DataMemory:
     Methods
     -------
         readDataMemory(addr)
-            reads the memory area at the indicated address
+            reads the memory area at the indicated address, raises IndexError out of the memory area (negative addresses included)
 
             Parameters
             ----------
@@ -101,7 +814,7 @@ class DataMemory:
                 data address
 
         writeDataMemory(addr, value)
-            writes a data to the indicated address
+            writes a data to the indicated address, raises IndexError out of the memory area (negative addresses included)
 
             Parameters
             ----------
@@ -114,6 +827,51 @@ class DataMemory:
         showDataMemory()
             show all elements of the memory area
 
+        reportDataMemory(file)
+            writes all elements of the memory area in the report of the simulation
+
+            Parameters
+            ----------
+            file: object
+                the opened report file
+
+        snapshot()
+            returns a copy of the memory area, to find later the slots changed
+
+        changedSlots(snapshot)
+            returns the addresses of the slots whose value differs from a snapshot
+
+            Parameters
+            ----------
+            snapshot: object
+                a copy returned by snapshot()
+
+        restore(snapshot)
+            sets the memory area back to a snapshot
+
+            Parameters
+            ----------
+            snapshot: object
+                a copy returned by snapshot()
+
+        dirtyPages(snapshot)
+            returns the pages of PagedDataMemory.PAGE_SIZE slots which differ from a snapshot, indexed by page number
+
+            Parameters
+            ----------
+            snapshot: object
+                a copy returned by snapshot(), None for the pages which are not only made of zeros
+
+        loadPage(number, values)
+            writes the slots of a page
+
+            Parameters
+            ----------
+            number: int
+                page number
+            values: int array
+                the slots of the page
+
         twoComplement(nb)
             calculate the two's complement of the input parameter
 
@@ -128,73 +886,2514 @@ class DataMemory:
                 the two's complement of nb
     """
     def __init__(self, num_data_mem_cells):
-        self.memorySlots = []
+        self.memorySlots = array('i', [0]) * num_data_mem_cells
         self.num_data_mem_cells = num_data_mem_cells
-
-        for i in range(0, self.num_data_mem_cells):
-            self.memorySlots.append(0)
     
     def readDataMemory(self, addr):
+        # a negative address would count from the end of the array, it is out of range like in PagedDataMemory
+        if addr < 0:
+            raise IndexError("negative address " + str(addr))
         return self.memorySlots[addr]
     
     def writeDataMemory(self, addr, value):
+        if addr < 0:
+            raise IndexError("negative address " + str(addr))
         self.memorySlots[addr] = value
 
     def showDataMemory(self):
         print("DATA MEMORY : ")
-        pc = 0
         for i in self.memorySlots:
-            if len('{:b}'.format(i)) > 17:
-                print("\nOverflow on SLOT" + str(pc) + " ! (32 bits signed)")
-                exit()
-            else:
-                print("%04x" % self.twosComplement(i) + " ", end='')
-            pc+=1
+            print("%04x" % self.twosComplement(i) + " ", end='')
         print("\n")
 
+    def reportDataMemory(self, file):
+        index = 1
+        for i in self.memorySlots:
+            if index-1 < 10:
+                file.write("SLOT" + str(index-1) + "  : 0x%04x" % self.twosComplement(i) + " / ")
+            else:
+                file.write("SLOT" + str(index-1) + " : 0x%04x" % self.twosComplement(i) + " / ")
+            if not(index % 7) and index != 0:
+                file.write("\n")
+            index += 1
+
+    def snapshot(self):
+        return array('i', self.memorySlots)
+
+    def changedSlots(self, snapshot):
+        # the slices are compared in C, only the chunks which differ are scanned slot by slot
+        changed = []
+        for first in range(0, len(self.memorySlots), 4096):
+            if self.memorySlots[first:first + 4096] != snapshot[first:first + 4096]:
+                changed += [addr for addr in range(first, min(first + 4096, len(self.memorySlots))) if self.memorySlots[addr] != snapshot[addr]]
+        return changed
+
+    def restore(self, snapshot):
+        self.memorySlots[:] = snapshot
+
+    def dirtyPages(self, snapshot):
+        size = PagedDataMemory.PAGE_SIZE
+        zeros = array('i', [0]) * size
+        pages = {}
+        for first in range(0, len(self.memorySlots), size):
+            page = self.memorySlots[first:first + size]
+            if page != (snapshot[first:first + size] if snapshot is not None else zeros[:len(page)]):
+                pages[first // size] = page
+        return pages
+
+    def loadPage(self, number, values):
+        first = number * PagedDataMemory.PAGE_SIZE
+        self.memorySlots[first:first + len(values)] = values
+
     def twosComplement(self, nb):
         if nb>>15:
             nb=((nb) & 0xFFFF)
         return nb
 
-class VirtualMachine:
+class PagedDataMemory(DataMemory):
     """
-    A class used to represent a memory area to store data
+    A class used to represent a large memory area to store data, allocated by pages
+
+    A page of PAGE_SIZE slots is only allocated the first time one of its slots is written,
+    reading a slot of a page never written returns 0.
 
     Attributes
     ----------
-        running : bool
-            determine if the virtual machine is running or not
+        pages : dictionary
+            the allocated pages (int arrays) indexed by their number
 
-        num_regs : int
-            the number of registers to use
+        num_data_mem_cells : int
+            size of the memory area
+
+        PAGE_BITS : int
+            number of address bits indexing a slot inside a page
+
+        PAGE_SIZE : int
+            number of slots of a page
+
+    Methods
+    -------
+        readDataMemory(addr)
+            reads the memory area at the indicated address
+
+            Parameters
+            ----------
+            addr: int
+                data address
+
+        writeDataMemory(addr, value)
+            writes a data to the indicated address, allocating its page if needed
+
+            Parameters
+            ----------
+            addr: int
+                data address
+
+            value : int
+                data to store in memory
+
+        outOfRange(addr)
+            raises IndexError because of an access outside of the memory area, like the flat DataMemory
+
+            Parameters
+            ----------
+            addr: int
+                data address
+
+        showDataMemory()
+            show the elements of the allocated pages
+
+        reportDataMemory(file)
+            writes the elements of the allocated pages in the report of the simulation
+
+            Parameters
+            ----------
+            file: object
+                the opened report file
+
+        snapshot()
+            returns a copy of the allocated pages, to find later the slots changed
+
+        changedSlots(snapshot)
+            returns the addresses of the slots whose value differs from a snapshot, comparing only the allocated pages
+
+            Parameters
+            ----------
+            snapshot: object
+                a copy returned by snapshot()
+
+        restore(snapshot)
+            sets the allocated pages back to a snapshot
+
+            Parameters
+            ----------
+            snapshot: object
+                a copy returned by snapshot()
+
+        dirtyPages(snapshot)
+            returns the allocated pages which differ from a snapshot (all of them without snapshot), indexed by page number
+
+            Parameters
+            ----------
+            snapshot: object
+                a copy returned by snapshot(), None for all the allocated pages
+
+        loadPage(number, values)
+            allocates a page with the given slots
+
+            Parameters
+            ----------
+            number: int
+                page number
+            values: int array
+                the slots of the page
+    """
+    PAGE_BITS = 10
+    PAGE_SIZE = 1 << PAGE_BITS
+
+    def __init__(self, num_data_mem_cells):
+        self.pages = {}
+        self.num_data_mem_cells = num_data_mem_cells
+
+    def readDataMemory(self, addr):
+        if addr < 0 or addr >= self.num_data_mem_cells:
+            self.outOfRange(addr)
+        page = self.pages.get(addr >> PagedDataMemory.PAGE_BITS)
+        if page is None:
+            return 0
+        return page[addr & (PagedDataMemory.PAGE_SIZE - 1)]
+
+    def writeDataMemory(self, addr, value):
+        if addr < 0 or addr >= self.num_data_mem_cells:
+            self.outOfRange(addr)
+        page = self.pages.get(addr >> PagedDataMemory.PAGE_BITS)
+        if page is None:
+            page = array('i', [0]) * PagedDataMemory.PAGE_SIZE
+            self.pages[addr >> PagedDataMemory.PAGE_BITS] = page
+        page[addr & (PagedDataMemory.PAGE_SIZE - 1)] = value
+
+    def outOfRange(self, addr):
+        # the virtual machine turns it into a SimulationError with the pc of the load or store
+        raise IndexError("address " + str(addr) + " out of range")
+
+    def showDataMemory(self):
+        print("DATA MEMORY : ")
+        for number in sorted(self.pages):
+            print("PAGE " + str(number) + " : ", end='')
+            for i in self.pages[number]:
+                print("%04x" % self.twosComplement(i) + " ", end='')
+            print("")
+        print("")
+
+    def reportDataMemory(self, file):
+        for number in sorted(self.pages):
+            first = number * PagedDataMemory.PAGE_SIZE
+            last = min(first + PagedDataMemory.PAGE_SIZE, self.num_data_mem_cells) - 1
+            file.write("PAGE " + str(number) + " (SLOT" + str(first) + " - SLOT" + str(last) + ")\n")
+            index = 1
+            for i in self.pages[number][:last - first + 1]:
+                if first + index - 1 < 10:
+                    file.write("SLOT" + str(first + index - 1) + "  : 0x%04x" % self.twosComplement(i) + " / ")
+                else:
+                    file.write("SLOT" + str(first + index - 1) + " : 0x%04x" % self.twosComplement(i) + " / ")
+                if not(index % 7):
+                    file.write("\n")
+                index += 1
+            file.write("\n")
+
+    def snapshot(self):
+        return {number: array('i', page) for number, page in self.pages.items()}
+
+    def changedSlots(self, snapshot):
+        changed = []
+        for number in sorted(self.pages):
+            page = self.pages[number]
+            previous = snapshot.get(number, array('i', [0]) * PagedDataMemory.PAGE_SIZE)
+            if page != previous:
+                first = number * PagedDataMemory.PAGE_SIZE
+                changed += [first + offset for offset in range(0, PagedDataMemory.PAGE_SIZE) if page[offset] != previous[offset]]
+        return changed
+
+    def restore(self, snapshot):
+        self.pages = {number: array('i', page) for number, page in snapshot.items()}
+
+    def dirtyPages(self, snapshot):
+        if snapshot is None:
+            return dict(self.pages)
+        return {number: page for number, page in self.pages.items() if snapshot.get(number) != page}
+
+    def loadPage(self, number, values):
+        self.pages[number] = array('i', values)
+
+class BlockTranslator:
+    """
+    A class used to translate the basic blocks of a program into python functions
+
+    A block starts at any pc reached by the execution and ends with the first jmp, braz, branz or stop.
+    It is compiled once into a function running all its instructions with the registers held in local variables,
+    the function writes the modified registers back and returns the next pc (-1 once stopped).
+    Translated blocks are cached for the rest of the run.
+
+    Attributes
+    ----------
+        vm : object
+            the virtual machine whose program is translated
+
+        blocks : function table
+            the translated blocks indexed by their first pc (None while not translated)
+
+        blockCycles : int table
+            the number of machine cycles of each translated block indexed by its first pc
+
+        linePcs : table of int tables
+            the pc of each line of the source of each translated block indexed by its first pc, to find the instruction at fault
+
+        namespace : dictionary
+            the objects of the virtual machine used by the generated code
+
+    Methods
+    -------
+        run()
+            executes the program block by block from the current pc until it stops, raises SimulationError at the instruction at fault
+            with the registers it left (the ones of the block not written back yet are taken from its frame) and the cycles up to it
+
+        translate(pc)
+            translates the block starting at pc, caches and returns its function
+
+            Parameters
+            ----------
+            pc: int
+                first instruction of the block
+
+        generate(pc)
+            returns the python source of the block starting at pc, the pc following it and the pc of each line of the source
+
+            Parameters
+            ----------
+            pc: int
+                first instruction of the block
+    """
+    ALU = {     1: "{0} + {1}", 2: "{0} - {1}", 3: "{0} * {1}", 4: "{0} // {1}",
+                5: "({0} and {1})", 6: "({0} or {1})", 7: "{0} ^ {1}", 8: "{0} << {1}", 9: "{0} >> {1}",
+                10: "(1 if {0} <= {1} else 0)", 11: "(1 if {0} <= {1} else 0)", 12: "(1 if {0} == {1} else 0)"    }
+
+    # and, or and the comparisons can only produce one of their operands or 0/1
+    CHECKED = [1, 2, 3, 4, 7, 8, 9]
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.blocks = [None] * len(vm.program)
+        self.blockCycles = [0] * len(vm.program)
+        self.linePcs = [None] * len(vm.program)
+        self.namespace = {  "regs": vm.regs,
+                            "readDataMemory": vm.readMemory,
+                            "writeDataMemory": vm.writeMemory,
+                            "stop": vm.dispatch[0],
+                            "scall": vm.dispatch[36],
+                            "fitValue": vm.fitValue,
+                            "jumpError": vm.jumpError    }
+
+    def run(self):
+        blocks = self.blocks
+        blockCycles = self.blockCycles
+        pc = self.vm.pc
+        cycles = 0
+
+        try:
+            while pc >= 0:
+                block = blocks[pc]
+                if block is None:
+                    block = self.translate(pc)
+                cycles += blockCycles[pc]
+                pc = block()
+        except (IndexError, ZeroDivisionError, ValueError, SimulationError) as error:
+            # the frame of the block gives the line at fault, and the registers it has not written back yet
+            vm = self.vm
+            traceback = error.__traceback__
+            while traceback is not None and traceback.tb_frame.f_code.co_name != "block_" + str(pc):
+                traceback = traceback.tb_next
+            if traceback is not None:
+                start = pc
+                pc = self.linePcs[start][traceback.tb_lineno - 1]
+                for name, value in traceback.tb_frame.f_locals.items():
+                    # a trapped overflow leaves its result in the local, the register keeps its value like in the interpreter
+                    if name[0] == "r" and name[1:].isdigit() and -0x80000000 <= value <= 0x7FFFFFFF:
+                        vm.regs[int(name[1:])] = value
+                # the instructions following the one at fault are not counted, like in the interpreter
+                cycles -= blockCycles[start] - sum(vm.cycleCosts[start:pc + 1])
+            vm.performances.cycles += cycles
+            if isinstance(error, SimulationError):
+                # an overflow trapped by fitValue already has its message
+                raise
+            raise vm.fault(error, pc)
+
+        self.vm.performances.cycles += cycles
+
+    def translate(self, pc):
+        source, end, linePcs = self.generate(pc)
+        if source is None:
+            # the block starts with an undefined instruction, the interpreter handles it
+            handler, reg1, reg2, reg3 = self.vm.operations[pc]
+            block = lambda: handler(pc, reg1, reg2, reg3)
+        else:
+            namespace = dict(self.namespace)
+            exec(compile(source, "<block " + str(pc) + ">", "exec"), namespace)
+            block = namespace["block_" + str(pc)]
+
+        self.blocks[pc] = block
+        self.blockCycles[pc] = sum(self.vm.cycleCosts[pc:end])
+        self.linePcs[pc] = linePcs
+        return block
+
+    def generate(self, pc):
+        loads = []
+        written = []
+        body = []
+        # first line of the body of each instruction
+        starts = []
+
+        def read(reg):
+            if reg == 0:
+                return "0"
+            if reg not in written and reg not in loads:
+                loads.append(reg)
+            return "r" + str(reg)
+
+        def write(reg):
+            if reg not in written:
+                written.append(reg)
+            return "r" + str(reg)
+
+        def writeBack():
+            return ["regs[" + str(reg) + "] = r" + str(reg) for reg in sorted(written)]
+
+        def checkOverflow(reg):
+            return "if r" + str(reg) + " > 0x7FFFFFFF or r" + str(reg) + " < -0x80000000: r" + str(reg) + " = fitValue(r" + str(reg) + ", \"R\", " + str(reg) + ")"
+
+        index = pc
+        while index < len(self.vm.decoded):
+            op, reg1, reg2, reg3 = self.vm.decoded[index]
+            instrNum = (op & 63) >> 1
+            imm = op & 1
+            starts.append(len(body))
+
+            if instrNum in self.ALU:
+                expression = self.ALU[instrNum].format(read(reg1), read(reg2) if imm else str(reg2))
+                if reg3 == 0:
+                    body.append("_ = " + expression)
+                else:
+                    body.append(write(reg3) + " = " + expression)
+                    if instrNum in self.CHECKED:
+                        body.append(checkOverflow(reg3))
+
+            elif instrNum == 13: #load
+                expression = "readDataMemory(" + read(reg1) + " + " + (read(reg2) if imm else str(reg2)) + ")"
+                if reg3 == 0:
+                    body.append("_ = " + expression)
+                else:
+                    body.append(write(reg3) + " = " + expression)
+
+            elif instrNum == 14: #store
+                body.append("writeDataMemory(" + read(reg1) + " + " + (read(reg2) if imm else str(reg2)) + ", " + read(reg3) + ")")
+
+            elif instrNum == 18: #scall
+                # the callback of the scall can read and write any register, the block ends with it
+                body += writeBack()
+                body.append("return scall(" + str(index) + ", " + str(reg1) + ", 0, 0)")
+                index += 1
+                break
+
+            elif instrNum == 15: #jmp
+                if not imm:
+                    target = str(reg1)
+                elif reg1 == reg2:
+                    # the link register is written before the target is read
+                    target = str(index + 1)
+                else:
+                    target = read(reg1)
+                    body.append("if " + target + " < 0: jumpError(" + target + ")")
+                if reg2 != 0:
+                    body.append(write(reg2) + " = " + str(index + 1))
+                body += writeBack()
+                body.append("return " + target)
+                index += 1
+                break
+
+            elif instrNum == 16 or instrNum == 17: #braz, branz
+                condition = " == 0" if instrNum == 16 else " != 0"
+                test = read(reg1)
+                body += writeBack()
+                body.append("return " + str(reg2) + " if " + test + condition + " else " + str(index + 1))
+                index += 1
+                break
+
+            elif instrNum == 0: #stop
+                body += writeBack()
+                body.append("return stop(" + str(index) + ", 0, 0, 0)")
+                index += 1
+                break
+
+            else:
+                # undefined instruction, the block ends before it
+                if index == pc:
+                    return None, pc + 1, None
+                body += writeBack()
+                body.append("return " + str(index))
+                break
+
+            index += 1
+        else:
+            body += writeBack()
+            body.append("return " + str(index))
+
+        lines = ["def block_" + str(pc) + "(regs=regs, readDataMemory=readDataMemory, writeDataMemory=writeDataMemory, stop=stop, scall=scall, fitValue=fitValue, jumpError=jumpError):"]
+        lines += ["    r" + str(reg) + " = regs[" + str(reg) + "]" for reg in loads]
+        lines += ["    " + line for line in body]
+        # the def and the loads of the registers belong to the first instruction
+        linePcs = [pc] * (1 + len(loads))
+        for number, start in enumerate(starts):
+            linePcs += [pc + number] * ((starts[number + 1] if number + 1 < len(starts) else len(body)) - start)
+        return "\n".join(lines) + "\n", index, linePcs
+
+class Profiler:
+    """
+    A class used to profile the execution of a program, pc by pc
+
+    The counters are only updated by the profiled loop of the virtual machine, the other loops are left untouched.
+    At the end, the pcs are gathered in basic blocks and loops ranked by machine cycles, and named after the labels of the symbol file when there is one.
+
+    Attributes
+    ----------
+        vm : object
+            the virtual machine profiled
+
+        counts : int array
+            number of executions of each pc
+
+        cycles : int array
+            number of machine cycles spent on each pc (cache latencies included)
+
+        taken : int array
+            number of times each pc did not continue with the next one (taken branches and jumps)
+
+        labels : dictionary
+            the labels of the program indexed by address
+
+    Methods
+    -------
+        record(pc, nextPc, cycles)
+            counts one execution of the instruction at pc outside of the profiled loop
+
+            Parameters
+            ----------
+            pc: int
+                address of the instruction executed
+            nextPc: int
+                address of the next instruction (-1 once stopped)
+            cycles: int
+                number of machine cycles used by the instruction
+
+        loadSymbols(fileName)
+            reads the labels of a symbol file written by the assembler ("address label" lines)
+
+            Parameters
+            ----------
+            fileName: string
+                name of the symbol file
+
+        name(pc)
+            returns the name of a pc : its label, the previous label followed by an offset, or "pc_N"
+
+            Parameters
+            ----------
+            pc: int
+                address of the instruction
+
+        opcodes()
+            returns the number of executions of each instruction of the instruction set
+
+        blocks()
+            returns the executed basic blocks as dictionaries, ranked by machine cycles
+
+        loops()
+            returns the executed loops (a taken branch or jump backwards) as dictionaries, ranked by machine cycles
+
+        loadInFile(prefix)
+            saves the ranked report in prefix.txt, the profile in prefix.json and the collapsed stacks for flame graph tools in prefix.folded
+
+            Parameters
+            ----------
+            prefix: string
+                name of the files without extension
+    """
+    def __init__(self, vm):
+        self.vm = vm
+        self.counts = array('Q', [0]) * len(vm.program)
+        self.cycles = array('Q', [0]) * len(vm.program)
+        self.taken = array('Q', [0]) * len(vm.program)
+        self.labels = {}
+
+    def record(self, pc, nextPc, cycles):
+        self.counts[pc] += 1
+        self.cycles[pc] += cycles
+        if nextPc != pc + 1:
+            self.taken[pc] += 1
+
+    def loadSymbols(self, fileName):
+        for label, address in Program.loadSymbols(fileName).items():
+            self.labels.setdefault(address, label)
+
+    def name(self, pc):
+        if pc in self.labels:
+            return self.labels[pc]
+        previous = [address for address in self.labels if address < pc]
+        if previous:
+            return self.labels[max(previous)] + "+" + str(pc - max(previous))
+        return "pc_" + str(pc)
+
+    def opcodes(self):
+        counts = [0] * len(INSTRUCTION_SET)
+        for pc in range(0, len(self.counts)):
+            if self.counts[pc]:
+                instrNum = (self.vm.decoded[pc][0] & 63) >> 1
+                if instrNum < len(counts):
+                    counts[instrNum] += self.counts[pc]
+        return {INSTRUCTION_SET[i]: counts[i] for i in range(0, len(counts)) if counts[i]}
+
+    def blocks(self):
+        # a block starts at the first pc, a label, a branch target or after a jmp, braz, branz or stop
+        leaders = set([0]) | set(self.labels)
+        for pc, (op, reg1, reg2, reg3) in enumerate(self.vm.decoded):
+            instrNum = (op & 63) >> 1
+            if instrNum in (0, 15, 16, 17):
+                leaders.add(pc + 1)
+            if instrNum in (16, 17):
+                leaders.add(reg2)
+            elif instrNum == 15 and not op & 1:
+                leaders.add(reg1)
+        leaders = sorted([pc for pc in leaders if pc < len(self.counts)])
+
+        blocks = []
+        for i in range(0, len(leaders)):
+            start = leaders[i]
+            end = leaders[i + 1] if i + 1 < len(leaders) else len(self.counts)
+            cycles = sum(self.cycles[start:end])
+            if cycles:
+                blocks.append({"name": self.name(start), "start": start, "end": end - 1, "executions": max(self.counts[start:end]), "cycles": cycles})
+        return sorted(blocks, key = lambda block: block["cycles"], reverse = True)
+
+    def loops(self):
+        loops = []
+        for pc, (op, reg1, reg2, reg3) in enumerate(self.vm.decoded):
+            instrNum = (op & 63) >> 1
+            if instrNum in (16, 17):
+                target = reg2
+            elif instrNum == 15 and not op & 1:
+                target = reg1
+            else:
+                continue
+            if target <= pc and self.taken[pc]:
+                loops.append({"name": self.name(target), "start": target, "end": pc, "iterations": self.taken[pc], "cycles": sum(self.cycles[target:pc + 1])})
+        return sorted(loops, key = lambda loop: loop["cycles"], reverse = True)
+
+    def loadInFile(self, prefix):
+        vm = self.vm
+        total = sum(self.cycles)
+        blocks = self.blocks()
+        loops = self.loops()
+
+        instructions = []
+        for pc in range(0, len(self.counts)):
+            if self.counts[pc]:
+                vm.decode(vm.program[pc])
+                instruction = {"pc": pc, "address": vm.address[pc], "name": self.name(pc), "instruction": vm.disassemble(), "count": self.counts[pc], "cycles": self.cycles[pc]}
+                if vm.instrNum in (16, 17):
+                    instruction["taken"] = self.taken[pc]
+                    instruction["not_taken"] = self.counts[pc] - self.taken[pc]
+                instructions.append(instruction)
+
+        file = open(prefix + ".txt", "w")
+        file.write("Profile of " + str(vm.inputFile) + " : " + str(sum(self.counts)) + " instruction(s), " + str(total) + " machine cycle(s)\n\n")
+        file.write("Hot loops :\n")
+        for loop in loops:
+            file.write("  %-20s pc %5d-%-5d %10d iteration(s) %12d cycle(s) %6.2f %%\n" % (loop["name"], loop["start"], loop["end"], loop["iterations"], loop["cycles"], 100.0 * loop["cycles"] / max(total, 1)))
+        file.write("\nHot basic blocks :\n")
+        for block in blocks:
+            file.write("  %-20s pc %5d-%-5d %10d execution(s) %12d cycle(s) %6.2f %%\n" % (block["name"], block["start"], block["end"], block["executions"], block["cycles"], 100.0 * block["cycles"] / max(total, 1)))
+        file.write("\nInstructions :\n")
+        for name, count in sorted(self.opcodes().items(), key = lambda item: item[1], reverse = True):
+            file.write("  %-8s %12d\n" % (name, count))
+        file.write("\nBranches :\n")
+        for instruction in instructions:
+            if "taken" in instruction:
+                file.write("  %-20s %-24s %10d taken %10d not taken\n" % (instruction["name"], instruction["instruction"], instruction["taken"], instruction["not_taken"]))
+        file.close()
+
+        file = open(prefix + ".json", "w")
+        json.dump({"program": str(vm.inputFile), "instructions": sum(self.counts), "cycles": total, "opcodes": self.opcodes(),
+                    "pcs": instructions, "blocks": blocks, "loops": loops}, file, indent = 1)
+        file.close()
+
+        # one "program;block;instruction cycles" line per executed pc
+        root = os.path.basename(str(vm.inputFile)).replace(";", "_").replace(" ", "_")
+        owners = {}
+        for block in blocks:
+            for pc in range(block["start"], block["end"] + 1):
+                owners[pc] = block["name"]
+        lines = []
+        for instruction in instructions:
+            lines.append(root + ";" + owners[instruction["pc"]] + ";" + (str(instruction["pc"]) + ":" + instruction["instruction"]).replace(" ", "_").replace(";", "_") + " " + str(instruction["cycles"]))
+        file = open(prefix + ".folded", "w")
+        file.write("\n".join(lines) + "\n")
+        file.close()
+
+class BranchPredictor:
+    """
+    A class used to simulate a branch predictor watching the braz, branz and jmp instructions
+
+    The direction of braz and branz is predicted by a static policy (always taken or never taken), a table of 1 bit or 2 bits saturating counters
+    indexed by the pc, or gshare (2 bits counters indexed by the pc xor the global history of the last outcomes).
+    The target of a jmp on a register is predicted by a direct mapped BTB, the other jmp are always well predicted.
+    Every misprediction adds the penalty to the machine cycles. Only the handlers of the branches are wrapped, the other instructions run untouched.
+
+    Attributes
+    ----------
+        kind : string
+            the prediction policy, one of BRANCH_PREDICTORS
+
+        entries : int
+            number of counters of the table (a power of 2)
+
+        history : int
+            number of outcomes kept in the global history of gshare
+
+        btbEntries : int
+            number of entries of the BTB (a power of 2)
+
+        penalty : int
+            machine cycles added by a misprediction
+
+        counters : bytearray
+            the prediction counters
+
+        btbTags, btbTargets : int arrays
+            the pc and the target of the last jmp on a register stored in each entry of the BTB
+
+        executions, taken, mispredicts : int arrays
+            per pc, the number of executions, taken transfers and mispredictions of each branch (the executions of braz and branz are deduced once the run is over)
+
+        targets : dictionary
+            per jmp on a register, the number of transfers to each target
+
+        entry : int
+            the pc where the execution started
+
+    Methods
+    -------
+        instrument(vm)
+            wraps the handlers of the branches of a virtual machine with the prediction
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        instructions(vm)
+            returns the number of instructions executed, deduced from the entry pc and the transfers counted on the branches, and fills the executions of braz and branz
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        description()
+            returns the text describing the predictor
+
+        statistics(vm)
+            returns the text giving the accuracy and the MPKI (mispredictions per thousand instructions)
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        reportBranches(file)
+            writes the accuracy of each branch in the report file
+
+            Parameters
+            ----------
+            file: object
+                the report file
+    """
+    def __init__(self, kind = "2bit", entries = 1024, history = 8, btb_entries = 64, penalty = 2):
+        if kind not in BRANCH_PREDICTORS:
+            raise SimulationError("Unknown branch predictor : " + str(kind) + " (expected one of " + ", ".join(BRANCH_PREDICTORS) + ")")
+        if entries < 1 or entries & (entries - 1) or btb_entries < 1 or btb_entries & (btb_entries - 1):
+            raise SimulationError("The number of entries of the prediction table and of the BTB must be powers of 2")
+
+        self.kind = kind
+        self.entries = entries
+        self.history = history
+        self.btbEntries = btb_entries
+        self.penalty = penalty
+
+        # 1 bit counters start not taken, 2 bits counters weakly not taken
+        self.counters = bytearray([1 if kind in ("2bit", "gshare") else 0]) * entries
+        self.btbTags = array('q', [-1]) * btb_entries
+        self.btbTargets = array('q', [0]) * btb_entries
+        self.executions = None
+        self.taken = None
+        self.mispredicts = None
+        self.targets = {}
+        self.entry = 0
+
+    def instrument(self, vm):
+        size = len(vm.program)
+        self.executions = array('Q', [0]) * size
+        self.taken = array('Q', [0]) * size
+        self.mispredicts = array('Q', [0]) * size
+        self.entry = vm.pc
+        executions = self.executions
+        taken = self.taken
+        mispredicts = self.mispredicts
+        counters = self.counters
+        btbTags = self.btbTags
+        btbTargets = self.btbTargets
+        targets = self.targets
+        performances = vm.performances
+        penalty = self.penalty
+        mask = self.entries - 1
+        btbMask = self.btbEntries - 1
+        historyMask = (1 << self.history) - 1
+        kind = self.kind
+        maximum = 1 if kind == "1bit" else 3
+        threshold = 1 if kind == "1bit" else 2
+
+        regs = vm.regs
+
+        # braz and branz are replaced by handlers doing the branch and its prediction at once,
+        # their executions are deduced from the transfers by instructions(), only the jmp count them
+        def static(zero, prediction):
+            def run(pc, reg1, reg2, reg3):
+                if (regs[reg1] == 0) is zero:
+                    taken[pc] += 1
+                    if not prediction:
+                        mispredicts[pc] += 1
+                        performances.cycles += penalty
+                    return reg2
+                if prediction:
+                    mispredicts[pc] += 1
+                    performances.cycles += penalty
+                return pc + 1
+            return run
+
+        def counting(zero):
+            def run(pc, reg1, reg2, reg3):
+                index = pc & mask
+                counter = counters[index]
+                if (regs[reg1] == 0) is zero:
+                    taken[pc] += 1
+                    if counter < threshold:
+                        mispredicts[pc] += 1
+                        performances.cycles += penalty
+                    if counter < maximum:
+                        counters[index] = counter + 1
+                    return reg2
+                if counter >= threshold:
+                    mispredicts[pc] += 1
+                    performances.cycles += penalty
+                if counter:
+                    counters[index] = counter - 1
+                return pc + 1
+            return run
+
+        history = 0
+
+        def sharing(zero):
+            def run(pc, reg1, reg2, reg3):
+                nonlocal history
+                index = (pc ^ history) & mask
+                counter = counters[index]
+                if (regs[reg1] == 0) is zero:
+                    taken[pc] += 1
+                    history = ((history << 1) | 1) & historyMask
+                    if counter < 2:
+                        mispredicts[pc] += 1
+                        performances.cycles += penalty
+                    if counter < 3:
+                        counters[index] = counter + 1
+                    return reg2
+                history = (history << 1) & historyMask
+                if counter >= 2:
+                    mispredicts[pc] += 1
+                    performances.cycles += penalty
+                if counter:
+                    counters[index] = counter - 1
+                return pc + 1
+            return run
+
+        def direct(handler):
+            def run(pc, reg1, reg2, reg3):
+                executions[pc] += 1
+                return handler(pc, reg1, reg2, reg3)
+            return run
+
+        def indirect(handler):
+            def run(pc, reg1, reg2, reg3):
+                nextPc = handler(pc, reg1, reg2, reg3)
+                executions[pc] += 1
+                jumps = targets.setdefault(pc, {})
+                jumps[nextPc] = jumps.get(nextPc, 0) + 1
+                index = pc & btbMask
+                if btbTags[index] != pc or btbTargets[index] != nextPc:
+                    mispredicts[pc] += 1
+                    performances.cycles += penalty
+                    btbTags[index] = pc
+                    btbTargets[index] = nextPc
+                return nextPc
+            return run
+
+        for pc in range(0, size):
+            handler, reg1, reg2, reg3 = vm.operations[pc]
+            op = vm.decoded[pc][0] & 63
+            if op == 30:
+                handler = direct(handler)
+            elif op == 31:
+                handler = indirect(handler)
+            elif 32 <= op <= 35:
+                if kind in ("taken", "not-taken"):
+                    handler = static(op < 34, kind == "taken")
+                elif kind == "gshare":
+                    handler = sharing(op < 34)
+                else:
+                    handler = counting(op < 34)
+            vm.operations[pc] = (handler, reg1, reg2, reg3)
+
+    def instructions(self, vm):
+        # every pc is executed as many times as it is entered : by a transfer, or from the previous pc when it is not a jmp or a stop
+        # (only the not taken executions for braz and branz), the pcs are walked in order so the executions of a branch are known before its fall through
+        size = len(vm.decoded)
+        incoming = [0] * (size + 1)
+        incoming[self.entry] += 1
+        for pc in range(0, size):
+            op, reg1, reg2, reg3 = vm.decoded[pc]
+            op &= 63
+            if op == 30:
+                incoming[reg1] += self.executions[pc]
+            elif op == 31:
+                for target, count in self.targets.get(pc, {}).items():
+                    if 0 <= target < size:
+                        incoming[target] += count
+            elif 32 <= op <= 35:
+                incoming[reg2] += self.taken[pc]
+
+        executed = 0
+        count = 0
+        for pc in range(0, size):
+            previous = vm.decoded[pc - 1][0] & 63 if pc > 0 else 0
+            if previous in (0, 1, 30, 31):
+                count = incoming[pc]
+            elif 32 <= previous <= 35:
+                count = incoming[pc] + count - self.taken[pc - 1]
+            else:
+                count += incoming[pc]
+            if 32 <= vm.decoded[pc][0] & 63 <= 35:
+                self.executions[pc] = count
+            executed += count
+        return executed
+
+    def description(self):
+        text = self.kind
+        if self.kind in ("1bit", "2bit", "gshare"):
+            text += ", " + str(self.entries) + " counter(s)"
+        if self.kind == "gshare":
+            text += ", history of " + str(self.history) + " branch(es)"
+        return text + ", BTB of " + str(self.btbEntries) + " entries, penalty " + str(self.penalty) + " cycle(s)"
+
+    def statistics(self, vm):
+        instructions = self.instructions(vm)
+        branches = sum(self.executions)
+        mispredicts = sum(self.mispredicts)
+        accuracy = round(100 * (branches - mispredicts) / branches, 2) if branches else 0
+        mpki = round(1000 * mispredicts / instructions, 3) if instructions else 0
+        return (str(branches) + " branch(es), " + str(mispredicts) + " misprediction(s) (accuracy " + str(accuracy) + " %), "
+                + str(instructions) + " instruction(s), MPKI " + str(mpki))
+
+    def reportBranches(self, file):
+        file.write("BRANCH PREDICTION : \n")
+        for pc in range(0, len(self.executions)):
+            if self.executions[pc]:
+                executions = self.executions[pc]
+                file.write("PC " + str(pc) + " : " + str(executions) + " execution(s), " + str(self.taken[pc]) + " taken, "
+                            + str(self.mispredicts[pc]) + " misprediction(s), accuracy " + str(round(100 * (executions - self.mispredicts[pc]) / executions, 2)) + " %\n")
+
+class Watchdog:
+    """
+    A class used to stop a simulation which runs too long or never terminates
+
+    The budgets (instructions, machine cycles, seconds) are checked between slices of at most SLICE instructions executed by the dispatch table,
+    a slice being shortened so that it does not go past the budget of instructions or cycles : the simulation stops at the first instruction
+    once a budget is reached (the penalties of a cache or of a branch predictor can make the cycles go a few beyond).
+    The loop detection wraps the store instructions, which keep a hash of the memory up to date (the sum of a hash of each slot, changed by each store),
+    and the branches which can go backwards. When a backward branch is taken, the state (target pc, registers, memory hash) is compared
+    to a saved state, saved again after 1, 2, 4, 8... backward branches (Brent's cycle detection) : a loop repeating the same states is found
+    within a few times its length, whatever the number of states before it. When the state matches, a copy of the memory is compared when it matches again :
+    the loop is only reported if the whole state is the same, so it never runs forever. A scall other than scall 1 forgets the saved state, the value it reads can change the next states.
+
+    Attributes
+    ----------
+        maxSteps, maxCycles : int
+            number of instructions and of machine cycles allowed, None without limit
+
+        timeout : float
+            number of seconds allowed, None without limit
+
+        detectLoops : bool
+            True to stop when the same state repeats
+
+        steps : int
+            number of instructions executed so far (by run() or counted by tick())
+
+        deadline : float
+            value of time.perf_counter() when the timeout expires, None without timeout
+
+        reason : string
+            why the simulation was stopped, None while it was not stopped by the watchdog
+
+        status : int
+            exit status of VirtualMachineProgram.py when the simulation was stopped : EXIT_LIMIT for a budget, EXIT_LOOP for a loop
+
+        stopPc : int
+            pc where the simulation was stopped
+
+        memoryHash : int
+            hash of the memory, updated by the stores
+
+        saved : tuple
+            the (pc, registers, memory hash) state compared with the next ones, None before the first backward branch
+
+        power, count : int
+            number of backward branches before the state is saved again, and since it was saved
+
+        confirm : object
+            copy of the memory taken when the state matched the saved one, None otherwise
+
+        branches : int
+            number of backward branches when the state matched the saved one
+
+        SLICE : int
+            maximum number of instructions executed between two checks of the budgets
+
+        EXIT_LIMIT, EXIT_LOOP : int
+            exit statuses of a simulation stopped by a budget and by the loop detection
+
+    Methods
+    -------
+        start()
+            starts the timeout, called when the execution starts
+
+        instrument(vm)
+            wraps the store instructions and the branches which can go backwards of a virtual machine for the loop detection
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        run(vm)
+            executes the predecoded program like runHeadless until it stops or a budget is reached
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        tick(vm)
+            counts an instruction executed by another loop and stops the virtual machine when a budget is reached, returns True if it was stopped
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+
+        stop(vm, pc, reason, status)
+            stops the virtual machine before the instruction at pc
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+            pc: int
+                pc of the next instruction
+            reason: string
+                text of the report
+            status: int
+                EXIT_LIMIT or EXIT_LOOP
+
+        description(vm)
+            returns the text of the report describing where the simulation was stopped
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine
+    """
+    SLICE = 65536
+    EXIT_LIMIT = 3
+    EXIT_LOOP = 4
+
+    def __init__(self, max_steps = None, max_cycles = None, timeout = None, detect_loops = False):
+        if (max_steps is not None and max_steps < 1) or (max_cycles is not None and max_cycles < 1) or (timeout is not None and timeout <= 0):
+            raise SimulationError("The limits of instructions, cycles and seconds must be positive")
+        self.maxSteps = max_steps
+        self.maxCycles = max_cycles
+        self.timeout = timeout
+        self.detectLoops = detect_loops
+        self.steps = 0
+        self.deadline = None
+        self.reason = None
+        self.status = 0
+        self.stopPc = None
+
+        self.memoryHash = 0
+        self.saved = None
+        self.power = 1
+        self.count = 0
+        self.confirm = None
+        self.branches = 0
+
+    def start(self):
+        if self.timeout is not None:
+            self.deadline = time.perf_counter() + self.timeout
+
+    def instrument(self, vm):
+        if not self.detectLoops:
+            return
+        regs = vm.regs
+        dataMemory = vm.dataMemory
+        readDataMemory = dataMemory.readDataMemory
+        size = dataMemory.num_data_mem_cells
+        mask = 0xFFFFFFFFFFFFFFFF
+
+        def storing(handler, register):
+            def run(pc, reg1, reg2, reg3):
+                address = regs[reg1] + (regs[reg2] if register else reg2)
+                if 0 <= address < size:
+                    old = readDataMemory(address)
+                    nextPc = handler(pc, reg1, reg2, reg3)
+                    self.memoryHash = (self.memoryHash + hash((address, regs[reg3])) - hash((address, old))) & mask
+                    return nextPc
+                return handler(pc, reg1, reg2, reg3)
+            return run
+
+        def check(pc, target):
+            state = (target, regs.tobytes(), self.memoryHash)
+            if state == self.saved:
+                if self.confirm is None:
+                    self.confirm = dataMemory.snapshot()
+                    self.branches = self.count
+                elif not dataMemory.changedSlots(self.confirm):
+                    self.stop(vm, target, "infinite loop, the state at PC " + str(target) + " (backward branch at PC " + str(pc) + ") repeats every "
+                              + str(self.count - self.branches) + " backward branch(es)", Watchdog.EXIT_LOOP)
+                    return -1
+                else:
+                    # two different memories with the same hash
+                    self.confirm = None
+            self.count += 1
+            if self.confirm is None and self.count >= self.power:
+                self.saved = state
+                self.power *= 2
+                self.count = 0
+            return target
+
+        def branching(handler, target):
+            def run(pc, reg1, reg2, reg3):
+                nextPc = handler(pc, reg1, reg2, reg3)
+                if nextPc == target:
+                    return check(pc, nextPc)
+                return nextPc
+            return run
+
+        def jumping(handler):
+            def run(pc, reg1, reg2, reg3):
+                nextPc = handler(pc, reg1, reg2, reg3)
+                if 0 <= nextPc <= pc:
+                    return check(pc, nextPc)
+                return nextPc
+            return run
+
+        def reading(handler):
+            def run(pc, reg1, reg2, reg3):
+                self.saved = None
+                self.confirm = None
+                self.power = 1
+                self.count = 0
+                return handler(pc, reg1, reg2, reg3)
+            return run
+
+        for pc in range(0, len(vm.operations)):
+            handler, reg1, reg2, reg3 = vm.operations[pc]
+            op = vm.decoded[pc][0] & 63
+            if op == 28 or op == 29:
+                handler = storing(handler, op & 1)
+            elif (op == 32 or op == 33 or op == 34 or op == 35) and reg2 <= pc:
+                handler = branching(handler, reg2)
+            elif op == 30 and reg1 <= pc:
+                handler = branching(handler, reg1)
+            elif op == 31:
+                handler = jumping(handler)
+            elif (op == 36 or op == 37) and reg1 != 1:
+                handler = reading(handler)
+            vm.operations[pc] = (handler, reg1, reg2, reg3)
+
+    def run(self, vm):
+        if vm.running and vm.regs[0] != 0:
+            vm.step()
+            self.steps += 1
+
+        operations = vm.operations
+        cycleCosts = vm.cycleCosts
+        performances = vm.performances
+        maxCost = max(max(cycleCosts, default = 1), 1)
+        pc = vm.pc if vm.running else -1
+
+        while pc >= 0:
+            if self.maxSteps is not None and self.steps >= self.maxSteps:
+                self.stop(vm, pc, str(self.maxSteps) + " instruction(s) executed (--max-steps)", Watchdog.EXIT_LIMIT)
+                break
+            if self.maxCycles is not None and performances.cycles >= self.maxCycles:
+                self.stop(vm, pc, str(self.maxCycles) + " machine cycle(s) reached (--max-cycles)", Watchdog.EXIT_LIMIT)
+                break
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                self.stop(vm, pc, str(self.timeout) + " second(s) elapsed (--timeout)", Watchdog.EXIT_LIMIT)
+                break
+
+            count = Watchdog.SLICE
+            if self.maxSteps is not None:
+                count = min(count, self.maxSteps - self.steps)
+            if self.maxCycles is not None:
+                count = max(1, min(count, (self.maxCycles - performances.cycles) // maxCost))
+
+            cycles = 0
+            executed = 0
+            try:
+                for executed in range(1, count + 1):
+                    handler, reg1, reg2, reg3 = operations[pc]
+                    cycles += cycleCosts[pc]
+                    pc = handler(pc, reg1, reg2, reg3)
+                    if pc < 0:
+                        break
+            except OverflowError:
+                performances.cycles += cycles
+                cycles = 0
+                pc = vm.overflowStep(pc)
+            except (IndexError, ZeroDivisionError, ValueError) as error:
+                performances.cycles += cycles
+                raise vm.fault(error, pc)
+            self.steps += executed
+            performances.cycles += cycles
+
+    def tick(self, vm):
+        self.steps += 1
+        if not vm.running:
+            return False
+        if self.maxSteps is not None and self.steps >= self.maxSteps:
+            self.stop(vm, vm.pc, str(self.maxSteps) + " instruction(s) executed (--max-steps)", Watchdog.EXIT_LIMIT)
+        elif self.maxCycles is not None and vm.performances.cycles >= self.maxCycles:
+            self.stop(vm, vm.pc, str(self.maxCycles) + " machine cycle(s) reached (--max-cycles)", Watchdog.EXIT_LIMIT)
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stop(vm, vm.pc, str(self.timeout) + " second(s) elapsed (--timeout)", Watchdog.EXIT_LIMIT)
+        return not vm.running
+
+    def stop(self, vm, pc, reason, status):
+        vm.pc = pc
+        vm.running = False
+        self.stopPc = pc
+        self.reason = reason
+        self.status = status
+
+    def description(self, vm):
+        where = "PC " + str(self.stopPc)
+        if vm.symbols is not None:
+            labels = [(address, label) for label, address in Program.loadSymbols(vm.symbols).items() if address <= self.stopPc]
+            if labels:
+                address, label = max(labels)
+                where += " (" + label + ("+" + str(self.stopPc - address) if address != self.stopPc else "") + ")"
+        return "stopped at " + where + " after " + str(self.steps) + " instruction(s) : " + self.reason
+
+class History:
+    """
+    A class used to record the execution of a virtual machine so that it can be executed backwards
+
+    Before each instruction, the old value of its destination (a register, or the memory slot of a store), the old pc and the old number of cycles
+    are written in ring buffers of capacity entries. Undoing a step writes them back.
+    Every interval steps, a copy of the state is kept : going back further than the ring buffers restores the copy before
+    the target step and executes again at most interval steps, the values of r1 given by scall 0 and by the scall callbacks being replayed from the log.
+    Only the latest copy holds the whole memory, each copy keeps the registers and the slots stored since the previous one with their value at that copy,
+    so the memory used grows with the number of stores recorded (8 bytes each at most) rather than with the size of the memory at each copy.
+
+    Attributes
+    ----------
+        vm : object
+            the virtual machine recorded
+
+        interval : int
+            number of steps between two copies of the state
+
+        capacity : int
+            number of steps kept in the ring buffers
+
+        pcs, targets, values, cycles : arrays
+            the ring buffers : old pc, destination (register number, -2 - address for a memory slot, -1 without destination), old value and old number of cycles of each step
+
+        destinations : int array
+            the destination of the instruction at each pc, a register number or one of NONE, STORE_IMM, STORE_REG, INPUT (scall 0 and the scalls with a callback)
+            and OUTPUT (scall 1 and the other scalls displaying r1)
+
+        step : int
+            number of steps executed since the start of the recording
+
+        highest : int
+            highest step reached, the steps below it are executed again when they are replayed
+
+        oldest : int
+            first step still in the ring buffers
+
+        checkpoints : dictionary
+            the copies of the state (pc, running, cycles, registers, addresses and values at the previous copy of the slots stored since it) indexed by step
+
+        latest : int
+            step of the latest copy
+
+        memory : object
+            snapshot of the memory at the latest copy
+
+        inputs : dictionary
+            the values of r1 given by scall 0 and by the scall callbacks, indexed by step
+
+    Methods
+    -------
+        log(pc, target, value, cycles)
+            writes a step in the ring buffers, and a copy of the state every interval steps
+
+            Parameters
+            ----------
+            pc: int
+                address of the instruction executed
+            target: int
+                destination of the instruction (register number, -2 - address for a memory slot, -1 without destination)
+            value: int
+                value of the destination before the instruction
+            cycles: int
+                number of cycles before the instruction
+
+        undo()
+            executes the previous step backwards, returns False when it is no longer in the ring buffers
+
+        restore(step)
+            sets the state back to the copy of a step, its memory being rebuilt from the latest copy by going back through the copies after it
+
+            Parameters
+            ----------
+            step: int
+                a step of the checkpoints dictionary
+
+        checkpoint()
+            keeps a copy of the current state, the slots stored since the previous copy being found in the ring buffers
+    """
+    NONE = -1
+    STORE_IMM = -2
+    STORE_REG = -3
+    INPUT = -4
+    OUTPUT = -5
+
+    def __init__(self, vm, interval = 10000):
+        self.vm = vm
+        self.interval = interval
+        self.capacity = 2 * interval
+        self.pcs = array('i', [0]) * self.capacity
+        self.targets = array('q', [0]) * self.capacity
+        self.values = array('q', [0]) * self.capacity
+        self.cycles = array('Q', [0]) * self.capacity
+
+        self.destinations = array('i', [History.NONE]) * len(vm.decoded)
+        for pc in range(0, len(vm.decoded)):
+            op, reg1, reg2, reg3 = vm.decoded[pc]
+            instrNum = (op & 63) >> 1
+            if 1 <= instrNum <= 13:
+                self.destinations[pc] = reg3
+            elif instrNum == 14:
+                self.destinations[pc] = History.STORE_REG if op & 1 else History.STORE_IMM
+            elif instrNum == 15:
+                self.destinations[pc] = reg2
+            elif instrNum == 18:
+                # a callback can return r1 like scall 0, its value is replayed from the log instead of calling it again
+                self.destinations[pc] = History.OUTPUT if vm.scalls.get(reg1, VirtualMachine.writeOutput) is VirtualMachine.writeOutput else History.INPUT
+
+        self.step = 0
+        self.highest = 0
+        self.oldest = 0
+        self.checkpoints = {}
+        self.latest = 0
+        self.memory = None
+        self.inputs = {}
+        self.checkpoint()
+
+    def log(self, pc, target, value, cycles):
+        index = self.step % self.capacity
+        self.pcs[index] = pc
+        self.targets[index] = target
+        self.values[index] = value
+        self.cycles[index] = cycles
+        self.step += 1
+        self.highest = max(self.highest, self.step)
+        self.oldest = max(self.oldest, self.step - self.capacity)
+        if self.step % self.interval == 0 and self.step not in self.checkpoints:
+            self.checkpoint()
+
+    def undo(self):
+        if self.step <= self.oldest:
+            return False
+        self.step -= 1
+        index = self.step % self.capacity
+        target = self.targets[index]
+        if target >= 0:
+            self.vm.regs[target] = self.values[index]
+        elif target != History.NONE:
+            self.vm.dataMemory.writeDataMemory(-2 - target, self.values[index])
+        self.vm.pc = self.pcs[index]
+        self.vm.performances.cycles = self.cycles[index]
+        self.vm.running = True
+        return True
+
+    def restore(self, step):
+        pc, running, cycles, regs, addresses, values = self.checkpoints[step]
+        self.vm.pc = pc
+        self.vm.running = running
+        self.vm.performances.cycles = cycles
+        self.vm.regs[:] = regs
+        dataMemory = self.vm.dataMemory
+        dataMemory.restore(self.memory)
+        for later in sorted([checkpoint for checkpoint in self.checkpoints if checkpoint > step], reverse = True):
+            for address, value in zip(self.checkpoints[later][4], self.checkpoints[later][5]):
+                dataMemory.writeDataMemory(address, value)
+        self.step = step
+        # the ring buffers are only valid from the copy on, they are written again by the replay
+        self.oldest = step
+
+    def checkpoint(self):
+        # the copies are only made going forward, so the steps since the latest copy are the last ones logged
+        stored = {}
+        for step in range(self.step - 1, self.latest - 1, -1):
+            target = self.targets[step % self.capacity]
+            if target <= -2:
+                # the first store of a slot since the copy gives its value at the copy
+                stored[-2 - target] = self.values[step % self.capacity]
+        self.checkpoints[self.step] = (self.vm.pc, self.vm.running, self.vm.performances.cycles, array('i', self.vm.regs), array('i', stored.keys()), array('i', stored.values()))
+        self.latest = self.step
+        self.memory = self.vm.dataMemory.snapshot()
+
+class Debugger:
+    """
+    A class used to debug a program interactively with breakpoints and watchpoints
+
+    Between two stops the program runs in the runHeadless loop of the virtual machine. A breakpoint is not a test made at each step :
+    the pcs marked in the bitmap get their handler replaced in vm.operations by one stopping the machine before the instruction,
+    and only the instructions able to write a watched register or memory slot get their handler wrapped by one comparing its value after the instruction.
+    At each stop, only the registers and memory slots changed since the previous stop are displayed.
+    Once recording, the instructions are executed one by one and logged in a History, which allows to go back.
+
+    Commands (read on the standard input at the "(debug)" prompt) :
+        break PC|LABEL [if CONDITION]     stops before the instruction
+        watch rN|mN [if CONDITION]        stops after an instruction changing the register or the memory slot
+        delete N|all                      removes a breakpoint or watchpoint
+        continue (c)                      runs until the next stop
+        step (s) [N]                      executes N instructions (1 by default)
+        until PC|LABEL                    runs until the instruction
+        regs, mem [FIRST [COUNT]]         displays the registers, the memory slots
+        info                              lists the breakpoints and watchpoints
+        checkpoint [FILE]                 saves the state in a checkpoint file (by default the --checkpoint one)
+        record [K|off]                    starts recording the steps, with a copy of the state every K steps (10000 by default)
+        reverse-step (rs) [N]             goes back N steps (1 by default) while recording
+        reverse-continue (rc)             goes back to the previous breakpoint or change of a watched value while recording
+        goto N                            goes to step N of the recording
+        quit (q)                          ends the simulation where it is (also at the end of the input)
+    A condition compares a register or a memory slot to a value, a register or a memory slot, e.g. "r3 == 10" or "m4 > r2".
+
+    Attributes
+    ----------
+        vm : object
+            the virtual machine debugged
+
+        operations : tuple table
+            the operations of the virtual machine before any breakpoint or watchpoint
+
+        bitmap : bytearray
+            1 for each pc with a breakpoint
+
+        points : dictionary
+            the breakpoints and watchpoints indexed by their number, as dictionaries
+
+        labels : dictionary
+            the labels of the symbol file of the program, indexed by name
+
+        resumePc : int
+            pc of the breakpoint to go through when the execution resumes from it, -1 otherwise
+
+        pending : int
+            pc of the breakpoint which stopped the machine before its instruction, None otherwise
+
+        reason : string
+            why the machine stopped, None while it runs
+
+        history : object
+            the History of the steps executed since the record command, None when not recording
+
+        regsSnapshot, memorySnapshot : object
+            the registers and the memory at the previous stop
+
+    Methods
+    -------
+        run()
+            reads and executes the commands until the end of the program or quit
+
+        command(line)
+            executes a command, returns False to quit
+
+            Parameters
+            ----------
+            line: string
+                the command typed
+
+        resume(count)
+            executes the program until a stop, or count instructions at most
+
+            Parameters
+            ----------
+            count: int
+                maximum number of instructions, None to run at full speed
+
+        stepInstructions(count)
+            executes at most count instructions one by one, through the same handlers as runHeadless
+
+            Parameters
+            ----------
+            count: int
+                maximum number of instructions
+
+        recordInstructions(operations, count)
+            executes at most count instructions (-1 for no limit) one by one, logging them in the history
+
+            Parameters
+            ----------
+            operations: tuple table
+                the operations executed, with or without the breakpoints and watchpoints
+            count: int
+                maximum number of instructions
+
+        goto(step)
+            goes to a step of the history, backwards through the ring buffers when it is close enough, otherwise from the copy of the state before it
+
+            Parameters
+            ----------
+            step: int
+                the step to go to
+
+        reverseContinue()
+            goes back step by step until a breakpoint is hit or a watched value is changed back
+
+        install()
+            builds vm.operations from the original operations, the watchpoints and the bitmap of the breakpoints
+
+        breakHandler(handler, points)
+            returns the handler stopping before the instruction when one of the breakpoints of its pc is hit
+
+            Parameters
+            ----------
+            handler: function
+                handler of the instruction
+            points: dictionary table
+                the breakpoints of the pc
+
+        watchHandler(handler, points)
+            returns the handler stopping after the instruction when one of the watched values changed
+
+            Parameters
+            ----------
+            handler: function
+                handler of the instruction
+            points: dictionary table
+                the watchpoints which can be changed by the instruction
+
+        writers(kind, index)
+            returns the pcs of the instructions able to write a register ("r") or a memory slot ("m")
+
+            Parameters
+            ----------
+            kind: string
+                "r" or "m"
+            index: int
+                number of the register or memory slot
+
+        location(text)
+            returns the pc of a decimal, hexadecimal (0x) or label location, None if it is not valid
+
+            Parameters
+            ----------
+            text: string
+                the location typed
+
+        operand(text)
+            returns the function reading a register (rN), a memory slot (mN) or a constant, None if it is not valid
+
+            Parameters
+            ----------
+            text: string
+                the operand typed
+
+        condition(text)
+            returns the function testing a condition, None if it is not valid
+
+            Parameters
+            ----------
+            text: string
+                the condition typed
+
+        name(pc)
+            returns the pc followed by its label, or the previous label and an offset, when there is a symbol file
+
+            Parameters
+            ----------
+            pc: int
+                address of the instruction
+
+        showStop()
+            displays the reason of the stop, the next instruction and what changed since the previous stop
+
+        showRegs()
+            displays all the registers
+
+        showMemory(first, count)
+            displays count memory slots from first
+
+            Parameters
+            ----------
+            first: int
+                first memory slot
+            count: int
+                number of memory slots
+    """
+    COMPARISONS = { "==": lambda a, b: a == b, "!=": lambda a, b: a != b, "<": lambda a, b: a < b,
+                    "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b  }
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.operations = list(vm.operations)
+        self.bitmap = bytearray(len(vm.program))
+        self.points = {}
+        self.number = 0
+        self.labels = Program.loadSymbols(vm.symbols) if vm.symbols is not None else {}
+        self.addresses = {}
+        for label, address in self.labels.items():
+            self.addresses.setdefault(address, label)
+        self.resumePc = -1
+        self.pending = None
+        self.reason = None
+        self.history = None
+        self.regsSnapshot = array('i', vm.regs)
+        self.memorySnapshot = vm.dataMemory.snapshot()
+
+    def run(self):
+        print("Debugger : " + str(len(self.vm.program)) + " instruction(s), " + str(len(self.labels)) + " label(s), type help for the commands")
+        self.reason = "start"
+        self.showStop()
+        # while recording, the steps before the end of the program can still be visited
+        while self.vm.running or self.history is not None:
+            try:
+                line = input("(debug) ")
+            except EOFError:
+                line = "quit"
+            if not self.command(line):
+                break
+        # the report gets the state where the simulation ended
+        self.vm.running = False
+
+    def command(self, line):
+        fields = line.split()
+        if not fields:
+            return True
+        name, arguments = fields[0], fields[1:]
+
+        if name in ("quit", "q"):
+            return False
+        elif name in ("continue", "c"):
+            self.resume(None)
+        elif name in ("step", "s"):
+            if arguments and not arguments[0].isdigit():
+                print("Usage : step [N]")
+                return True
+            self.resume(int(arguments[0]) if arguments else 1)
+        elif name in ("break", "b", "until", "u", "watch", "w"):
+            condition = None
+            if "if" in arguments:
+                position = arguments.index("if")
+                condition = self.condition(" ".join(arguments[position + 1:]))
+                if condition is None:
+                    print("Invalid condition : " + " ".join(arguments[position + 1:]) + " (e.g. r3 == 10, m4 > r2)")
+                    return True
+                arguments = arguments[:position]
+            if len(arguments) != 1:
+                print("Usage : " + name + " LOCATION [if CONDITION]")
+                return True
+
+            if name in ("watch", "w"):
+                kind, index = arguments[0][:1], arguments[0][1:]
+                if kind not in ("r", "m") or not index.isdigit() or self.operand(arguments[0]) is None:
+                    print("Invalid register or memory slot : " + arguments[0])
+                    return True
+                self.number += 1
+                self.points[self.number] = {"type": "watch", "kind": kind, "index": int(index), "text": " ".join(fields[1:]),
+                                            "condition": condition, "read": self.operand(arguments[0]), "value": self.operand(arguments[0])()}
+                print("Watchpoint " + str(self.number) + " : " + arguments[0])
+            else:
+                pc = self.location(arguments[0])
+                if pc is None:
+                    print("Invalid location : " + arguments[0])
+                    return True
+                self.number += 1
+                self.points[self.number] = {"type": "break", "pc": pc, "text": " ".join(fields[1:]), "condition": condition, "temporary": name in ("until", "u")}
+                if name in ("until", "u"):
+                    self.install()
+                    self.resume(None)
+                    return True
+                print("Breakpoint " + str(self.number) + " : " + self.name(pc))
+            self.install()
+        elif name in ("delete", "d"):
+            if arguments == ["all"]:
+                self.points.clear()
+            elif len(arguments) == 1 and arguments[0].isdigit() and int(arguments[0]) in self.points:
+                del self.points[int(arguments[0])]
+            else:
+                print("Usage : delete N|all")
+                return True
+            self.install()
+        elif name == "info":
+            if not self.points:
+                print("No breakpoint or watchpoint")
+            for number, point in self.points.items():
+                print(str(number) + " : " + point["type"] + " " + point["text"])
+        elif name == "checkpoint":
+            if not self.vm.checkpointSupported() or len(arguments) > 1 or (not arguments and self.vm.checkpoint is None):
+                print("Usage : checkpoint FILE (without branch predictor, profiler or timing model counting the instructions)")
+                return True
+            self.vm.saveCheckpoint(arguments[0] if arguments else None)
+            print("Checkpoint saved at PC " + self.name(self.vm.pc))
+        elif name == "record":
+            if arguments == ["off"]:
+                self.history = None
+                print("Recording stopped")
+                return True
+            if len(arguments) > 1 or (arguments and (not arguments[0].isdigit() or int(arguments[0]) < 1)):
+                print("Usage : record [K|off]")
+                return True
+            if self.vm.cache is not None or not self.vm.checkpointSupported():
+                print("The recording does not support the cache, the branch predictor, the profiler and the timing models counting the instructions")
+                return True
+            self.history = History(self.vm, int(arguments[0]) if arguments else 10000)
+            print("Recording from step 0, a copy of the state every " + str(self.history.interval) + " steps")
+        elif name in ("reverse-step", "rs", "reverse-continue", "rc", "goto"):
+            if self.history is None:
+                print("Start the recording first (record)")
+                return True
+            if name in ("reverse-continue", "rc"):
+                self.reverseContinue()
+                return True
+            if (name == "goto" and len(arguments) != 1) or len(arguments) > 1 or not all(argument.isdigit() for argument in arguments):
+                print("Usage : " + name + (" N" if name == "goto" else " [N]"))
+                return True
+            if name == "goto":
+                step = int(arguments[0])
+            else:
+                step = max(0, self.history.step - (int(arguments[0]) if arguments else 1))
+            self.goto(step)
+            self.reason = name
+            self.showStop()
+        elif name == "regs":
+            self.showRegs()
+        elif name == "mem":
+            if not all(argument.isdigit() for argument in arguments):
+                print("Usage : mem [FIRST [COUNT]]")
+                return True
+            self.showMemory(int(arguments[0]) if arguments else 0, int(arguments[1]) if len(arguments) > 1 else 16)
+        else:
+            print("Commands" + self.__doc__.split("Attributes")[0].split("Commands")[1].rstrip())
+        return True
+
+    def resume(self, count):
+        vm = self.vm
+        self.reason = None
+        self.pending = None
+        self.resumePc = vm.pc if vm.pc < len(self.bitmap) and self.bitmap[vm.pc] else -1
+
+        if self.history is not None:
+            self.recordInstructions(vm.operations, -1 if count is None else count)
+        else:
+            # r0 can be initialised to a non-zero value, it is only cleared after the first instruction
+            if count is None and vm.regs[0] != 0:
+                self.stepInstructions(1)
+            if count is None:
+                if vm.running and self.reason is None:
+                    vm.runHeadless()
+            else:
+                self.stepInstructions(count)
+            # the loop counted the cycles of the instruction under the breakpoint, which is not executed yet
+            if self.pending is not None:
+                vm.performances.cycles -= vm.cycleCosts[self.pending]
+
+        for number in [number for number, point in self.points.items() if point.get("temporary")]:
+            del self.points[number]
+        self.install()
+        if not vm.running:
+            self.reason = "end of the program"
+        elif self.reason is None:
+            self.reason = "step"
+        self.showStop()
+
+    def stepInstructions(self, count):
+        vm = self.vm
+        operations = vm.operations
+        cycleCosts = vm.cycleCosts
+        regs = vm.regs
+        pc = vm.pc
+        cycles = 0
+
+        while count > 0 and pc >= 0:
+            try:
+                handler, reg1, reg2, reg3 = operations[pc]
+                cycles += cycleCosts[pc]
+                pc = handler(pc, reg1, reg2, reg3)
+            except OverflowError:
+                pc = vm.overflowStep(pc)
+            except (IndexError, ZeroDivisionError, ValueError) as error:
+                raise vm.fault(error, pc)
+            regs[0] = 0
+            # the stop, breakpoint and watchpoint handlers return -1 after setting vm.pc
+            if pc >= 0:
+                vm.pc = pc
+            count -= 1
+        vm.performances.cycles += cycles
+
+    def recordInstructions(self, operations, count):
+        vm = self.vm
+        history = self.history
+        performances = vm.performances
+        cycleCosts = vm.cycleCosts
+        destinations = history.destinations
+        regs = vm.regs
+        memory = vm.dataMemory
+        pc = vm.pc if vm.running else -1
+
+        while count != 0 and pc >= 0:
+            if pc >= len(operations):
+                raise vm.fault(IndexError(), pc)
+            handler, reg1, reg2, reg3 = operations[pc]
+            destination = destinations[pc]
+            if destination >= 0:
+                target, value = destination, regs[destination]
+            elif destination == History.STORE_IMM or destination == History.STORE_REG:
+                addr = regs[reg1] + (regs[reg2] if destination == History.STORE_REG else reg2)
+                target, value = -2 - addr, memory.readDataMemory(addr) if 0 <= addr < memory.num_data_mem_cells else 0
+            elif destination == History.INPUT:
+                target, value = 1, regs[1]
+            else:
+                target, value = History.NONE, 0
+
+            step = history.step
+            cycles = performances.cycles
+            performances.cycles += cycleCosts[pc]
+            # the steps executed again do not read or print anything
+            if destination == History.INPUT and step in history.inputs:
+                regs[1] = history.inputs[step]
+                nextPc = pc + 1
+            elif destination == History.OUTPUT and step < history.highest:
+                nextPc = pc + 1
+            else:
+                try:
+                    nextPc = handler(pc, reg1, reg2, reg3)
+                except OverflowError:
+                    nextPc = vm.overflowStep(pc)
+                except (IndexError, ZeroDivisionError, ValueError) as error:
+                    raise vm.fault(error, pc)
+            if self.pending == pc:
+                performances.cycles = cycles
+                break
+
+            regs[0] = 0
+            if destination == History.INPUT:
+                history.inputs[step] = regs[1]
+            if nextPc >= 0:
+                vm.pc = nextPc
+            history.log(pc, target, value, cycles)
+            pc = nextPc
+            count -= 1
+
+    def goto(self, step):
+        history = self.history
+        if step < history.step and step >= history.oldest and history.step - step <= history.interval:
+            while history.step > step:
+                history.undo()
+        else:
+            history.restore(max([checkpoint for checkpoint in history.checkpoints if checkpoint <= step]))
+            self.recordInstructions(self.operations, step - history.step)
+        for point in self.points.values():
+            if point["type"] == "watch":
+                point["value"] = point["read"]()
+
+    def reverseContinue(self):
+        history = self.history
+        vm = self.vm
+        watches = [point for point in self.points.values() if point["type"] == "watch"]
+        self.reason = None
+        while self.reason is None:
+            if history.step == 0:
+                self.reason = "start of the recording"
+                break
+            if history.step <= history.oldest:
+                # the steps before the ring buffers are executed again from the copy of the state before them
+                end = history.step
+                history.restore(max([checkpoint for checkpoint in history.checkpoints if checkpoint < end]))
+                self.recordInstructions(self.operations, end - history.step)
+
+            values = [point["read"]() for point in watches]
+            history.undo()
+            for point, value in zip(watches, values):
+                if point["read"]() != value and (point["condition"] is None or point["condition"]()):
+                    self.reason = "watchpoint " + point["text"] + " : " + str(point["read"]()) + " -> " + str(value) + ", reversed"
+            if vm.pc < len(self.bitmap) and self.bitmap[vm.pc]:
+                for point in self.points.values():
+                    if point["type"] == "break" and point["pc"] == vm.pc and (point["condition"] is None or point["condition"]()):
+                        self.reason = "breakpoint " + point["text"] + ", reversed"
+
+        for point in watches:
+            point["value"] = point["read"]()
+        self.showStop()
+
+    def install(self):
+        operations = list(self.operations)
+        self.bitmap = bytearray(len(operations))
+        watched = {}
+        breaks = {}
+        for point in self.points.values():
+            if point["type"] == "watch":
+                for pc in self.writers(point["kind"], point["index"]):
+                    watched.setdefault(pc, []).append(point)
+            elif point["pc"] < len(operations):
+                self.bitmap[point["pc"]] = 1
+                breaks.setdefault(point["pc"], []).append(point)
+
+        for pc, points in watched.items():
+            handler, reg1, reg2, reg3 = operations[pc]
+            operations[pc] = (self.watchHandler(handler, points), reg1, reg2, reg3)
+        for pc, points in breaks.items():
+            handler, reg1, reg2, reg3 = operations[pc]
+            operations[pc] = (self.breakHandler(handler, points), reg1, reg2, reg3)
+        self.vm.operations = operations
+
+    def breakHandler(self, handler, points):
+        vm = self.vm
+
+        def run(pc, reg1, reg2, reg3):
+            if pc == self.resumePc:
+                self.resumePc = -1
+                return handler(pc, reg1, reg2, reg3)
+            for point in points:
+                if point["condition"] is None or point["condition"]():
+                    vm.pc = pc
+                    self.pending = pc
+                    self.reason = ("until " if point["temporary"] else "breakpoint ") + point["text"]
+                    return -1
+            return handler(pc, reg1, reg2, reg3)
+        return run
+
+    def watchHandler(self, handler, points):
+        vm = self.vm
+
+        def run(pc, reg1, reg2, reg3):
+            try:
+                nextPc = handler(pc, reg1, reg2, reg3)
+            except OverflowError:
+                nextPc = vm.overflowStep(pc)
+            for point in points:
+                value = point["read"]()
+                if value != point["value"]:
+                    old, point["value"] = point["value"], value
+                    if point["condition"] is None or point["condition"]():
+                        self.reason = "watchpoint " + point["text"] + " : " + str(old) + " -> " + str(value)
+                        if nextPc >= 0:
+                            vm.pc = nextPc
+                        return -1
+            return nextPc
+        return run
+
+    def writers(self, kind, index):
+        pcs = []
+        for pc in range(0, len(self.vm.decoded)):
+            op, reg1, reg2, reg3 = self.vm.decoded[pc]
+            instrNum = (op & 63) >> 1
+            if kind == "m":
+                if instrNum == 14:
+                    pcs.append(pc)
+            elif (1 <= instrNum <= 13 and reg3 == index) or (instrNum == 15 and reg2 == index) or (instrNum == 18 and reg1 == 0 and index == 1):
+                pcs.append(pc)
+        return pcs
+
+    def location(self, text):
+        if text in self.labels:
+            return self.labels[text]
+        try:
+            pc = int(text, 0)
+        except ValueError:
+            return None
+        if pc < 0 or pc >= len(self.vm.program):
+            return None
+        return pc
+
+    def operand(self, text):
+        vm = self.vm
+        if text[:1] in ("r", "m") and text[1:].isdigit():
+            index = int(text[1:])
+            if text[0] == "r" and index < vm.num_regs:
+                return lambda: vm.regs[index]
+            if text[0] == "m" and index < vm.dataMemory.num_data_mem_cells:
+                return lambda: vm.dataMemory.readDataMemory(index)
+            return None
+        try:
+            value = int(text, 0)
+        except ValueError:
+            return None
+        return lambda: value
+
+    def condition(self, text):
+        for symbol in ("==", "!=", "<=", ">=", "<", ">"):
+            if symbol in text:
+                left, right = [self.operand(operand.strip()) for operand in text.split(symbol, 1)]
+                if left is None or right is None:
+                    return None
+                comparison = Debugger.COMPARISONS[symbol]
+                return lambda: comparison(left(), right())
+        return None
+
+    def name(self, pc):
+        if pc in self.addresses:
+            return str(pc) + " (" + self.addresses[pc] + ")"
+        previous = [address for address in self.addresses if address < pc]
+        if previous:
+            return str(pc) + " (" + self.addresses[max(previous)] + "+" + str(pc - max(previous)) + ")"
+        return str(pc)
+
+    def showStop(self):
+        vm = self.vm
+        print("Stopped (" + self.reason + ") at PC " + self.name(vm.pc) + ", Machine cycle : " + str(vm.performances.cycles)
+                + (", step " + str(self.history.step) if self.history is not None else ""))
+        if vm.running and vm.pc < len(vm.program):
+            vm.decode(vm.program[vm.pc])
+            print("Next instruction : " + vm.disassemble())
+
+        changed = [index for index in range(0, len(vm.regs)) if vm.regs[index] != self.regsSnapshot[index]]
+        for index in changed:
+            print("R" + str(index) + " : " + str(self.regsSnapshot[index]) + " -> " + str(vm.regs[index]))
+        for addr in vm.dataMemory.changedSlots(self.memorySnapshot):
+            print("SLOT" + str(addr) + " : " + str(vm.dataMemory.readDataMemory(addr)))
+        self.regsSnapshot = array('i', vm.regs)
+        self.memorySnapshot = vm.dataMemory.snapshot()
+
+    def showRegs(self):
+        for index in range(0, len(self.vm.regs)):
+            print("R" + str(index) + " : " + str(self.vm.regs[index]), end = "\n" if index % 8 == 7 else " / ")
+        print("")
+
+    def showMemory(self, first, count):
+        last = min(first + count, self.vm.dataMemory.num_data_mem_cells)
+        for addr in range(first, last):
+            print("SLOT" + str(addr) + " : " + str(self.vm.dataMemory.readDataMemory(addr)), end = "\n" if (addr - first) % 8 == 7 else " / ")
+        print("")
+
+class Checkpoint:
+    """
+    A class used to save the state of a virtual machine in a checkpoint file and to read it back
+
+    The file is a sequence of records, each one starting with a 16 bytes header : the "ICKP" magic, the format version (uint16), flags (uint16, FULL for a complete image),
+    the length of the record (uint32) and its CRC32 (uint32). A record holds a JSON header (pc, cycles, program hash, options, cache state),
+    the registers and the memory pages (uint32 page number, uint32 number of slots, then the slots as little-endian int32).
+    A full record holds every page which is not only made of zeros, the next records only the pages changed since the previous record, appended to the file.
+    A record cut by a crash fails its CRC and is ignored, the state is the one of the last complete record.
+    When the appended records get bigger than the full record, the file is rewritten with a new full record in a temporary file renamed over it.
+
+    Attributes
+    ----------
+        fileName : string
+            name of the checkpoint file
+
+        offset : int
+            end of the last record written, None before the first full record
+
+        snapshot : object
+            copy of the data memory at the last record, to find the pages changed since then
+
+        fullSize : int
+            size of the last full record
+
+        appended : int
+            size of the records appended since the last full record
+
+        MAGIC : bytes
+            the first bytes of every record
+
+        VERSION : int
+            the version of the format written by this class
+
+        RECORD : object
+            the struct describing the header of a record
+
+        FULL : int
+            flag of the records holding a complete image
+
+    Methods
+    -------
+        save(vm)
+            writes the state of the virtual machine, as a full record or as the pages changed since the previous one
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine to save
+
+        record(vm, full)
+            returns the bytes of a record of the virtual machine
+
+            Parameters
+            ----------
+            vm: object
+                the virtual machine to save
+            full: bool
+                True for a complete image
+
+        load(fileName)
+            returns the state of the last complete record of a checkpoint file as a dictionary : its JSON header, the registers, the memory pages,
+            the end of the record, the size of the last full record and of the records appended since
+
+            Parameters
+            ----------
+            fileName: string
+                the name of the file to read
+    """
+    MAGIC = b"ICKP"
+    VERSION = 1
+    RECORD = struct.Struct("<4sHHII")
+    FULL = 1
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.offset = None
+        self.snapshot = None
+        self.fullSize = 0
+        self.appended = 0
+
+    def save(self, vm):
+        if self.offset is None or self.appended > self.fullSize:
+            data = self.record(vm, True)
+            file = open(self.fileName + ".tmp", "wb")
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+            os.replace(self.fileName + ".tmp", self.fileName)
+            self.offset = self.fullSize = len(data)
+            self.appended = 0
+        else:
+            data = self.record(vm, False)
+            file = open(self.fileName, "r+b")
+            # anything after the last complete record is a record cut by a crash
+            file.truncate(self.offset)
+            file.seek(self.offset)
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+            self.offset += len(data)
+            self.appended += len(data)
+        self.snapshot = vm.dataMemory.snapshot()
+
+    def record(self, vm, full):
+        header = {  "pc": vm.pc, "running": vm.running, "cycles": vm.performances.cycles,
+                    "elapsed": vm.performances.previous + time.perf_counter() - vm.performances.start,
+                    "program": vm.programHash(), "options": vm.checkpointOptions(),
+                    "cache": vm.cache.state() if vm.cache is not None else None  }
+        header = json.dumps(header).encode()
+        regs = array('i', vm.regs)
+        if sys.byteorder == "big":
+            regs.byteswap()
+        parts = [struct.pack("<I", len(header)), header, struct.pack("<I", len(regs)), regs.tobytes()]
+        pages = vm.dataMemory.dirtyPages(None if full else self.snapshot)
+        for number in sorted(pages):
+            page = array('i', pages[number])
+            if sys.byteorder == "big":
+                page.byteswap()
+            parts += [struct.pack("<II", number, len(page)), page.tobytes()]
+
+        data = b"".join(parts)
+        return Checkpoint.RECORD.pack(Checkpoint.MAGIC, Checkpoint.VERSION, Checkpoint.FULL if full else 0, len(data), zlib.crc32(data)) + data
+
+    @staticmethod
+    def load(fileName):
+        file = open(fileName, "rb")
+        content = file.read()
+        file.close()
+
+        state = None
+        offset = 0
+        while offset + Checkpoint.RECORD.size <= len(content):
+            magic, version, flags, length, crc = Checkpoint.RECORD.unpack_from(content, offset)
+            start = offset + Checkpoint.RECORD.size
+            data = content[start:start + length]
+            if magic != Checkpoint.MAGIC or version > Checkpoint.VERSION or len(data) != length or zlib.crc32(data) != crc:
+                break
+            if state is None and not flags & Checkpoint.FULL:
+                break
+
+            size = struct.unpack_from("<I", data, 0)[0]
+            header = json.loads(data[4:4 + size].decode())
+            position = 4 + size
+            count = struct.unpack_from("<I", data, position)[0]
+            regs = array('i', data[position + 4:position + 4 + 4 * count])
+            position += 4 + 4 * count
+            pages = {} if flags & Checkpoint.FULL else state["pages"]
+            while position < length:
+                number, count = struct.unpack_from("<II", data, position)
+                pages[number] = array('i', data[position + 8:position + 8 + 4 * count])
+                if sys.byteorder == "big":
+                    pages[number].byteswap()
+                position += 8 + 4 * count
+            if sys.byteorder == "big":
+                regs.byteswap()
+            state = {"header": header, "regs": regs, "pages": pages, "offset": start + length,
+                     "full": length + Checkpoint.RECORD.size if flags & Checkpoint.FULL else state["full"],
+                     "appended": 0 if flags & Checkpoint.FULL else state["appended"] + length + Checkpoint.RECORD.size}
+            offset = start + length
+
+        if state is None:
+            raise SimulationError("Invalid checkpoint : " + fileName)
+        return state
+
+class Program:
+    """
+    A class used to represent a program in machine language, decoded once and shared by all the virtual machines running it
+
+    Attributes
+    ----------
+        name : string
+            name of the file the program comes from
+
+        words : int array
+            the instructions in machine language (a memoryview on the mapped file for a binary program)
+
+        address : int table
+            the address of each instruction
+
+        decoded : tuple table
+            the program decoded by VirtualMachine.predecode
+
+        labels : dictionary
+            address of each label, empty when the program was not assembled by assemble
+
+    Methods
+    -------
+        load(fileName)
+            returns the Program stored in a file, the binary format of BinaryProgram is detected from its header, other files are read as text,
+            raises SimulationError for an invalid file
+
+            Parameters
+            ----------
+            fileName: string
+                name of the file where the program is located in machine language
+
+        loadSymbols(fileName)
+            returns the labels of a symbol file written by the assembler ("address label" lines), their address indexed by name
+
+            Parameters
+            ----------
+            fileName: string
+                name of the symbol file
+    """
+    def __init__(self, words, address = None, name = None, labels = None):
+        self.name = name
+        self.words = words
+        self.address = address if address is not None else range(len(words))
+        self.decoded = VirtualMachine.predecode(words)
+        self.labels = labels if labels is not None else {}
+
+    @staticmethod
+    def load(fileName):
+        if BinaryProgram.isBinary(fileName):
+            try:
+                return Program(BinaryProgram.read(fileName), name = fileName)
+            except BinaryFormatError as error:
+                raise SimulationError(error.message)
+
+        file = open(fileName, "r")
+        parsed = file.read().split()
+        file.close()
+        try:
+            return Program(array('I', [int(instr, 16) for instr in parsed[1::2]]), [int(addr, 16) for addr in parsed[0::2]], fileName)
+        except (ValueError, OverflowError):
+            raise SimulationError("Invalid program in machine language : " + fileName + " (expected \"address instruction\" lines in hexadecimal)")
+
+    @staticmethod
+    def loadSymbols(fileName):
+        labels = {}
+        file = open(fileName, "r")
+        for line in file:
+            fields = line.split()
+            if len(fields) == 2:
+                labels[fields[1]] = int(fields[0], 16)
+        file.close()
+        return labels
+
+class VirtualMachine:
+    """
+    A class used to represent a memory area to store data
+
+    Attributes
+    ----------
+        running : bool
+            determine if the virtual machine is running or not
+
+        num_regs : int
+            the number of registers to use
+
+        regs : int array
+            array of 32 bits signed integers containing the registers
+
+        address : int table
+            table containing all the addresses
+
+        program : int array
+            array containing all the instructions in machine language (a memoryview on the mapped file for a binary program)
+
+        decoded : tuple table
+            the program decoded once at load time, one (operation, reg1, reg2, reg3) tuple per instruction.
+            operation indexes the dispatch table : instruction number * 2 + imm, plus 64 when the instruction writes r0
+
+        dispatch : function table
+            table of the handlers executing each operation, a handler takes (pc, reg1, reg2, reg3) and returns the next pc (-1 once stopped)
+
+        operations : tuple table
+            the decoded program bound to the dispatch table, one (handler, reg1, reg2, reg3) tuple per instruction
+
+        cycleCosts : int table
+            number of machine cycles of each instruction of the program
+
+        pc : int
+            increments with each instruction performed
+
+        inputFile: string
+            name of the file where the program is located in machine language
+
+        outputFile: string
+            name of the report file, a timestamped name in the output directory unless output_name is given
+
+        step_by_step: bool
+            defines the operation of the virtual machine (automatic or manual, in the Debugger)
+
+        trace: string
+            amount of console output produced during the simulation, one of TRACE_LEVELS :
+            "none" (report file only), "summary" (statistics at the end), "instr" (each executed command), "full" (commands, registers and memory)
+
+        engine: string
+            execution engine used when nothing is traced, one of ENGINES :
+            "interp" (dispatch table, one instruction at a time), "block" (basic blocks translated into python functions by a BlockTranslator)
+
+        overflow: string
+            what happens when a result does not fit in 32 bits signed, one of OVERFLOW_POLICIES :
+            "trap" (the simulation stops), "wrap" (two's complement wrap around), "saturate" (clamped to the nearest bound)
+
+        memory_model: string
+            organisation of the data memory, one of MEMORY_MODELS :
+            "flat" (DataMemory, all the slots are allocated), "paged" (PagedDataMemory, pages allocated on their first write)
+
+        cache : object
+            the Cache between the load/store instructions and the data memory, None without cache
+
+        readMemory, writeMemory : function
+            the functions used by load and store, the ones of the cache if there is one, otherwise the ones of the data memory
+
+        symbols : string
+            name of the symbol file of the assembler naming the pcs, None without symbol file
+
+        profile : string
+            name (without extension) of the profile files, None when the execution is not profiled
+
+        profiler : object
+            the Profiler counting the executions of each pc, None when the execution is not profiled
+
+        performances : object
+            the Performances of the simulation, holding the timing model which gives the cycleCosts
+
+        predictor : object
+            the BranchPredictor watching the branches, None without branch prediction
+
+        checkpoint : object
+            the Checkpoint where the state of the simulation is saved, None without checkpoint file
+
+        checkpoint_every : int
+            number of instructions between two checkpoints, None to save them only on demand (saveCheckpoint)
+
+        resume : string
+            name of the checkpoint file the simulation was resumed from, None otherwise
+
+        resultCache : object
+            the ResultCache giving the result of the simulation without executing it when it is already known, None without cache
+
+        scalls : dictionary
+            the function called by each scall number with the virtual machine, readInput for 0 and writeOutput for 1 by default (registerScall)
+
+        inputs : deque
+            the values still to be read by scall 0, None to ask them on the console
+
+        outputs : int table
+            the values of r1 displayed by scall 1, kept instead of being printed, None to print them
+
+        stdout_file : string
+            name of the file where the outputs are saved at the end of the run, None to save them only in the report
+
+        watchdog : object
+            the Watchdog limiting the execution and detecting the infinite loops, None without limit
+
+        traceWriter : object
+            the TraceWriter of the binary trace file, written in place of the console trace, None without trace file
+
+        OPERATIONS : dictionary
+            the arithmetic and logic operation of each instruction number, on python integers
+
+
+    Methods
+    -------
+        from_program(program, num_regs, num_data_mem_cells, regs, inputs, scalls, **options)
+            runs a Program held in memory and returns its SimulationResult, without reading or writing any file :
+            nothing is displayed (trace "none" unless given in options), the values displayed by scall 1 are kept in the result,
+            the errors raise SimulationError
+
+            Parameters
+            ----------
+            program : object
+                the Program, for example returned by assemble
+            num_regs, num_data_mem_cells : int
+                number of registers and of memory slots
+            regs : int table
+                initial value of the registers, None to start with zeros
+            inputs : int table
+                values read by scall 0 (none by default, scall 0 then raises SimulationError), None to ask them on the console
+            scalls : dictionary
+                callback of some scall numbers, given to registerScall before the simulation starts
+            options : dictionary
+                the other arguments of the constructor (engine, overflow, memory_model, cache, timing, predictor, watchdog...),
+                timing being a TimingModel or the name "default" or "pipeline"
+
+        run()
+            represents the main program to be followed by calling the corresponding methods
+
+        execute()
+            executes the program with the loop matching the options, without displaying or saving the statistics
+
+        runTraced()
+            executes the program while displaying each instruction according to the trace level
+
+        runTraceFile()
+            executes the predecoded program through the dispatch table while writing one record per instruction in the trace file
+
+        runHeadless()
+            executes the predecoded program through the dispatch table without formatting anything
+
+        runProfiled()
+            executes the predecoded program like runHeadless while counting the executions, cycles and taken branches of each pc in the profiler
+
+        runCheckpointed()
+            executes the predecoded program like runHeadless while saving a checkpoint every checkpoint_every instructions
+
+        saveCheckpoint(fileName)
+            saves the state of the simulation in the checkpoint file, or in another file
+
+            Parameters
+            ----------
+            fileName : string
+                name of the checkpoint file, None for the one of the checkpoint attribute
+
+        loadCheckpoint(fileName)
+            sets the state of the simulation back to the last complete record of a checkpoint file, saved for the same program and options
+
+            Parameters
+            ----------
+            fileName : string
+                name of the checkpoint file
+
+        checkpointSupported()
+            returns False when a part of the simulation is not saved in the checkpoints (branch predictor, profiler, timing model counting the instructions)
+
+        checkpointOptions()
+            returns the options which must be the same to resume a checkpoint
+
+        programHash()
+            returns the SHA-1 of the program in machine language
+
+        step()
+            executes the current instruction through the dispatch table without formatting anything
+
+        overflowStep(pc)
+            executes again the instruction at pc whose result did not fit in its register, applying the overflow policy. Returns the next pc.
+            Raises SimulationError for a scall whose callback wrote such a value itself instead of returning it
+
+            Parameters
+            ----------
+            pc : int
+                the instruction whose result overflowed
 
-        regs : int table
-            table containing the registers
+        fault(error, pc)
+            returns the SimulationError reporting a Python exception raised by the instruction at pc : no instruction at pc,
+            division by zero, negative shift count or memory access out of range
 
-        address : int table
-            table containing all the addresses
+            Parameters
+            ----------
+            error : object
+                the IndexError, ZeroDivisionError or ValueError raised
+            pc : int
+                the instruction executed
 
-        program : string table
-            table containing all the instructions in machine language
+        loadAddrInst(program)
+            load the program in machine language in the "program" attribute and its decoded form in the "decoded" attribute
 
-        pc : int
-            increments with each instruction performed
+            Parameter
+            ---------
+                program : object
+                    an already loaded Program, None to load it from inputFile
 
-        inputFile: string
-            name of the file where the program is located in machine language
+        decodeWord(instr)
+            returns the (instruction number, imm, reg1, reg2, reg3) fields of an instruction in machine language
 
-        step_by_step: bool
-            defines the operation of the virtual machine (automatic or manual)
+            Parameter
+            ---------
+                instr : int
+                    value of the instruction to decode
 
+        predecode(program)
+            decodes a whole program in machine language into the (operation, reg1, reg2, reg3) tuples used by the dispatch table
 
-    Methods
-    -------
-        run()
-            represents the main program to be followed by calling the corresponding methods
+            Parameter
+            ---------
+                program : int table
+                    instructions in machine language
 
-        loadAddrInst()
-            load the program in machine language in the "program" attribute
+        buildDispatchTable()
+            returns the table of handlers executing each operation on the registers and the data memory of this virtual machine
 
         initRegs(init_regs_file)
             initialize registers to the values of the initialization file
@@ -205,6 +3404,15 @@ class VirtualMachine:
             init_regs_file : string
                 name of the initialization file
 
+        setRegs(values)
+            initialize registers to some values, the values which do not fit in 32 bits signed follow the overflow policy
+
+            Parameter
+            ---------
+
+            values : int table
+                value of each register
+
         decode(instr)
             decodes the instruction in machine language to extract the register value and the associated command
             
@@ -214,303 +3422,916 @@ class VirtualMachine:
                     value of the instruction to decode
 
         eval()
-            displays the decoded command with the updated register value 
+            executes the current command through the dispatch table and displays it if the trace level asks for it
+
+        disassemble()
+            returns the text form of the decoded command
+
+        disassembleFields(instrNum, imm, reg1, reg2, reg3)
+            returns the text form of a command from the fields given by decodeWord
 
         showRegs()
-            displays the value of the registers at each instruction execution. Checks if there is no overflow.  
+            displays the value of the registers at each instruction execution
+
+        fitValue(value, name, index)
+            returns the value to store in place of a value that does not fit in 32 bits signed, according to the overflow policy
+
+            Parameters
+            ----------
+            value : int
+                the value that overflowed
+            name : string
+                "R" for a register, "SLOT" for a memory slot
+            index : int
+                index of the register or memory slot
+
+        overflowTrap(name, index)
+            raises SimulationError because of an overflow
+
+            Parameters
+            ----------
+            name : string
+                "R" for a register, "SLOT" for a memory slot
+            index : int
+                index of the register or memory slot
+
+        jumpError(target)
+            raises SimulationError because of a jump to a negative address
+
+            Parameters
+            ----------
+            target : int
+                address of the jump
+
+        registerScall(number, callback)
+            calls callback(vm) for the scall instructions of this number, replacing readInput and writeOutput for 0 and 1.
+            When the callback returns a value, it is written in r1 with the overflow policy
+
+            Parameters
+            ----------
+            number : int
+                number of the scall
+            callback : function
+                function taking the virtual machine, it can read and write its registers and memory and return the new value of r1 (or None)
+
+        readInput()
+            scall 0 : reads r1 from the inputs, or from the console without inputs
+
+        writeOutput()
+            scall 1 : keeps r1 in the outputs, or prints it without outputs
+
+        outputText(value)
+            returns the text displayed by scall 1 for a value of r1
+
+            Parameters
+            ----------
+            value : int
+                value of r1
+
+        loadInputs(fileName)
+            returns the values of a file of inputs, integers (decimal or 0x hexadecimal) separated by spaces or lines
+
+            Parameters
+            ----------
+            fileName : string
+                name of the file
+
+        saveOutputs()
+            writes the outputs in stdout_file, one line per value like the console
 
         showStatistics()
             displays the statistics at the end of the simulation
 
         loadInFile()
             loads a report of the simulation into a file
+
+        writeReport(file)
+            writes the report of the simulation
+
+            Parameters
+            ----------
+            file : object
+                the opened report file
     """
-    def __init__(self, inputFile, root, num_regs, num_data_mem_cells, init_regs_file, step_by_step = False):
+    OPERATIONS = {  1: lambda a, b: a + b, 2: lambda a, b: a - b, 3: lambda a, b: a * b, 4: lambda a, b: a // b,
+                    5: lambda a, b: a and b, 6: lambda a, b: a or b, 7: lambda a, b: a ^ b,
+                    8: lambda a, b: a << b, 9: lambda a, b: a >> b,
+                    10: lambda a, b: 1 if a <= b else 0, 11: lambda a, b: 1 if a <= b else 0, 12: lambda a, b: 1 if a == b else 0    }
+
+    def __init__(self, inputFile, root, num_regs, num_data_mem_cells, init_regs_file, step_by_step = False, trace = "full", engine = "interp", overflow = "trap", memory_model = "flat", cache = None, program = None, output_name = None, profile = None, symbols = None, timing = None, predictor = None, checkpoint = None, checkpoint_every = None, resume = None, trace_file = None, trace_compression = "none", watchdog = None, inputs = None, capture_outputs = False, stdout_file = None, result_cache = None):
+        if trace not in TRACE_LEVELS:
+            raise SimulationError("Unknown trace level : " + str(trace) + " (expected one of " + ", ".join(TRACE_LEVELS) + ")")
+        if engine not in ENGINES:
+            raise SimulationError("Unknown engine : " + str(engine) + " (expected one of " + ", ".join(ENGINES) + ")")
+        if overflow not in OVERFLOW_POLICIES:
+            raise SimulationError("Unknown overflow policy : " + str(overflow) + " (expected one of " + ", ".join(OVERFLOW_POLICIES) + ")")
+        if memory_model not in MEMORY_MODELS:
+            raise SimulationError("Unknown memory model : " + str(memory_model) + " (expected one of " + ", ".join(MEMORY_MODELS) + ")")
+        if trace_compression not in TRACE_COMPRESSIONS:
+            raise SimulationError("Unknown trace compression : " + str(trace_compression) + " (expected one of " + ", ".join(TRACE_COMPRESSIONS) + ")")
+        # timing : a TimingModel, or the name of one of TIMING_MODELS with its default parameters
+        if timing == "default":
+            timing = None
+        elif timing == "pipeline":
+            timing = PipelineModel()
+        elif timing == "table":
+            raise SimulationError("The table timing model needs its latencies : give the LatencyTable returned by LatencyTable.load as timing")
+        elif timing is not None and not isinstance(timing, TimingModel):
+            raise SimulationError("Unknown timing model : " + str(timing) + " (expected a TimingModel or one of default, pipeline)")
+
         self.running = True
         self.num_regs = num_regs
-        self.regs = []
+        self.regs = array('i')
         self.address = []
-        self.program = []
+        self.program = array('I')
+        self.decoded = []
         self.pc = 0
         self.inputFile = inputFile
         self.step_by_step = step_by_step
+        self.trace = trace
+        self.engine = engine
+        self.overflow = overflow
+        self.memory_model = memory_model
 
+        if output_name is None:
+            output_name = "vm_" + time.strftime("%Y_%m_%d-%H_%M_%S") + ".txt"
         if root == None:
-            self.outputFile = "vm_" + time.strftime("%Y_%m_%d-%H_%M_%S") + ".txt"
+            self.outputFile = output_name
+        else:
+            self.outputFile = str(root) + "/" + output_name
+
+        if memory_model == "paged":
+            self.dataMemory = PagedDataMemory(num_data_mem_cells)
         else:
-            self.outputFile = str(root) + "/vm_" + time.strftime("%Y_%m_%d-%H_%M_%S") + ".txt"
+            self.dataMemory = DataMemory(num_data_mem_cells)
+        self.performances = Performances(timing)
 
-        self.dataMemory = DataMemory(num_data_mem_cells)
-        self.performances = Performances()
+        # cache : dictionary of the Cache parameters (sets, ways, line_size, replacement, write_policy, hit_latency, miss_latency)
+        if cache is not None:
+            self.cache = Cache(self.dataMemory, self.performances, cache.get("sets", 64), cache.get("ways", 1), cache.get("line_size", 4),
+                                cache.get("replacement", "lru"), cache.get("write_policy", "back"), cache.get("hit_latency", 1), cache.get("miss_latency", 10))
+            self.readMemory = self.cache.readCache
+            self.writeMemory = self.cache.writeCache
+        else:
+            self.cache = None
+            self.readMemory = self.dataMemory.readDataMemory
+            self.writeMemory = self.dataMemory.writeDataMemory
 
-        self.loadAddrInst()
+        self.loadAddrInst(program)
         self.initRegs(init_regs_file)
+
+        # inputs : values read by scall 0, None to ask them on the console
+        # capture_outputs : the values displayed by scall 1 are kept in outputs (written in the report and in stdout_file) instead of being printed
+        self.scalls = {0: VirtualMachine.readInput, 1: VirtualMachine.writeOutput}
+        self.inputs = deque(inputs) if inputs is not None else None
+        self.stdout_file = stdout_file
+        self.outputs = [] if capture_outputs or stdout_file is not None else None
+
+        self.dispatch = self.buildDispatchTable()
+        self.operations = [(self.dispatch[op], reg1, reg2, reg3) for op, reg1, reg2, reg3 in self.decoded]
+        self.cycleCosts = self.performances.timing.costs(self)
+        # the predictor replaces the handlers of braz and branz, the timing model wraps them afterwards
+        self.predictor = predictor
+        if predictor is not None:
+            predictor.instrument(self)
+        self.performances.timing.instrument(self)
+        # the watchdog wraps the handlers last, so that its stop is seen after the branch has been predicted and timed
+        self.watchdog = watchdog
+        if watchdog is not None:
+            if step_by_step or profile is not None or checkpoint_every is not None or trace_file is not None:
+                raise SimulationError("The limits and the loop detection are not available in the debugger, with the profiler, the periodic checkpoints or the trace file")
+            if watchdog.detectLoops and cache is not None:
+                raise SimulationError("The loop detection reads the memory behind the cache, it cannot be used with a cache")
+            watchdog.instrument(self)
+
+        # symbols : symbol file of the assembler, by default the one next to the program if it exists
+        if symbols is None and inputFile is not None and os.path.exists(str(inputFile) + ".sym"):
+            symbols = str(inputFile) + ".sym"
+        self.symbols = symbols
+        self.profile = profile
+        self.profiler = None
+        if profile is not None:
+            self.profiler = Profiler(self)
+            if symbols is not None:
+                self.profiler.loadSymbols(symbols)
+
+        # checkpoint : file where the state is saved, every checkpoint_every instructions or on demand
+        # resume : checkpoint file the simulation continues from
+        if (checkpoint is not None or resume is not None) and not self.checkpointSupported():
+            raise SimulationError("The checkpoints do not save the state of the branch predictor, of the profiler and of the timing models counting the instructions")
+        if checkpoint_every is not None and (checkpoint is None or checkpoint_every < 1 or trace in ("instr", "full") or step_by_step):
+            raise SimulationError("Periodic checkpoints need a checkpoint file, a positive number of instructions and the trace level none or summary")
+        self.checkpoint = Checkpoint(checkpoint) if checkpoint is not None else None
+        self.checkpoint_every = checkpoint_every
+        self.resume = resume
+        if resume is not None:
+            self.loadCheckpoint(resume)
+
+        # trace_file : binary trace of every executed instruction, written in place of the console trace (see TraceReplay.py)
+        if trace_file is not None and (step_by_step or profile is not None or checkpoint_every is not None or resume is not None):
+            raise SimulationError("The trace file cannot be written in the debugger, with the profiler or with checkpoints")
+        try:
+            self.traceWriter = TraceWriter(trace_file, trace_compression) if trace_file is not None else None
+        except TraceFormatError as error:
+            raise SimulationError(str(error))
+        # result_cache : ResultCache of the deterministic simulations, the other simulations are executed as usual
+        self.resultCache = result_cache
+
+    @staticmethod
+    def from_program(program, num_regs = 32, num_data_mem_cells = 1024, regs = None, inputs = (), scalls = None, **options):
+        options.setdefault("trace", "none")
+        options.setdefault("capture_outputs", True)
+        vm = VirtualMachine(program.name, None, num_regs, num_data_mem_cells, None, program = program, inputs = inputs, **options)
+        if regs is not None:
+            if len(regs) != num_regs:
+                raise SimulationError("You have declared " + str(num_regs) + " registers but you initialized " + str(len(regs)) + " !")
+            vm.setRegs(regs)
+        if scalls is not None:
+            for number, callback in scalls.items():
+                vm.registerScall(number, callback)
+        vm.execute()
+        return SimulationResult(vm)
     
     def run(self):
+        if self.resultCache is not None and ResultCache.cacheable(self):
+            self.resultCache.run(self)
+            return
+        self.execute()
+
+        if self.trace != "none":
+            self.showStatistics()
+        self.loadInFile()
+        if self.profiler is not None:
+            self.profiler.loadInFile(self.profile)
+        if self.stdout_file is not None:
+            self.saveOutputs()
+
+    def execute(self):
         self.performances.timerStart()
+        if self.watchdog is not None:
+            self.watchdog.start()
+        if self.step_by_step:
+            Debugger(self).run()
+        elif self.traceWriter is not None:
+            self.runTraceFile()
+        elif self.trace in ("instr", "full"):
+            self.runTraced()
+        elif self.profiler is not None:
+            self.runProfiled()
+        elif self.checkpoint_every is not None:
+            self.runCheckpointed()
+        elif self.watchdog is not None:
+            self.watchdog.run(self)
+        elif self.engine == "block" and not self.performances.timing.counted and self.predictor is None:
+            # the first instruction is interpreted, it clears r0 if it was initialised to a non-zero value
+            if self.running:
+                self.step()
+            BlockTranslator(self).run()
+        else:
+            self.runHeadless()
+        self.performances.timerStop()
+        self.performances.timing.finish(self)
+
+    def runTraced(self):
         while(self.running):
+            if self.pc >= len(self.program):
+                raise self.fault(IndexError(), self.pc)
             self.currentInst = self.program[self.pc]
             self.currentAddr = self.address[self.pc]
 
-            print("Next instruction =>")
-            print("PC : " + str(self.pc) + ", inst : " + self.currentInst + ", Machine cycle : " + str(self.performances.cycles))
-
-            self.currentInst = int(self.currentInst, 16)
+            if self.trace in ("instr", "full"):
+                print("Next instruction =>")
+                print("PC : " + str(self.pc) + ", inst : " + "0x%08x" % self.currentInst + ", Machine cycle : " + str(self.performances.cycles))
 
             self.decode(self.currentInst)
-            self.eval()
-            self.showRegs()
+            if self.profiler is not None:
+                pc, cycles = self.pc, self.performances.cycles
+                self.eval()
+                self.profiler.record(pc, self.pc if self.running else -1, self.performances.cycles - cycles)
+            else:
+                self.eval()
 
-            self.dataMemory.showDataMemory()
+            if self.trace == "full":
+                self.showRegs()
+                self.dataMemory.showDataMemory()
+            if self.watchdog is not None:
+                self.watchdog.tick(self)
 
-            self.pc += 1
+    def runTraceFile(self):
+        writer = self.traceWriter
+        writer.start(self.regs, self.dataMemory.num_data_mem_cells, self.memory_model == "paged")
 
-            if(self.step_by_step):
-                keyboard.wait('right')
+        # destination of each pc and memory access of the load/store : 1 at regs[reg1] + reg2, 2 at regs[reg1] + regs[reg2]
+        targets = array('i', [TraceWriter.NONE]) * len(self.decoded)
+        accesses = bytearray(len(self.decoded))
+        for index in range(0, len(self.decoded)):
+            op, reg1, reg2, reg3 = self.decoded[index]
+            instrNum = (op & 63) >> 1
+            if 1 <= instrNum <= 13:
+                targets[index] = reg3
+            elif instrNum == 14:
+                targets[index] = TraceWriter.MEMORY
+            elif instrNum == 15:
+                targets[index] = reg2
+            elif instrNum == 18 and self.scalls.get(reg1, VirtualMachine.writeOutput) is not VirtualMachine.writeOutput:
+                # scall 0 and the callbacks can write r1
+                targets[index] = 1
+            if instrNum == 13 or instrNum == 14:
+                accesses[index] = 2 if op & 1 else 1
 
-        self.performances.timerStop()
+        operations = self.operations
+        cycleCosts = self.cycleCosts
+        program = self.program
+        regs = self.regs
+        performances = self.performances
+        pack = TraceWriter.RECORD.pack
+        chunkSize = writer.chunkSize
+        chunk = bytearray()
+        step = 0
+        pc = self.pc if self.running else -1
+        stopped = True
 
-        self.showStatistics()
-        self.loadInFile()
+        try:
+            while pc >= 0:
+                handler, reg1, reg2, reg3 = operations[pc]
+                access = accesses[pc]
+                address = -1
+                if access:
+                    address = regs[reg1] + (regs[reg2] if access == 2 else reg2)
+                cycles = performances.cycles
+                # the cache adds its latencies to the performances, the cycles are kept there for the records
+                performances.cycles = cycles + cycleCosts[pc]
+                try:
+                    nextPc = handler(pc, reg1, reg2, reg3)
+                except OverflowError:
+                    nextPc = self.overflowStep(pc)
+                regs[0] = 0
+
+                target = targets[pc]
+                chunk += pack(step, cycles, pc, program[pc], target, regs[target] if target >= 0 else (regs[reg3] if target == TraceWriter.MEMORY else 0), address)
+                if len(chunk) >= chunkSize:
+                    writer.put(chunk)
+                    chunk = bytearray()
+                pc = nextPc
+                step += 1
+            stopped = False
+        except (IndexError, ZeroDivisionError, ValueError) as error:
+            raise self.fault(error, pc)
+        finally:
+            # the records of an execution stopped by an error are written too
+            writer.put(chunk)
+            try:
+                writer.close()
+            except TraceFormatError as error:
+                # the error which stopped the execution is reported rather than the one of the trace file
+                if not stopped:
+                    raise SimulationError(str(error))
+
+    def runHeadless(self):
+        # r0 can be initialised to a non-zero value, it is only cleared after the first instruction
+        if self.running and self.regs[0] != 0:
+            self.step()
+
+        operations = self.operations
+        cycleCosts = self.cycleCosts
+        pc = self.pc if self.running else -1
+        cycles = 0
+
+        # a result that does not fit in its register raises OverflowError from the register array,
+        # the instruction is executed again by overflowStep so the loop itself never checks anything
+        while pc >= 0:
+            try:
+                while pc >= 0:
+                    handler, reg1, reg2, reg3 = operations[pc]
+                    cycles += cycleCosts[pc]
+                    pc = handler(pc, reg1, reg2, reg3)
+            except OverflowError:
+                # the cycles are counted first, the overflow may be trapped
+                self.performances.cycles += cycles
+                cycles = 0
+                pc = self.overflowStep(pc)
+            except (IndexError, ZeroDivisionError, ValueError) as error:
+                self.performances.cycles += cycles
+                raise self.fault(error, pc)
+
+        # the cache adds its latencies directly to the performances while the loop runs
+        self.performances.cycles += cycles
+
+    def runProfiled(self):
+        profiler = self.profiler
+        performances = self.performances
+        if self.running and self.regs[0] != 0:
+            pc, cycles = self.pc, performances.cycles
+            self.step()
+            profiler.record(pc, self.pc if self.running else -1, performances.cycles - cycles)
+
+        operations = self.operations
+        cycleCosts = self.cycleCosts
+        counts = profiler.counts
+        pcCycles = profiler.cycles
+        taken = profiler.taken
+        pc = self.pc if self.running else -1
+
+        # the cycles of each instruction are measured on the performances to include the latencies of the cache
+        while pc >= 0:
+            try:
+                while pc >= 0:
+                    handler, reg1, reg2, reg3 = operations[pc]
+                    cycles = performances.cycles
+                    performances.cycles += cycleCosts[pc]
+                    nextPc = handler(pc, reg1, reg2, reg3)
+                    counts[pc] += 1
+                    pcCycles[pc] += performances.cycles - cycles
+                    if nextPc != pc + 1:
+                        taken[pc] += 1
+                    pc = nextPc
+            except OverflowError:
+                nextPc = self.overflowStep(pc)
+                profiler.record(pc, nextPc, performances.cycles - cycles)
+                pc = nextPc
+            except (IndexError, ZeroDivisionError, ValueError) as error:
+                raise self.fault(error, pc)
+
+    def runCheckpointed(self):
+        if self.running and self.regs[0] != 0:
+            self.step()
+
+        operations = self.operations
+        cycleCosts = self.cycleCosts
+        every = self.checkpoint_every
+        pc = self.pc if self.running else -1
+        cycles = 0
+        left = every
 
-    def loadAddrInst(self):
-        file = open(self.inputFile, "r")
-        lines = file.readlines()
-        cnt = 0
-        for line in lines:
-            parsed = line.split(" ")
-            self.address.append(parsed[0])
+        # the loop of runHeadless, counting down the instructions left before the next checkpoint
+        while pc >= 0:
+            try:
+                while pc >= 0 and left:
+                    handler, reg1, reg2, reg3 = operations[pc]
+                    cycles += cycleCosts[pc]
+                    pc = handler(pc, reg1, reg2, reg3)
+                    left -= 1
+            except OverflowError:
+                self.performances.cycles += cycles
+                cycles = 0
+                pc = self.overflowStep(pc)
+                left -= 1
+            except (IndexError, ZeroDivisionError, ValueError) as error:
+                self.performances.cycles += cycles
+                raise self.fault(error, pc)
+            if not left and pc >= 0:
+                self.performances.cycles += cycles
+                cycles = 0
+                self.pc = pc
+                self.saveCheckpoint()
+                left = every
 
-            if len(lines) != cnt+1:
-                self.program.append(parsed[1][:-1])
+        self.performances.cycles += cycles
+
+    def saveCheckpoint(self, fileName = None):
+        if fileName is None or (self.checkpoint is not None and os.path.abspath(fileName) == os.path.abspath(self.checkpoint.fileName)):
+            self.checkpoint.save(self)
+        else:
+            Checkpoint(fileName).save(self)
+
+    def loadCheckpoint(self, fileName):
+        state = Checkpoint.load(fileName)
+        header = state["header"]
+        if header["program"] != self.programHash():
+            raise SimulationError("The checkpoint " + fileName + " was not saved for the program " + str(self.inputFile))
+        if header["options"] != self.checkpointOptions():
+            raise SimulationError("The checkpoint " + fileName + " was saved with other options : " + json.dumps(header["options"]))
+
+        self.pc = header["pc"]
+        self.running = header["running"]
+        self.performances.cycles = header["cycles"]
+        self.performances.previous = header["elapsed"]
+        # the handlers of the dispatch table are bound to the register array, it is updated in place
+        self.regs[:] = state["regs"]
+        for number, page in state["pages"].items():
+            self.dataMemory.loadPage(number, page)
+        if self.cache is not None:
+            self.cache.restore(header["cache"])
+
+        # the records saved in the same file are appended after the one resumed
+        if self.checkpoint is not None and os.path.abspath(fileName) == os.path.abspath(self.checkpoint.fileName):
+            self.checkpoint.offset = state["offset"]
+            self.checkpoint.fullSize = state["full"]
+            self.checkpoint.appended = state["appended"]
+            self.checkpoint.snapshot = self.dataMemory.snapshot()
+
+    def checkpointSupported(self):
+        return not self.performances.timing.counted and self.predictor is None and self.profiler is None
+
+    def checkpointOptions(self):
+        return {"nb_registers": self.num_regs, "memory_size": self.dataMemory.num_data_mem_cells, "memory_model": self.memory_model, "overflow": self.overflow,
+                "timing": self.performances.timing.description(), "cache": self.cache.description() if self.cache is not None else None}
+
+    def programHash(self):
+        return hashlib.sha1(bytes(self.program)).hexdigest()
+
+    def step(self):
+        try:
+            handler, reg1, reg2, reg3 = self.operations[self.pc]
+            self.performances.cycles += self.cycleCosts[self.pc]
+            pc = handler(self.pc, reg1, reg2, reg3)
+        except OverflowError:
+            pc = self.overflowStep(self.pc)
+        except (IndexError, ZeroDivisionError, ValueError) as error:
+            raise self.fault(error, self.pc)
+        if self.running:
+            self.pc = pc
+        self.regs[0] = 0
+
+    def overflowStep(self, pc):
+        op, reg1, reg2, reg3 = self.decoded[pc]
+        instrNum = (op & 63) >> 1
+        if instrNum == 18:
+            raise SimulationError("The callback of scall " + str(reg1) + " wrote a value which does not fit in 32 bits at pc " + str(pc) + " (return the value of r1 to apply the overflow policy)")
+        if instrNum not in VirtualMachine.OPERATIONS:
+            raise SimulationError("Overflow at pc " + str(pc) + " : " + "0x%08x" % self.program[pc])
+
+        value = VirtualMachine.OPERATIONS[instrNum](self.regs[reg1], self.regs[reg2] if op & 1 else reg2)
+        if reg3 != 0:
+            self.regs[reg3] = self.fitValue(value, "R", reg3)
+        return pc + 1
+
+    def fault(self, error, pc):
+        if pc >= len(self.operations):
+            message = "No instruction at this address, the program has " + str(len(self.operations)) + " instruction(s)"
+        else:
+            instrNum = (self.decoded[pc][0] & 63) >> 1
+            if isinstance(error, ZeroDivisionError) and instrNum == 4:
+                message = "Division by zero"
+            elif isinstance(error, ValueError) and instrNum in (8, 9):
+                message = "Negative shift count"
+            elif isinstance(error, IndexError) and instrNum in (13, 14):
+                op, reg1, reg2, reg3 = self.decoded[pc]
+                message = ("Memory access out of range : " + str(self.regs[reg1] + (self.regs[reg2] if op & 1 else reg2))
+                           + " (" + str(self.dataMemory.num_data_mem_cells) + " memory slots)")
             else:
-                self.program.append(parsed[1])
-            cnt += 1
+                message = type(error).__name__ + " : " + str(error)
+        return SimulationError(message + " at pc " + str(pc))
+
+    def loadAddrInst(self, program = None):
+        if program is None:
+            program = Program.load(self.inputFile)
+
+        self.program = program.words
+        self.address = program.address
+        self.decoded = program.decoded
+
+    @staticmethod
+    def decodeWord(instr):
+        instrNum = (instr & 0xF8000000) >> 27
+        imm = 0
+        reg3 = 0
+
+        if instrNum == 15:
+            imm      = (instr & 0x4000000) >> 26
+            reg1     = (instr & 0x3FFFFE0) >>  5
+            reg2     = (instr & 0x1F)
+
+        elif instrNum == 16 or instrNum == 17:
+            reg1     = (instr & 0x7C00000) >>  22
+            reg2     = (instr & 0x3FFFFF)
+
+        elif instrNum == 18:
+            reg1     = (instr & 0x7FFFFFF)
+            reg2     = 0
+
+        else:
+            reg1     = (instr & 0x7C00000) >>  22
+            imm      = (instr & 0x200000) >> 21
+            reg2     = (instr & 0x1FFFE0) >>  5
+            reg3     = (instr & 0x1F)
+
+        return instrNum, imm, reg1, reg2, reg3
+
+    @staticmethod
+    def predecode(program):
+        decoded = []
+        for instr in program:
+            instrNum, imm, reg1, reg2, reg3 = VirtualMachine.decodeWord(instr)
+            op = instrNum * 2 + imm
+            if (1 <= instrNum <= 13 and reg3 == 0) or (instrNum == 15 and reg2 == 0):
+                op += 64
+            decoded.append((op, reg1, reg2, reg3))
+        return decoded
+
+    def buildDispatchTable(self):
+        regs = self.regs
+        readDataMemory = self.readMemory
+        writeDataMemory = self.writeMemory
+
+        def stop(pc, reg1, reg2, reg3):
+            self.running = False
+            self.pc = pc + 1
+            return -1
+
+        def addImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] + reg2
+            return pc + 1
+
+        def addReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] + regs[reg2]
+            return pc + 1
+
+        def subImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] - reg2
+            return pc + 1
+
+        def subReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] - regs[reg2]
+            return pc + 1
+
+        def mulImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] * reg2
+            return pc + 1
+
+        def mulReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] * regs[reg2]
+            return pc + 1
+
+        def divImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] // reg2
+            return pc + 1
+
+        def divReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] // regs[reg2]
+            return pc + 1
+
+        def andImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] and reg2
+            return pc + 1
+
+        def andReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] and regs[reg2]
+            return pc + 1
+
+        def orImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] or reg2
+            return pc + 1
+
+        def orReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] or regs[reg2]
+            return pc + 1
+
+        def xorImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] ^ reg2
+            return pc + 1
+
+        def xorReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] ^ regs[reg2]
+            return pc + 1
+
+        def shlImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] << reg2
+            return pc + 1
+
+        def shlReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] << regs[reg2]
+            return pc + 1
+
+        def shrImm(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] >> reg2
+            return pc + 1
+
+        def shrReg(pc, reg1, reg2, reg3):
+            regs[reg3] = regs[reg1] >> regs[reg2]
+            return pc + 1
+
+        # slt keeps the same comparison as sle
+        def sltImm(pc, reg1, reg2, reg3):
+            regs[reg3] = 1 if regs[reg1] <= reg2 else 0
+            return pc + 1
+
+        def sltReg(pc, reg1, reg2, reg3):
+            regs[reg3] = 1 if regs[reg1] <= regs[reg2] else 0
+            return pc + 1
+
+        def sleImm(pc, reg1, reg2, reg3):
+            regs[reg3] = 1 if regs[reg1] <= reg2 else 0
+            return pc + 1
+
+        def sleReg(pc, reg1, reg2, reg3):
+            regs[reg3] = 1 if regs[reg1] <= regs[reg2] else 0
+            return pc + 1
+
+        def seqImm(pc, reg1, reg2, reg3):
+            regs[reg3] = 1 if regs[reg1] == reg2 else 0
+            return pc + 1
+
+        def seqReg(pc, reg1, reg2, reg3):
+            regs[reg3] = 1 if regs[reg1] == regs[reg2] else 0
+            return pc + 1
+
+        def loadImm(pc, reg1, reg2, reg3):
+            regs[reg3] = readDataMemory(regs[reg1] + reg2)
+            return pc + 1
+
+        def loadReg(pc, reg1, reg2, reg3):
+            regs[reg3] = readDataMemory(regs[reg1] + regs[reg2])
+            return pc + 1
+
+        def storeImm(pc, reg1, reg2, reg3):
+            writeDataMemory(regs[reg1] + reg2, regs[reg3])
+            return pc + 1
+
+        def storeReg(pc, reg1, reg2, reg3):
+            writeDataMemory(regs[reg1] + regs[reg2], regs[reg3])
+            return pc + 1
+
+        def jmpImm(pc, reg1, reg2, reg3):
+            regs[reg2] = pc + 1
+            return reg1
+
+        def jmpReg(pc, reg1, reg2, reg3):
+            regs[reg2] = pc + 1
+            if regs[reg1] < 0:
+                self.jumpError(regs[reg1])
+            return regs[reg1]
+
+        def braz(pc, reg1, reg2, reg3):
+            if regs[reg1] == 0:
+                return reg2
+            return pc + 1
+
+        def branz(pc, reg1, reg2, reg3):
+            if regs[reg1] != 0:
+                return reg2
+            return pc + 1
+
+        scalls = self.scalls
+        writeOutput = VirtualMachine.writeOutput
+
+        def scall(pc, reg1, reg2, reg3):
+            # the numbers without callback display r1 like scall 1
+            value = scalls.get(reg1, writeOutput)(self)
+            if value is not None:
+                # the value returned by a callback goes to r1 with the overflow policy, like the values read by scall 0
+                regs[1] = value if -0x80000000 <= value <= 0x7FFFFFFF else self.fitValue(value, "R", 1)
+            return pc + 1
+
+        def undefined(pc, reg1, reg2, reg3):
+            raise SimulationError("Undefinied command : " + "0x%08x" % self.program[pc] + " at pc " + str(pc))
+
+        dispatch = [stop, stop, addImm, addReg, subImm, subReg, mulImm, mulReg, divImm, divReg,
+                    andImm, andReg, orImm, orReg, xorImm, xorReg, shlImm, shlReg, shrImm, shrReg,
+                    sltImm, sltReg, sleImm, sleReg, seqImm, seqReg, loadImm, loadReg, storeImm, storeReg,
+                    jmpImm, jmpReg, braz, braz, branz, branz, scall, scall]
+        dispatch += [undefined] * (64 - len(dispatch))
+
+        # variants clearing r0 for the instructions writing it
+        def clearR0(handler):
+            def run(pc, reg1, reg2, reg3):
+                pc = handler(pc, reg1, reg2, reg3)
+                regs[0] = 0
+                return pc
+            return run
+
+        dispatch += [clearR0(handler) for handler in dispatch]
+        return dispatch
 
     def initRegs(self, init_regs_file):
         if(init_regs_file is not None):
             file = open(init_regs_file, "r")
             lines = file.readlines()
             if(len(lines) != self.num_regs):
-                print("You have declared " + str(self.num_regs) +" registers but you initialized " + str(len(lines)) + " !")
-                print("Please check the -r, -ri options or your register initialization file")
-                exit()
-            for line in lines:
-                self.regs.append(int(line))
+                raise SimulationError("You have declared " + str(self.num_regs) +" registers but you initialized " + str(len(lines)) + " !\n"
+                                      + "Please check the -r, -ri options or your register initialization file")
+            self.setRegs([int(line) for line in lines])
         else:  
-            for i in range(0, self.num_regs):
-                self.regs.append(0)
+            self.regs = array('i', [0]) * self.num_regs
+
+    def setRegs(self, values):
+        values = list(values)
+        for i in range(0, len(values)):
+            if values[i] > 0x7FFFFFFF or values[i] < -0x80000000:
+                values[i] = self.fitValue(values[i], "R", i)
+        # in place, the handlers of the dispatch table hold the array
+        self.regs[:] = array('i', values)
         
     def decode(self, instr):
-        self.instrNum = (instr & 0xF8000000) >> 27
+        self.instrNum, self.imm, self.reg1, self.reg2, self.reg3 = VirtualMachine.decodeWord(instr)
 
-        if self.instrNum == 15:
-            self.imm      = (instr & 0x4000000) >> 26
-            self.reg1     = (instr & 0x3FFFFE0) >>  5
-            self.reg2     = (instr & 0x1F)
+    def eval(self):
+        if self.trace in ("instr", "full"):
+            print("Command : " + self.disassemble())
 
-        elif self.instrNum == 16 or self.instrNum == 17:
-            self.reg1     = (instr & 0x7C00000) >>  22
-            self.reg2     = (instr & 0x3FFFFF)
+        handler, reg1, reg2, reg3 = self.operations[self.pc]
+        cycles = self.cycleCosts[self.pc]
+        try:
+            pc = handler(self.pc, reg1, reg2, reg3)
+        except OverflowError:
+            pc = self.overflowStep(self.pc)
+        except (IndexError, ZeroDivisionError, ValueError) as error:
+            raise self.fault(error, self.pc)
+        if self.running:
+            self.pc = pc
 
-        elif self.instrNum == 18:
-            self.reg1     = (instr & 0x7FFFFFF)
+        if self.trace in ("instr", "full"):
+            print("")
+        self.regs[0] = 0
+        self.performances.cycles += cycles
 
-        else:
-            self.reg1     = (instr & 0x7C00000) >>  22
-            self.imm      = (instr & 0x200000) >> 21
-            self.reg2     = (instr & 0x1FFFE0) >>  5
-            self.reg3     = (instr & 0x1F)
+    def disassemble(self):
+        return VirtualMachine.disassembleFields(self.instrNum, self.imm, self.reg1, self.reg2, self.reg3)
 
-    def eval(self):
-        print("Command : ", end='')
+    @staticmethod
+    def disassembleFields(instrNum, imm, reg1, reg2, reg3):
+        names = INSTRUCTION_SET
 
-        if self.instrNum == 1:
-            if(self.imm):
-                print("add " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] + self.regs[self.reg2]
+        if 1 <= instrNum <= 14:
+            if(imm):
+                return names[instrNum] + " r" + str(reg1) + ", r" + str(reg2) + ", r" + str(reg3)
+            elif instrNum == 3:
+                return "mult " + "r" + str(reg1) + ", " + str(VirtualMachine.twosComplement(reg2)) + ", r" + str(reg3)
             else:
-                print("add " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] + self.reg2
+                return names[instrNum] + " r" + str(reg1) + ", " + str(VirtualMachine.twosComplement(reg2)) + ", r" + str(reg3)
 
-        elif self.instrNum == 2:
-            if(self.imm):
-                print("sub " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] - self.regs[self.reg2]
-            else:
-                print("sub " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] - self.reg2
-        
-        elif self.instrNum == 3:
-            if(self.imm):
-                print("mul " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] * self.regs[self.reg2]
+        elif instrNum == 15:
+            if(imm):
+                return "jmp " + "r" + str(reg1) + ", r" + str(reg2)
             else:
-                print("mult " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] * self.reg2
-        
-        elif self.instrNum == 4:
-            if(self.imm):
-                print("div " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] // self.regs[self.reg2]
-            else:
-                print("div " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] // self.reg2
+                return "jmp " + str(VirtualMachine.twosComplement(reg1)) + ", r" + str(reg2)
 
-        elif self.instrNum == 5:
-            if(self.imm):
-                print("and " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] and self.regs[self.reg2]
-            else:
-                print("and " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] and self.reg2
+        elif instrNum == 16:
+            return "braz " + "r" + str(reg1) + ", " + str(hex(reg2))
 
-        elif self.instrNum == 6:
-            if(self.imm):
-                print("or " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] or self.regs[self.reg2]
-            else:
-                print("or " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] or self.reg2
+        elif instrNum == 17:
+            return "branz " + "r" + str(reg1) + ", " + str(hex(VirtualMachine.twosComplement(reg2)))
 
-        elif self.instrNum == 7:
-            if(self.imm):
-                print("xor " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] ^ self.regs[self.reg2]
-            else:
-                print("xor " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] ^ self.reg2
+        elif instrNum == 18:
+            return "scall " + str(reg1)
 
-        elif self.instrNum == 8:
-            if(self.imm):
-                print("shl " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] << self.regs[self.reg2]
-            else:
-                print("shl " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] << self.reg2
+        elif instrNum == 0:
+            return "stop"
 
-        elif self.instrNum == 9:
-            if(self.imm):
-                print("shr " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] >> self.regs[self.reg2]
-            else:
-                print("shr " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.regs[self.reg1] >> self.reg2
-
-        elif self.instrNum == 10:
-            if(self.imm):
-                print("slt " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                if self.regs[self.reg1] <= self.regs[self.reg2]:
-                    self.regs[self.reg3] = 1
-                else:
-                    self.regs[self.reg3] = 0
-            else:
-                print("slt " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                if self.regs[self.reg1] <= self.reg2:
-                    self.regs[self.reg3] = 1
-                else:
-                    self.regs[self.reg3] = 0
-        
-        elif self.instrNum == 11:
-            if(self.imm):
-                print("sle " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                if self.regs[self.reg1] <= self.regs[self.reg2]:
-                    self.regs[self.reg3] = 1
-                else:
-                    self.regs[self.reg3] = 0
-            else:
-                print("sle " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                if self.regs[self.reg1] <= self.reg2:
-                    self.regs[self.reg3] = 1
-                else:
-                    self.regs[self.reg3] = 0
-        
-        elif self.instrNum == 12:
-            if(self.imm):
-                print("seq " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                if self.regs[self.reg1] == self.regs[self.reg2]:
-                    self.regs[self.reg3] = 1
-                else:
-                    self.regs[self.reg3] = 0
-            else:
-                print("seq " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                if self.regs[self.reg1] == self.reg2:
-                    self.regs[self.reg3] = 1
-                else:
-                    self.regs[self.reg3] = 0
+        else:
+            return "Undefinied command"
 
-        elif self.instrNum == 13: #load
-            if(self.imm):
-                print("load " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.dataMemory.readDataMemory(self.regs[self.reg1] + self.regs[self.reg2])
-            else:
-                print("load " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.regs[self.reg3] = self.dataMemory.readDataMemory(self.regs[self.reg1] + self.reg2)
+    def showRegs(self):
+        print("REGISTERS : ")
+        for i in self.regs:
+            print("%04x" % self.twosComplement(i) + " ", end='')
+        print("\n")
 
-        elif self.instrNum == 14: #store
-            if(self.imm):
-                print("store " + "r" + str(self.reg1) + ", r" + str(self.reg2) + ", r" + str(self.reg3))
-                self.dataMemory.writeDataMemory(self.regs[self.reg1] + self.regs[self.reg2] ,self.regs[self.reg3])
-            else:
-                print("store " + "r" + str(self.reg1) + ", " + str(self.twosComplement(self.reg2)) + ", r" + str(self.reg3))
-                self.dataMemory.writeDataMemory(self.regs[self.reg1] + self.reg2 ,self.regs[self.reg3])
-
-        elif self.instrNum == 15: #jmp
-            if(self.imm):
-                print("jmp " + "r" + str(self.reg1) + ", r" + str(self.reg2))
-                self.regs[self.reg2] = self.pc + 1
-                self.pc = self.regs[self.reg1] - 1
-            else:
-                print("jmp " + str(self.twosComplement(self.reg1)) + ", r" + str(self.reg2))
-                self.regs[self.reg2] = self.pc + 1
-                self.pc = self.reg1 - 1
-
-        elif self.instrNum == 16: #braz
-            print("braz " + "r" + str(self.reg1) + ", " + str(hex(self.reg2)))
-            if self.regs[self.reg1] == 0:
-                self.pc = self.reg2 - 1
-            else:
-                pass
+    def fitValue(self, value, name, index):
+        if self.overflow == "wrap":
+            return ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+        elif self.overflow == "saturate":
+            return max(-0x80000000, min(0x7FFFFFFF, value))
+        else:
+            self.overflowTrap(name, index)
 
-        elif self.instrNum == 17: #branz
-            print("branz " + "r" + str(self.reg1) + ", " + str(hex(self.twosComplement(self.reg2))))
-            if self.regs[self.reg1] != 0:
-                self.pc = self.reg2 - 1
-            else:
-                pass
+    def overflowTrap(self, name, index):
+        raise SimulationError("Overflow on " + name + str(index) + " ! (32 bits signed)")
 
-        elif self.instrNum == 18: #scall
-            print("scall " + str(self.reg1))
-            if int(self.reg1) == 0:
-                self.regs[1] = int(input("Enter a value for r1 : "))
-            else:
-                print("r1 = " + str(self.regs[1]) + "(10) ," + str(hex(self.regs[1])) + ("(16)"))
+    def jumpError(self, target):
+        raise SimulationError("Jump to a negative address : " + str(target))
 
-        elif self.instrNum == 0: #stop
-            print("stop")
-            self.running = False
+    def registerScall(self, number, callback):
+        self.scalls[number] = callback
 
+    def readInput(self):
+        if self.inputs is None:
+            value = int(input("Enter a value for r1 : "))
+        elif self.inputs:
+            value = self.inputs.popleft()
         else:
-            print("Undefinied command")
-            exit()
+            raise SimulationError("No more input values for scall 0")
+        if value > 0x7FFFFFFF or value < -0x80000000:
+            value = self.fitValue(value, "R", 1)
+        self.regs[1] = value
 
-        print("")
-        self.regs[0] = 0
-        self.performances.cycleUpdate(self.instrNum)
+    def writeOutput(self):
+        if self.outputs is not None:
+            self.outputs.append(self.regs[1])
+        else:
+            print(VirtualMachine.outputText(self.regs[1]))
 
-    def showRegs(self):
-        print("REGISTERS : ")
-        pc = 0
-        for i in self.regs:
-            if len('{:b}'.format(i)) > 17:
-                print("\nOverflow on R" + str(pc) + " ! (32 bits signed)")
-                exit()
-            else:
-                print("%04x" % self.twosComplement(i) + " ", end='')
-            pc+=1
-        print("\n")
+    @staticmethod
+    def outputText(value):
+        return "r1 = " + str(value) + "(10) ," + str(hex(value)) + ("(16)")
 
-    def twosComplement(self, nb):
+    @staticmethod
+    def loadInputs(fileName):
+        file = open(fileName, "r")
+        text = file.read()
+        file.close()
+        try:
+            return [int(value, 0) for value in text.split()]
+        except ValueError as error:
+            raise SimulationError("Invalid input value in " + fileName + " : " + str(error))
+
+    def saveOutputs(self):
+        file = open(self.stdout_file, "w")
+        file.writelines([VirtualMachine.outputText(value) + "\n" for value in self.outputs])
+        file.close()
+
+    @staticmethod
+    def twosComplement(nb):
         if nb>>15:
             nb=((nb) & 0xFFFF)
         return nb
@@ -520,16 +4341,42 @@ class VirtualMachine:
         print("Simulation duration : " + str(round(self.performances.elapsed, 3)) + " second(s)")
         print("Number of machine cycle(s) : " + str(self.performances.cycles))
         print("Instruction processing frequency : " + str(round(self.performances.cycles/self.performances.elapsed, 3)) + " Hz")
+        if self.cache is not None:
+            print("Cache : " + self.cache.statistics())
+        if self.performances.timing.counted:
+            print("Timing : " + self.performances.timing.statistics(self))
+        if self.predictor is not None:
+            print("Branch prediction : " + self.predictor.statistics(self))
+        if self.watchdog is not None and self.watchdog.reason is not None:
+            print("Watchdog : " + self.watchdog.description(self))
         print("\n")
 
     def loadInFile(self):
         open(self.outputFile, "w").close()
         file = open(self.outputFile, "a")
+        self.writeReport(file)
+        file.close()
 
+    def writeReport(self, file):
         file.write("Simulation duration : " + str(round(self.performances.elapsed, 3)) + " second(s)\n")
         file.write("Number of machine cycle(s) : " + str(self.performances.cycles) + "\n")
         file.write("Instruction processing frequency : " + str(round(self.performances.cycles/self.performances.elapsed, 3)) + " Hz\n")
-        file.write("Options setup : " + str(self.num_regs) + " registers, " + str(self.dataMemory.num_data_mem_cells) + " memory slots\n\n")
+        if self.memory_model == "paged":
+            file.write("Options setup : " + str(self.num_regs) + " registers, " + str(self.dataMemory.num_data_mem_cells) + " memory slots (paged, " + str(len(self.dataMemory.pages)) + " page(s) of " + str(PagedDataMemory.PAGE_SIZE) + " slots written)\n")
+        else:
+            file.write("Options setup : " + str(self.num_regs) + " registers, " + str(self.dataMemory.num_data_mem_cells) + " memory slots\n")
+        if self.cache is not None:
+            file.write("Cache setup : " + self.cache.description() + "\n")
+            file.write("Cache statistics : " + self.cache.statistics() + "\n")
+        if self.performances.timing.counted:
+            file.write("Timing model : " + self.performances.timing.description() + "\n")
+            file.write("Timing statistics : " + self.performances.timing.statistics(self) + "\n")
+        if self.predictor is not None:
+            file.write("Branch predictor : " + self.predictor.description() + "\n")
+            file.write("Branch prediction : " + self.predictor.statistics(self) + "\n")
+        if self.watchdog is not None and self.watchdog.reason is not None:
+            file.write("Watchdog : " + self.watchdog.description(self) + "\n")
+        file.write("\n")
         index = 1
         for i in self.regs:
             if index-1 <10:
@@ -542,17 +4389,75 @@ class VirtualMachine:
 
         file.write("\n")
 
-        index = 1
-        for i in self.dataMemory.memorySlots:
-            if index-1 < 10:
-                file.write("SLOT" + str(index-1) + "  : 0x%04x" % self.twosComplement(i) + " / ")
-            else:
-                file.write("SLOT" + str(index-1) + " : 0x%04x" % self.twosComplement(i) + " / ")
-            if not(index % 7) and index != 0:
-                file.write("\n")
-            index += 1
+        self.dataMemory.reportDataMemory(file)
+        if self.predictor is not None:
+            file.write("\n")
+            self.predictor.reportBranches(file)
+        if self.outputs is not None:
+            file.write("\nOutputs (scall) : " + str(len(self.outputs)) + " value(s)\n")
+            for value in self.outputs:
+                file.write(VirtualMachine.outputText(value) + "\n")
 
-        file.close()
+class SimulationResult:
+    """
+    A class used to represent the end of a simulation run by VirtualMachine.from_program
+
+    Attributes
+    ----------
+        vm : object
+            the VirtualMachine, in its final state
+
+        pc : int
+            the pc where the simulation ended
+
+        cycles : int
+            number of machine cycles
+
+        elapsed : float
+            duration of the simulation in seconds
+
+        regs : int table
+            final value of the registers
+
+        outputs : int table
+            the values of r1 displayed by scall 1, None if they were printed
+
+        reason : string
+            why the Watchdog stopped the simulation, None when it ended on a stop instruction
+
+    Methods
+    -------
+        readMemory(addr)
+            returns the final value of a memory slot
+
+            Parameters
+            ----------
+            addr : int
+                data address
+
+        report()
+            returns the report of the simulation, the text VirtualMachine.loadInFile writes in the report file
+    """
+    def __init__(self, vm):
+        self.vm = vm
+        self.pc = vm.pc
+        self.cycles = vm.performances.cycles
+        self.elapsed = vm.performances.elapsed
+        self.regs = list(vm.regs)
+        self.outputs = vm.outputs
+        self.reason = vm.watchdog.reason if vm.watchdog is not None else None
+
+    def readMemory(self, addr):
+        return self.vm.dataMemory.readDataMemory(addr)
+
+    def report(self):
+        report = io.StringIO()
+        self.vm.writeReport(report)
+        return report.getvalue()
+
+def assemble(source, name = None):
+    words, labels = Assembler.assemble(source)
+    return Program(words, name = name, labels = labels)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="This program simulates the instruction set of the input machine code, corresponding to the initial assembly program.", epilog="Program realized in the microprocessor course by Mallory LEHUAULT-PARC", formatter_class=argparse.RawTextHelpFormatter)
@@ -562,9 +4467,78 @@ if __name__ == "__main__":
     parser.add_argument("-r", "--nb_registers", help="number of registers available", required=True)
     parser.add_argument("-m", "--memory_size", help="number of memory slots available", required=True)
     parser.add_argument("-ri", "--registers_init_file", help=".txt file to init registers value")
-    parser.add_argument("-s", "--step_by_step", help="(True) press RIGHT KEY to simulate the next instruction")
+    parser.add_argument("-s", "--step_by_step", help="(True) run the program in the debugger : breakpoints on a pc or a label, watchpoints on registers\nand memory slots, conditions, continue, step N and until (type help at the (debug) prompt)")
+    parser.add_argument("-e", "--engine", help="execution engine when nothing is traced (default: interp)\n - interp : one instruction at a time through a dispatch table\n - block : basic blocks translated into python functions", choices=ENGINES, default="interp")
+    parser.add_argument("-ov", "--overflow", help="when a result does not fit in 32 bits signed (default: trap)\n - trap : the simulation stops\n - wrap : two's complement wrap around\n - saturate : the result is clamped", choices=OVERFLOW_POLICIES, default="trap")
+    parser.add_argument("-mm", "--memory-model", help="organisation of the data memory (default: flat)\n - flat : all the memory slots are allocated at startup\n - paged : pages of slots allocated on their first write, for large and sparse memories", choices=MEMORY_MODELS, default="flat")
+    parser.add_argument("-c", "--cache", help="SETS,WAYS,LINE_SIZE of a cache between load/store and the data memory (e.g. 64,2,4)")
+    parser.add_argument("--cache-replacement", help="line replaced on a cache miss (default: lru)", choices=CACHE_REPLACEMENTS, default="lru")
+    parser.add_argument("--cache-write", help="cache write policy (default: back)\n - back : write-allocate, dirty lines written back when replaced\n - through : every store goes to the memory", choices=CACHE_WRITE_POLICIES, default="back")
+    parser.add_argument("--cache-hit-latency", help="cycles added to a load/store for a cache access (default: 1)", type=int, default=1)
+    parser.add_argument("--cache-miss-latency", help="cycles added for a memory access on a miss or a write through (default: 10)", type=int, default=10)
+    parser.add_argument("-tm", "--timing", help="timing model giving the machine cycles (default: default)\n - default : 2 cycles for mul, div, jmp, braz and branz, 1 for the others\n - table : latencies read from --latency-file\n - pipeline : five-stage pipeline with hazards and branch flushes", choices=TIMING_MODELS, default="default")
+    parser.add_argument("--latency-file", help="latency table of the table model, one \"instruction cycles\" line per instruction\n(and optionally \"start cycles\")")
+    parser.add_argument("--no-forwarding", help="pipeline model without forwarding paths", action="store_true")
+    parser.add_argument("--branch-penalty", help="cycles flushed by a taken braz or branz in the pipeline model (default: 2)", type=int, default=2)
+    parser.add_argument("--jump-penalty", help="cycles flushed by a jmp in the pipeline model (default: 1)", type=int, default=1)
+    parser.add_argument("-bp", "--branch-predictor", help="simulate a branch predictor, mispredictions cost --mispredict-penalty cycles\n - taken / not-taken : static prediction\n - 1bit / 2bit : table of counters indexed by the pc\n - gshare : 2 bits counters indexed by the pc xor the global history\njmp on a register are predicted by a BTB", choices=BRANCH_PREDICTORS)
+    parser.add_argument("--bp-entries", help="number of counters of the prediction table, a power of 2 (default: 1024)", type=int, default=1024)
+    parser.add_argument("--bp-history", help="number of outcomes in the global history of gshare (default: 8)", type=int, default=8)
+    parser.add_argument("--btb-entries", help="number of entries of the BTB, a power of 2 (default: 64)", type=int, default=64)
+    parser.add_argument("--mispredict-penalty", help="cycles added by a misprediction (default: 2)", type=int, default=2)
+    parser.add_argument("-p", "--profile", help="profile the execution pc by pc and save PROFILE.txt (hot loops and basic blocks),\nPROFILE.json and PROFILE.folded (collapsed stacks for flame graph tools)")
+    parser.add_argument("--symbols", help="symbol file of the assembler (-s option) used to name the pcs in the profile and the debugger\n(default: INPUT.sym when it exists)")
+    parser.add_argument("--checkpoint", help="save the state of the simulation in this file every --checkpoint-every instructions,\nonly the memory pages changed since the previous checkpoint are appended")
+    parser.add_argument("--checkpoint-every", help="number of instructions between two checkpoints (default: 1000000), with the trace level none or summary", type=int)
+    parser.add_argument("--resume", help="continue the simulation from the last checkpoint saved in this file (same program and options)")
+    parser.add_argument("--trace-file", help="write a binary record (step, cycles, pc, instruction, destination, new value, memory address)\nof every executed instruction in this file instead of the console trace, read it with TraceReplay.py")
+    parser.add_argument("--trace-compression", help="compression of the trace file (default: none)", choices=TRACE_COMPRESSIONS, default="none")
+    parser.add_argument("--stdin-file", help="values read by scall 0 (integers separated by spaces or lines) instead of the console")
+    parser.add_argument("--stdout-file", help="save the values displayed by scall 1 in this file and in the report instead of the console")
+    parser.add_argument("--max-steps", help="stop the simulation after this number of instructions (exit status 3)", type=int)
+    parser.add_argument("--max-cycles", help="stop the simulation once this number of machine cycles is reached (exit status 3)", type=int)
+    parser.add_argument("--timeout", help="stop the simulation after this number of seconds (exit status 3)", type=float)
+    parser.add_argument("--detect-loops", help="stop the simulation when the state (pc, registers, memory) repeats at a backward branch,\nthe program would never stop (exit status 4)", action="store_true")
+    parser.add_argument("--cache-dir", help="directory of the results of the deterministic simulations (nothing traced, no scall 0 on the console...) :\nthe same program with the same options and registers is not executed again, its report is taken from the directory")
+    parser.add_argument("--cache-max-size", help="size of the --cache-dir directory in MB, the least recently used results are removed (default: 512)", type=int, default=512)
+    parser.add_argument("-t", "--trace", help="console output during the simulation (default: full)\n - none : only the report file\n - summary : statistics at the end\n - instr : each executed command\n - full : commands, registers and memory", choices=TRACE_LEVELS, default="full")
 
     args = parser.parse_args()
 
-    vm = VirtualMachine(args.input_file, args.output_root, int(args.nb_registers, 10), int(args.memory_size, 10), args.registers_init_file, args.step_by_step)
-    vm.run()
\ No newline at end of file
+    try:
+        cache = None
+        if args.cache is not None:
+            cache = Cache.parseGeometry(args.cache)
+            cache.update({"replacement": args.cache_replacement, "write_policy": args.cache_write, "hit_latency": args.cache_hit_latency, "miss_latency": args.cache_miss_latency})
+
+        timing = None
+        if args.timing == "table":
+            if args.latency_file is None:
+                print("The table timing model needs a --latency-file")
+                exit(1)
+            timing = LatencyTable.load(args.latency_file)
+        elif args.timing == "pipeline":
+            timing = PipelineModel(not args.no_forwarding, args.branch_penalty, args.jump_penalty)
+
+        predictor = None
+        if args.branch_predictor is not None:
+            predictor = BranchPredictor(args.branch_predictor, args.bp_entries, args.bp_history, args.btb_entries, args.mispredict_penalty)
+
+        watchdog = None
+        if args.max_steps is not None or args.max_cycles is not None or args.timeout is not None or args.detect_loops:
+            watchdog = Watchdog(args.max_steps, args.max_cycles, args.timeout, args.detect_loops)
+
+        checkpoint_every = args.checkpoint_every
+        if args.checkpoint is not None and checkpoint_every is None and args.trace in ("none", "summary") and not args.step_by_step:
+            checkpoint_every = 1000000
+
+        vm = VirtualMachine(args.input_file, args.output_root, int(args.nb_registers, 10), int(args.memory_size, 10), args.registers_init_file, args.step_by_step, args.trace, args.engine, args.overflow, args.memory_model, cache, profile = args.profile, symbols = args.symbols, timing = timing, predictor = predictor,
+                            checkpoint = args.checkpoint, checkpoint_every = checkpoint_every, resume = args.resume, trace_file = args.trace_file, trace_compression = args.trace_compression, watchdog = watchdog,
+                            inputs = VirtualMachine.loadInputs(args.stdin_file) if args.stdin_file is not None else None, stdout_file = args.stdout_file,
+                            result_cache = ResultCache(args.cache_dir, args.cache_max_size * 1024 * 1024) if args.cache_dir is not None else None)
+        vm.run()
+    except SimulationError as error:
+        print(error)
+        exit(1)
+    if watchdog is not None and watchdog.reason is not None:
+        exit(watchdog.status)
\ No newline at end of file